@@ -0,0 +1,169 @@
+"""Inquiry demand rollups: one document per (vehicle, day) holding the number of
+inquiries by type and by current status, kept up to date as inquiries are
+stored and as their status changes.
+
+Top-N and time-series questions then read at most one document per vehicle
+per day in the requested range instead of aggregating the inquiry history.
+"""
+from pymongo import UpdateOne
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from database import db, car_inquiries, car_inquiries_archive, vehicles
+from models import CarInquiry, InquiryStatus, InquiryType
+
+logger = logging.getLogger(__name__)
+
+inquiry_rollups = db.inquiry_rollups
+
+# Metric name -> rollup field summed for it
+METRIC_FIELDS = {
+    "total": "total",
+    **{f"type:{inquiry_type.value}": f"types.{inquiry_type.value}" for inquiry_type in InquiryType},
+    **{f"status:{status.value}": f"statuses.{status.value}" for status in InquiryStatus},
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+def _day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _rollup_key(car_id: str, day: datetime) -> Dict[str, Any]:
+    return {"_id": f"{car_id}:{day.strftime('%Y-%m-%d')}"}
+
+def _value(field) -> str:
+    return field.value if hasattr(field, "value") else field
+
+def metric_field(metric: str) -> str:
+    """The rollup field for a metric name, or ValueError if there is none"""
+    try:
+        return METRIC_FIELDS[metric]
+    except KeyError:
+        raise ValueError(f"Unknown metric '{metric}'; expected one of {', '.join(METRIC_FIELDS)}")
+
+async def record_inquiries(inquiries: Iterable[CarInquiry]):
+    """Count newly stored inquiries into their (vehicle, day) rollups"""
+    increments: Dict[Tuple[str, datetime], Counter] = {}
+    for inquiry in inquiries:
+        counter = increments.setdefault((inquiry.car_id, _day(inquiry.submitted_at)), Counter())
+        counter["total"] += 1
+        counter[f"types.{_value(inquiry.inquiry_type)}"] += 1
+        counter[f"statuses.{_value(inquiry.status)}"] += 1
+    if not increments:
+        return
+
+    writes = [
+        UpdateOne(
+            _rollup_key(car_id, day),
+            {"$inc": dict(counter), "$setOnInsert": {"car_id": car_id, "day": day}},
+            upsert=True
+        )
+        for (car_id, day), counter in increments.items()
+    ]
+    try:
+        await inquiry_rollups.bulk_write(writes, ordered=False)
+    except Exception as e:
+        # Rollups are derived data; rebuild-inquiry-rollups repairs them
+        logger.error(f"Error updating inquiry rollups: {e}")
+
+async def record_status_change(inquiry: Dict[str, Any], old_status: str, new_status: str):
+    """Move one inquiry between status counters in its rollup"""
+    if old_status == new_status:
+        return
+    try:
+        await inquiry_rollups.update_one(
+            _rollup_key(inquiry["car_id"], _day(inquiry["submitted_at"])),
+            {"$inc": {f"statuses.{old_status}": -1, f"statuses.{new_status}": 1}}
+        )
+    except Exception as e:
+        logger.error(f"Error updating inquiry rollup status: {e}")
+
+async def top_vehicles(metric: str = "total", days: int = 7, limit: int = 10) -> List[Dict[str, Any]]:
+    """Vehicles with the highest metric over the last days, with their names"""
+    field = metric_field(metric)
+    since = _day(datetime.utcnow()) - timedelta(days=days - 1)
+    ranked = await inquiry_rollups.aggregate([
+        {"$match": {"day": {"$gte": since}}},
+        {"$group": {"_id": "$car_id", "count": {"$sum": f"${field}"}}},
+        {"$match": {"count": {"$gt": 0}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+    ]).to_list(limit)
+
+    car_ids = [row["_id"] for row in ranked]
+    names = {
+        doc["id"]: doc
+        for doc in await vehicles.find(
+            {"id": {"$in": car_ids}}, {"_id": 0, "id": 1, "year": 1, "brand": 1, "model": 1}
+        ).to_list(len(car_ids))
+    }
+    return [
+        {
+            "car_id": row["_id"],
+            "count": row["count"],
+            "year": names.get(row["_id"], {}).get("year"),
+            "brand": names.get(row["_id"], {}).get("brand"),
+            "model": names.get(row["_id"], {}).get("model"),
+        }
+        for row in ranked
+    ]
+
+async def time_series(metric: str = "total", days: int = 30, car_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Daily metric totals, oldest first, with zero for days without inquiries"""
+    field = metric_field(metric)
+    first_day = _day(datetime.utcnow()) - timedelta(days=days - 1)
+    match: Dict[str, Any] = {"day": {"$gte": first_day}}
+    if car_id:
+        match["car_id"] = car_id
+    rows = await inquiry_rollups.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$day", "count": {"$sum": f"${field}"}}},
+    ]).to_list(None)
+
+    counts = {row["_id"]: row["count"] for row in rows}
+    series = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        series.append({"day": day.date(), "count": counts.get(day, 0)})
+    return series
+
+async def rebuild_inquiry_rollups() -> int:
+    """Recompute every rollup from car_inquiries and its archive collection;
+    returns the number of rollup documents.
+
+    Inquiries stored while this runs may be counted twice or not at all, so
+    run it when leads are not arriving (or re-run it afterwards). Inquiries
+    archived to files (LEAD_ARCHIVE_TARGET=file) are no longer counted.
+    """
+    rollups: Dict[str, Dict[str, Any]] = {}
+    for collection in (car_inquiries, car_inquiries_archive):
+        grouped = collection.aggregate([
+            {"$group": {
+                "_id": {
+                    "car_id": "$car_id",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
+                    "type": "$inquiry_type",
+                    "status": "$status",
+                },
+                "count": {"$sum": 1},
+            }},
+        ], allowDiskUse=True)
+
+        async for row in grouped:
+            key = row["_id"]
+            day = datetime.strptime(key["day"], "%Y-%m-%d")
+            rollup = rollups.setdefault(_rollup_key(key["car_id"], day)["_id"], {
+                "car_id": key["car_id"], "day": day, "total": 0, "types": {}, "statuses": {}
+            })
+            rollup["total"] += row["count"]
+            rollup["types"][key["type"]] = rollup["types"].get(key["type"], 0) + row["count"]
+            rollup["statuses"][key["status"]] = rollup["statuses"].get(key["status"], 0) + row["count"]
+
+    await inquiry_rollups.delete_many({})
+    documents = [{"_id": rollup_id, **rollup} for rollup_id, rollup in rollups.items()]
+    for start in range(0, len(documents), REBUILD_BATCH_SIZE):
+        await inquiry_rollups.insert_many(documents[start:start + REBUILD_BATCH_SIZE], ordered=False)
+    logger.info(f"Rebuilt {len(documents)} inquiry rollups")
+    return len(documents)
@@ -0,0 +1,320 @@
+"""Scripted load against the API with JSON results that can be diffed between commits.
+
+Traffic runs in-process through the ASGI app by default, or against a running
+server when a base URL is given. The in-memory ``mongomock://`` database only
+lives as long as the process, so in that case the benchmark generates its own
+dataset at the requested scale first.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import httpx
+
+# A request factory returns (label, method, path, json body)
+RequestSpec = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+def _catalog(rng: random.Random, vehicle_count: int) -> RequestSpec:
+    roll = rng.random()
+    if roll < 0.35:
+        category = rng.choice(["new", "used"])
+        return "GET /vehicles?category", "GET", f"/api/vehicles?category={category}", None
+    if roll < 0.50:
+        return "GET /vehicles?featured_only", "GET", "/api/vehicles?featured_only=true&limit=6", None
+    if roll < 0.65:
+        low = rng.randint(20, 60) * 1000
+        return ("GET /vehicles?search", "GET",
+                f"/api/vehicles?category=used&price_min={low}&price_max={low + 30000}&sort=price_asc", None)
+    if roll < 0.85:
+        return "GET /vehicles/{id}", "GET", f"/api/vehicles/bench-v-{rng.randrange(vehicle_count)}", None
+    return "GET /testimonials", "GET", "/api/testimonials", None
+
+def _leads(rng: random.Random, vehicle_count: int) -> RequestSpec:
+    suffix = rng.randrange(1_000_000_000)
+    if rng.random() < 0.5:
+        return "POST /contact", "POST", "/api/contact", {
+            "full_name": "Load Test",
+            "email": f"load.{suffix}@example.com",
+            "phone": "555-0100",
+            "message": "Benchmark contact submission.",
+        }
+    return "POST /inquiries", "POST", "/api/inquiries", {
+        "car_id": f"bench-v-{rng.randrange(vehicle_count)}",
+        "car_type": "used",
+        "customer_name": "Load Test",
+        "customer_email": f"load.{suffix}@example.com",
+        "inquiry_type": rng.choice(["details", "test_drive", "purchase"]),
+        "message": "Benchmark inquiry.",
+    }
+
+def _admin(rng: random.Random, vehicle_count: int) -> RequestSpec:
+    roll = rng.random()
+    if roll < 0.3:
+        return "GET /dashboard/stats", "GET", "/api/dashboard/stats", None
+    if roll < 0.55:
+        return "GET /contact", "GET", "/api/contact?limit=50", None
+    if roll < 0.8:
+        return "GET /analytics/inquiries/top", "GET", "/api/analytics/inquiries/top?metric=type:test_drive", None
+    return "GET /inquiries?status", "GET", f"/api/inquiries?status={rng.choice(['new', 'contacted'])}", None
+
+MIXES: Dict[str, List[Tuple[float, Callable[[random.Random, int], RequestSpec]]]] = {
+    "catalog": [(1.0, _catalog)],
+    "leads": [(1.0, _leads)],
+    "admin": [(1.0, _admin)],
+    "mixed": [(0.8, _catalog), (0.15, _leads), (0.05, _admin)],
+}
+
+def _pick(mix, rng: random.Random, vehicle_count: int) -> RequestSpec:
+    roll = rng.random()
+    for weight, factory in mix:
+        roll -= weight
+        if roll <= 0:
+            return factory(rng, vehicle_count)
+    return mix[-1][1](rng, vehicle_count)
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+async def run_benchmark(
+    mix_name: str,
+    total_requests: int,
+    concurrency: int,
+    vehicle_count: int,
+    base_url: Optional[str] = None,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """Issue total_requests from the named mix with bounded concurrency"""
+    mix = MIXES[mix_name]
+    rng = random.Random(seed)
+    specs = [_pick(mix, rng, vehicle_count) for _ in range(total_requests)]
+    per_label: Dict[str, List[float]] = {}
+    label_errors: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for spec in specs:
+        queue.put_nowait(spec)
+
+    if base_url:
+        transport = None
+        client_kwargs = {"base_url": base_url}
+    else:
+        from server import app, startup_event, shutdown_event
+        from rate_limit import submission_guard
+        # Every in-process request comes from one address; measure the write path, not the limiter
+        submission_guard.enabled = False
+        transport = httpx.ASGITransport(app=app)
+        client_kwargs = {"base_url": "http://benchmark", "transport": transport}
+        await startup_event()
+        if os.environ.get('MONGO_URL', '').startswith("mongomock://"):
+            from synthetic_data import generate_dataset
+            await generate_dataset(vehicle_count, drop=True)
+
+    async def worker(client: httpx.AsyncClient):
+        while True:
+            try:
+                label, method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            per_label.setdefault(label, []).append(time.perf_counter() - started)
+            if failed:
+                label_errors[label] = label_errors.get(label, 0) + 1
+
+    try:
+        async with httpx.AsyncClient(timeout=30, **client_kwargs) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    finally:
+        if transport is not None:
+            await shutdown_event()
+
+    all_latencies = [latency for latencies in per_label.values() for latency in latencies]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "mix": mix_name,
+            "requests": total_requests,
+            "concurrency": concurrency,
+            "vehicle_count": vehicle_count,
+            "target": base_url or "in-process",
+            "seed": seed,
+        },
+        "total": summarize(all_latencies, sum(label_errors.values()), elapsed),
+        "endpoints": {
+            label: summarize(latencies, label_errors.get(label, 0), elapsed)
+            for label, latencies in sorted(per_label.items())
+        },
+    }
+
+def serialization_benchmark(items: int = 100, rounds: int = 200) -> Dict[str, Any]:
+    """Per-item cost of rendering a vehicle list the old way versus the fast path.
+
+    The old path builds models, then re-validates and encodes them the way
+    FastAPI's response_model handling does; the fast path validates the raw
+    documents once and encodes them in pydantic-core.
+    """
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from models import Vehicle
+    from serialization import encode_documents
+    from synthetic_data import generate_vehicles
+
+    docs = list(generate_vehicles(items, random.Random(0), datetime.utcnow()))
+    response_adapter = TypeAdapter(List[Vehicle])
+
+    def old_path() -> bytes:
+        models = [Vehicle(**doc) for doc in docs]
+        validated = response_adapter.validate_python([model.model_dump() for model in models])
+        content = jsonable_encoder(response_adapter.dump_python(validated, mode="json"))
+        return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def fast_path() -> bytes:
+        return encode_documents(Vehicle, docs)
+
+    results = {}
+    for name, render in (("before", old_path), ("after", fast_path)):
+        render()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = render()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "us_per_item": round(elapsed / (rounds * items) * 1_000_000, 3),
+            "ms_per_response": round(elapsed / rounds * 1000, 3),
+            "bytes": len(body),
+        }
+    results["speedup"] = round(results["before"]["us_per_item"] / results["after"]["us_per_item"], 2)
+    results["items"] = items
+    results["rounds"] = rounds
+    return results
+
+def compression_benchmark(sizes: Tuple[int, ...] = (10, 50, 100), rounds: int = 50) -> Dict[str, Any]:
+    """CPU time against bytes saved for each encoding and level, on vehicle lists of several sizes.
+
+    ``us_per_kb_saved`` is the cost of each kilobyte removed from the wire; the
+    middleware pays it per response, cached entries once per store.
+    """
+    import gzip
+    from compression import brotli
+    from models import Vehicle
+    from serialization import encode_documents
+    from synthetic_data import generate_vehicles
+
+    encoders: List[Tuple[str, Callable[[bytes], bytes]]] = [
+        (f"gzip-{level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+        for level in (1, 6, 9)
+    ]
+    if brotli is not None:
+        encoders += [
+            (f"br-{quality}", lambda body, quality=quality: brotli.compress(body, quality=quality))
+            for quality in (1, 5, 9, 11)
+        ]
+
+    results: Dict[str, Any] = {"rounds": rounds, "lists": {}}
+    for items in sizes:
+        body = encode_documents(Vehicle, list(generate_vehicles(items, random.Random(0), datetime.utcnow())))
+        rows = {}
+        for name, encode in encoders:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                encoded = encode(body)
+            elapsed = time.perf_counter() - started
+            saved = len(body) - len(encoded)
+            rows[name] = {
+                "ms_per_response": round(elapsed / rounds * 1000, 3),
+                "bytes": len(encoded),
+                "ratio": round(len(encoded) / len(body), 3),
+                "us_per_kb_saved": round(elapsed / rounds * 1_000_000 / (saved / 1024), 2) if saved > 0 else None,
+            }
+        results["lists"][f"{items} vehicles"] = {"identity_bytes": len(body), "encodings": rows}
+    return results
+
+def recommendation_benchmark(items: int = 20_000, queries: int = 10_000, changes: int = 20) -> Dict[str, Any]:
+    """Similarity index build time, top-k query latency and incremental refresh cost"""
+    from recommendations import SimilarityIndex, apply_changes, build_state
+    from synthetic_data import generate_vehicles
+
+    rng = random.Random(0)
+    docs = [doc for doc in generate_vehicles(items, rng, datetime.utcnow()) if doc["is_available"]]
+
+    started = time.perf_counter()
+    state = build_state(docs)
+    build_seconds = time.perf_counter() - started
+
+    index = SimilarityIndex()
+    index._state = state
+    lookups = [rng.choice(docs)["id"] for _ in range(queries)]
+    timings = []
+    for vehicle_id in lookups:
+        started = time.perf_counter()
+        index.similar(vehicle_id, 6)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+
+    changed = [dict(doc, year=doc["year"] - 1) for doc in rng.sample(docs, changes)]
+    started = time.perf_counter()
+    apply_changes(state, changed)
+    refresh_seconds = time.perf_counter() - started
+
+    return {
+        "vehicles": len(docs),
+        "build_seconds": round(build_seconds, 3),
+        "query_p50_us": round(timings[len(timings) // 2], 2),
+        "query_p99_us": round(timings[int(len(timings) * 0.99)], 2),
+        f"refresh_{changes}_changes_ms": round(refresh_seconds * 1000, 2),
+    }
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+    """List regressions: p99 latency up or throughput down by more than tolerance"""
+    regressions = []
+    pairs = [("total", baseline["total"], current["total"])]
+    pairs += [
+        (label, baseline["endpoints"][label], stats)
+        for label, stats in current["endpoints"].items()
+        if label in baseline["endpoints"]
+    ]
+    for label, before, after in pairs:
+        if before["p99_ms"] and after["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {before['p99_ms']}ms -> {after['p99_ms']}ms")
+        if label == "total" and before["rps"] and after["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['rps']} -> {after['rps']} req/s")
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{label}: errors {before['errors']} -> {after['errors']}")
+    return regressions
@@ -0,0 +1,152 @@
+from fastapi import Request, Response
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+import os
+import time
+
+from conditional import conditional_response
+from compression import negotiate, precompress
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+    # Content-Encoding -> compressed body, built once when the entry is stored
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.encoded.values())
+
+    def to_response(self, request: Optional[Request] = None) -> Response:
+        if request is not None:
+            not_modified = conditional_response(request, self.headers)
+            if not_modified:
+                return not_modified
+        if not self.encoded:
+            return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+        headers = {**self.headers, "Vary": "Accept-Encoding"}
+        coding = negotiate(request.headers.get("accept-encoding"), self.encoded) if request is not None else None
+        if coding is None:
+            return Response(content=self.body, media_type="application/json", headers=headers)
+        headers["Content-Encoding"] = coding
+        return Response(content=self.encoded[coding], media_type="application/json", headers=headers)
+
+class ResponseCache:
+    """TTL + LRU cache of serialized JSON responses, bounded by entry count and bytes.
+
+    Entries are grouped by namespace (one per collection) so a write can drop
+    everything derived from that collection in one call.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(namespace: str, params: Mapping[str, Any]) -> Tuple[str, Hashable]:
+        """Build a key from query parameters, ignoring order and unset values"""
+        normalized = tuple(sorted(
+            (name, value.value if hasattr(value, "value") else value)
+            for name, value in params.items()
+            if value is not None
+        ))
+        return namespace, normalized
+
+    def get(self, key: Tuple[str, Hashable]) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(
+        self,
+        key: Tuple[str, Hashable],
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        request: Optional[Request] = None,
+    ) -> Response:
+        """Cache an encoded JSON body, with its compressed forms, and return it as a response"""
+        return self.put(key, body, headers).to_response(request)
+
+    def put(self, key: Tuple[str, Hashable], body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Cache an encoded JSON body and return the entry"""
+        entry = CachedResponse(body=body, headers=dict(headers or {}), expires_at=time.monotonic() + self.ttl_seconds)
+        if self.enabled:
+            # Compressed once here so hits never pay for compression again
+            entry.encoded = precompress(body)
+            if entry.size <= self.max_bytes:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = entry
+                self._bytes += entry.size
+                self._evict()
+        return entry
+
+    def invalidate(self, *namespaces: str):
+        """Drop every entry belonging to the given namespaces"""
+        stale = [key for key in self._entries if key[0] in namespaces]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: Tuple[str, Hashable]):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+# Shared cache for the public catalog endpoints
+catalog_cache = ResponseCache(
+    ttl_seconds=float(os.environ.get('CATALOG_CACHE_TTL', '60')),
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '1024')),
+    max_bytes=int(os.environ.get('CATALOG_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+)
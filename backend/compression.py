@@ -0,0 +1,150 @@
+"""gzip and brotli encoding helpers, Accept-Encoding negotiation and the
+response compression middleware.
+
+Brotli is optional: without the ``brotli`` package only gzip is offered.
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+import gzip
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from metrics import compression_duration, compression_saved_bytes
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+# Bodies smaller than this gain too little to be worth the CPU
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+
+def _gzip(body: bytes, level: int = GZIP_LEVEL) -> bytes:
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def _brotli(body: bytes, quality: int = BROTLI_QUALITY) -> bytes:
+    return brotli.compress(body, quality=quality)
+
+# Content-Encoding -> (encoder, file suffix), most preferred first
+ENCODERS: Dict[str, Tuple[Callable[..., bytes], str]] = {}
+if brotli is not None:
+    ENCODERS["br"] = (_brotli, ".br")
+ENCODERS["gzip"] = (_gzip, ".gz")
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def negotiate(accept_encoding: Optional[str], available=None) -> Optional[str]:
+    """The preferred encoding the client accepts, or None for identity"""
+    accepted = accepted_encodings(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in (available if available is not None else ENCODERS):
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def compress(body: bytes, coding: str) -> bytes:
+    return ENCODERS[coding][0](body)
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Every offered encoding of a body worth compressing, for storing next to it"""
+    if not COMPRESSION_ENABLED or len(body) < COMPRESSION_MIN_SIZE:
+        return {}
+    return {coding: compress(body, coding) for coding in ENCODERS}
+
+# Media types worth compressing; images are already compressed
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+
+def _add_vary(headers: MutableHeaders):
+    vary = [value.strip() for value in headers.get("vary", "").split(",") if value.strip()]
+    if "accept-encoding" not in (value.lower() for value in vary):
+        vary.append("Accept-Encoding")
+    headers["Vary"] = ", ".join(vary)
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete JSON and text responses.
+
+    Responses that already carry a Content-Encoding (cached entries with a
+    precompressed body, snapshot files) pass through untouched, as do
+    streamed bodies such as the lead feed and exports, which must reach the
+    client chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        state = {"start": None, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if "content-encoding" in headers or media_type not in _COMPRESSIBLE_TYPES:
+                    await send(message)
+                    return
+                _add_vary(headers)
+                if coding is None or message["status"] in (204, 304):
+                    await send(message)
+                    return
+                # Hold the headers until the body shows whether it is complete
+                state["start"] = message
+                return
+
+            start = state["start"]
+            if message["type"] != "http.response.body" or start is None or state["streaming"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                state["streaming"] = True
+                await send(start)
+                await send(message)
+                return
+
+            state["start"] = None
+            if len(body) >= self.minimum_size:
+                started = time.perf_counter()
+                encoded = compress(body, coding)
+                compression_duration.observe(time.perf_counter() - started, coding)
+                compression_saved_bytes.inc(coding, amount=len(body) - len(encoded))
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(encoded))
+                message = {**message, "body": encoded}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,79 @@
+from fastapi import Request, Response
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+import hashlib
+
+# Fields whose values change whenever a document's public representation does
+VEHICLE_VERSION_FIELDS = ("id", "updated_at", "is_available")
+TESTIMONIAL_VERSION_FIELDS = ("id", "created_at", "approved_at", "is_approved", "image_id")
+
+# Browsers and CDNs may store the response but must revalidate before reuse
+CACHE_CONTROL = "no-cache"
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def compute_validators(
+    docs: Iterable[Mapping[str, Any]],
+    fields: Sequence[str],
+    extra: str = "",
+    last_modified: bool = True,
+) -> Dict[str, str]:
+    """Build ETag/Last-Modified headers from the version fields of the documents.
+
+    Only ids and timestamps are digested, never the serialized body, so this
+    is cheap enough to run before any model is constructed. Lists pass
+    ``last_modified=False``: the newest timestamp on a page does not move when
+    a document is deleted, sold or filtered out, but the ETag over its ids does.
+    """
+    digest = hashlib.blake2b(extra.encode(), digest_size=12)
+    newest: Optional[datetime] = None
+    for doc in docs:
+        for name in fields:
+            value = doc.get(name)
+            if isinstance(value, datetime):
+                value = _to_utc(value)
+                if newest is None or value > newest:
+                    newest = value
+            digest.update(f"{value}|".encode())
+        digest.update(b";")
+
+    headers = {"ETag": f'W/"{digest.hexdigest()}"', "Cache-Control": CACHE_CONTROL}
+    if last_modified and newest is not None:
+        headers["Last-Modified"] = format_datetime(newest.replace(microsecond=0), usegmt=True)
+    return headers
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against our validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers.get("ETag")
+        if not etag:
+            return False
+        candidates = [_strip_weak(tag) for tag in if_none_match.split(",")]
+        return "*" in candidates or _strip_weak(etag) in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def not_modified_response(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
+
+def conditional_response(request: Request, headers: Mapping[str, str]) -> Optional[Response]:
+    """Return a 304 response if the client's copy is still current"""
+    if request.method in ("GET", "HEAD") and is_not_modified(request, headers):
+        return not_modified_response(headers)
+    return None
@@ -1,269 +1,512 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+from pymongo.read_preferences import (
+    Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+)
 from datetime import datetime
+from typing import Any, Dict, Optional
+import asyncio
 import os
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
 
+from metrics import MongoCommandListener
+from models import search_terms_for
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Startup behaviour: "background" builds indexes while the app already serves,
+# "blocking" waits for them before the first request
+DB_STARTUP_MODE = os.environ.get('DB_STARTUP_MODE', 'background')
+SEED_ON_STARTUP = os.environ.get('SEED_ON_STARTUP', 'false').lower() == 'true'
+
+# Connection pool settings, per worker process. Unset values keep the driver defaults.
+_CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    # e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+    "compressors": ("MONGO_COMPRESSORS", str),
+    "zlibCompressionLevel": ("MONGO_ZLIB_COMPRESSION_LEVEL", int),
+}
+
+_READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Public catalog reads may go to secondaries; writes and admin reads stay on the primary
+CATALOG_READ_PREFERENCE = os.environ.get('MONGO_CATALOG_READ_PREFERENCE', 'primary')
+CATALOG_MAX_STALENESS = int(os.environ.get('MONGO_CATALOG_MAX_STALENESS_SECONDS', '-1'))
+
+def client_options() -> Dict[str, Any]:
+    options = {}
+    for option, (variable, parse) in _CLIENT_OPTIONS.items():
+        value = os.environ.get(variable)
+        if value:
+            options[option] = parse(value)
+    return options
+
+def read_preference(name: str, max_staleness: int = -1):
+    """A pymongo read preference from its mode name"""
+    if name not in _READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference '{name}'")
+    if name == "primary":
+        return Primary()
+    return _READ_PREFERENCES[name](max_staleness=max_staleness)
+
+# MongoDB connection, created on first use inside the running event loop
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        mongo_url = os.environ['MONGO_URL']
+        if mongo_url.startswith("mongomock://"):
+            # In-memory stand-in for benchmarks and local experiments (optional dependency)
+            from mongomock_motor import AsyncMongoMockClient
+            _client = AsyncMongoMockClient()
+        else:
+            _client = AsyncIOMotorClient(
+                mongo_url, event_listeners=[MongoCommandListener()], **client_options()
+            )
+    return _client
+
+def get_database():
+    return get_client()[os.environ['DB_NAME']]
+
+class LazyCollection:
+    """Module-level handle for a collection that resolves the client on first use"""
+
+    def __init__(self, name: str, read_preference=None):
+        self.name = name
+        self.read_preference_override = read_preference
+
+    def __getattr__(self, attribute):
+        if self.read_preference_override is None:
+            collection = get_database()[self.name]
+        else:
+            collection = get_database().get_collection(self.name, read_preference=self.read_preference_override)
+        return getattr(collection, attribute)
+
+class _LazyDatabase:
+    """``db.<name>`` and ``db[name]`` hand out lazy collection handles"""
+
+    def __getattr__(self, name: str) -> LazyCollection:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return LazyCollection(name)
+
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(name)
+
+db = _LazyDatabase()
 
 # Collections
 contact_submissions = db.contact_submissions
 car_inquiries = db.car_inquiries
 testimonials = db.testimonials
 vehicles = db.vehicles
+images = db.images
+rate_limits = db.rate_limits
+submission_keys = db.submission_keys
+contact_submissions_archive = db.contact_submissions_archive
+car_inquiries_archive = db.car_inquiries_archive
+job_leases = db.job_leases
+
+# Handles for the public catalog's read path
+catalog_read_preference = read_preference(CATALOG_READ_PREFERENCE, CATALOG_MAX_STALENESS)
+catalog_vehicles = LazyCollection("vehicles", catalog_read_preference)
+catalog_testimonials = LazyCollection("testimonials", catalog_read_preference)
+
+# Index definitions per collection, shaped after each endpoint's filter + sort:
+# equality fields first, then the sort key, with id as the pagination tie-breaker
+INDEX_SPECS = {
+    "contact_submissions": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("submitted_at", -1), ("id", -1)]),
+        IndexModel([("status", 1), ("submitted_at", -1), ("id", -1)]),
+    ],
+    "car_inquiries": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("submitted_at", -1), ("id", -1)]),
+        IndexModel([("status", 1), ("submitted_at", -1), ("id", -1)]),
+        IndexModel([("car_id", 1), ("submitted_at", -1), ("id", -1)]),
+    ],
+    "testimonials": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("is_approved", 1), ("created_at", -1)]),
+        IndexModel([("created_at", -1)]),
+    ],
+    "vehicles": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("created_at", -1), ("id", -1)]),
+        IndexModel([("is_available", 1), ("created_at", -1), ("id", -1)]),
+        IndexModel([("is_available", 1), ("is_featured", 1), ("created_at", -1), ("id", -1)]),
+        IndexModel([("category", 1), ("is_available", 1), ("created_at", -1), ("id", -1)]),
+        IndexModel([("category", 1), ("is_available", 1), ("is_featured", 1), ("created_at", -1), ("id", -1)]),
+        IndexModel([("brand", 1)]),
+        IndexModel([("year", -1)]),
+        # One-word search: anchored prefix match on the multikey word list
+        IndexModel([("search_terms", 1), ("is_available", 1)]),
+        # Similarity index refresh polls for recently changed vehicles
+        IndexModel([("updated_at", 1)]),
+        # Catalog search sorts
+        IndexModel([("category", 1), ("is_available", 1), ("price_cents", 1), ("id", 1)]),
+        IndexModel([("category", 1), ("is_available", 1), ("mileage_km", 1), ("id", 1)]),
+        IndexModel([("category", 1), ("is_available", 1), ("year", -1), ("id", -1)]),
+        IndexModel([("category", 1), ("is_available", 1), ("brand", 1), ("id", 1)]),
+        IndexModel(
+            [("brand", "text"), ("model", "text"), ("type", "text"), ("features", "text"), ("description", "text")],
+            weights={"brand": 10, "model": 10, "type": 5, "features": 2, "description": 1},
+            name="vehicle_text_search"
+        ),
+    ],
+    "images": [
+        IndexModel([("id", 1)], unique=True),
+    ],
+    "inquiry_rollups": [
+        IndexModel([("day", 1), ("car_id", 1)]),
+        IndexModel([("car_id", 1), ("day", 1)]),
+    ],
+    # Shared rate-limit state (RATE_LIMIT_BACKEND=mongo) expires on its own
+    "rate_limits": [
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+    "submission_keys": [
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+    # Archived leads (LEAD_ARCHIVE_TARGET=collection); expires_at is only set
+    # when LEAD_ARCHIVE_TTL_DAYS is, otherwise they are kept
+    "contact_submissions_archive": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("submitted_at", -1), ("id", -1)]),
+        IndexModel([("email", 1), ("submitted_at", -1), ("id", -1)]),
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+    "car_inquiries_archive": [
+        IndexModel([("id", 1)], unique=True),
+        IndexModel([("submitted_at", -1), ("id", -1)]),
+        IndexModel([("customer_email", 1), ("submitted_at", -1), ("id", -1)]),
+        IndexModel([("car_id", 1), ("submitted_at", -1), ("id", -1)]),
+        IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+    ],
+}
+
+class IndexBuild:
+    """Progress of the startup index build, reported by the readiness probe"""
 
-async def init_database():
-    """Initialize database with indexes and seed data"""
+    def __init__(self):
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        """Built, or given up on; a failed build leaves queries working, just slower"""
+        return self.status in ("ready", "failed")
+
+    def summary(self) -> Dict[str, Any]:
+        return {"status": self.status, "error": self.error, "seconds": self.seconds}
+
+index_build = IndexBuild()
+
+async def create_indexes():
+    """Create every index in INDEX_SPECS, one createIndexes command per collection, concurrently"""
+    await asyncio.gather(*(
+        db[collection_name].create_indexes(indexes)
+        for collection_name, indexes in INDEX_SPECS.items()
+    ))
+
+async def _build_indexes():
+    index_build.status = "building"
+    started = asyncio.get_running_loop().time()
     try:
-        # Create indexes
-        await contact_submissions.create_index([("submitted_at", -1)])
-        await contact_submissions.create_index([("status", 1)])
-        
-        await car_inquiries.create_index([("submitted_at", -1)])
-        await car_inquiries.create_index([("status", 1)])
-        await car_inquiries.create_index([("car_id", 1)])
-        
-        await testimonials.create_index([("is_approved", 1)])
-        await testimonials.create_index([("created_at", -1)])
-        
-        await vehicles.create_index([("category", 1)])
-        await vehicles.create_index([("is_available", 1)])
-        await vehicles.create_index([("is_featured", 1)])
-        await vehicles.create_index([("brand", 1)])
-        await vehicles.create_index([("year", -1)])
-        
+        await create_indexes()
+        index_build.status = "ready"
         logger.info("Database indexes created successfully")
-        
-        # Seed initial data if collections are empty
-        await seed_initial_data()
-        
     except Exception as e:
-        logger.error(f"Error initializing database: {e}")
+        index_build.status = "failed"
+        index_build.error = str(e)
+        logger.error(f"Error creating database indexes: {e}")
+    finally:
+        index_build.seconds = round(asyncio.get_running_loop().time() - started, 3)
+
+async def init_database(mode: str = DB_STARTUP_MODE):
+    """Start the index build and, if SEED_ON_STARTUP is set, seed empty collections.
+
+    In background mode this returns at once and the readiness probe reports
+    when the indexes are in place.
+    """
+    index_build.task = asyncio.create_task(_build_indexes())
+    if mode == "blocking":
+        await index_build.task
+    if SEED_ON_STARTUP:
+        await seed_initial_data()
+
+def initial_testimonials():
+    """Testimonials the site launched with"""
+    return [
+        {
+            "id": "test-1",
+            "name": "Sarah L.",
+            "email": "sarah.l@example.com",
+            "image": "https://images.unsplash.com/photo-1494790108755-2616b152c5d6?w=200&h=200&fit=crop&crop=face",
+            "rating": 5,
+            "quote": "Working with Ben was a game-changer. He listened to my needs and found the exact car I wanted without any pressure. Highly recommend!",
+            "car_purchased": "2024 BMW X5",
+            "is_approved": True,
+            "created_at": datetime.utcnow(),
+            "approved_at": datetime.utcnow()
+        },
+        {
+            "id": "test-2",
+            "name": "Mark T.",
+            "email": "mark.t@example.com",
+            "image": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=200&h=200&fit=crop&crop=face",
+            "rating": 5,
+            "quote": "The process was incredibly smooth from start to finish. Ben is knowledgeable, professional, and genuinely cares about his customers.",
+            "car_purchased": "2023 Mercedes C-Class",
+            "is_approved": True,
+            "created_at": datetime.utcnow(),
+            "approved_at": datetime.utcnow()
+        },
+        {
+            "id": "test-3",
+            "name": "Jessica R.",
+            "email": "jessica.r@example.com",
+            "image": "https://images.unsplash.com/photo-1438761681033-6461ffad8d80?w=200&h=200&fit=crop&crop=face",
+            "rating": 5,
+            "quote": "I've bought several cars over the years, and this was by far the best experience. Transparent pricing and excellent follow-up.",
+            "car_purchased": "2024 Audi Q7",
+            "is_approved": True,
+            "created_at": datetime.utcnow(),
+            "approved_at": datetime.utcnow()
+        },
+        {
+            "id": "test-4",
+            "name": "David M.",
+            "email": "david.m@example.com",
+            "image": "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=200&h=200&fit=crop&crop=face",
+            "rating": 5,
+            "quote": "Ben made car buying stress-free. His expertise and honest approach helped me make the right decision with confidence.",
+            "car_purchased": "2024 Porsche 911",
+            "is_approved": True,
+            "created_at": datetime.utcnow(),
+            "approved_at": datetime.utcnow()
+        },
+        {
+            "id": "test-5",
+            "name": "Lisa K.",
+            "email": "lisa.k@example.com",
+            "image": "https://images.unsplash.com/photo-1489424731084-a5d8b219a5bb?w=200&h=200&fit=crop&crop=face",
+            "rating": 5,
+            "quote": "Exceptional service from start to finish. Ben went above and beyond to ensure I got exactly what I was looking for.",
+            "car_purchased": "2023 Lexus RX",
+            "is_approved": True,
+            "created_at": datetime.utcnow(),
+            "approved_at": datetime.utcnow()
+        }
+    ]
+
+def initial_vehicles():
+    """Vehicle inventory the site launched with"""
+    return [
+        # New Cars
+        {
+            "id": "new-1",
+            "year": 2025,
+            "brand": "Mercedes-Benz",
+            "model": "S-Class",
+            "type": "Luxury Sedan",
+            "category": "new",
+            "image_url": "https://images.unsplash.com/photo-1563720223185-11003d516935?w=600&h=400&fit=crop",
+            "features": "Cutting-edge technology, unparalleled comfort, dynamic performance",
+            "price": "Starting at $115,000",
+            "price_cents": 11500000,
+            "mileage_km": None,
+            "description": "Experience the pinnacle of luxury with the 2025 Mercedes-Benz S-Class, featuring advanced driver assistance and premium amenities.",
+            "is_available": True,
+            "is_featured": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "new-2",
+            "year": 2025,
+            "brand": "BMW",
+            "model": "iX",
+            "type": "Electric SUV",
+            "category": "new",
+            "image_url": "https://images.unsplash.com/photo-1609521263047-f8f205293f24?w=600&h=400&fit=crop",
+            "features": "Zero emissions, spacious interior, advanced safety suite",
+            "price": "Starting at $87,500",
+            "price_cents": 8750000,
+            "mileage_km": None,
+            "description": "The future of sustainable luxury driving with the BMW iX, combining electric performance with premium comfort.",
+            "is_available": True,
+            "is_featured": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "new-3",
+            "year": 2025,
+            "brand": "Porsche",
+            "model": "911 Turbo",
+            "type": "Sports Coupe",
+            "category": "new",
+            "image_url": "https://images.unsplash.com/photo-1544829099-b9a0c5303bea?w=600&h=400&fit=crop",
+            "features": "Exhilarating speed, precision handling, iconic design",
+            "price": "Starting at $174,300",
+            "price_cents": 17430000,
+            "mileage_km": None,
+            "description": "Unleash pure performance with the legendary Porsche 911 Turbo, engineered for driving enthusiasts.",
+            "is_available": True,
+            "is_featured": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "new-4",
+            "year": 2025,
+            "brand": "Audi",
+            "model": "A8",
+            "type": "Executive Sedan",
+            "category": "new",
+            "image_url": "https://images.unsplash.com/photo-1606664515524-ed2f786a0bd6?w=600&h=400&fit=crop",
+            "features": "Advanced quattro all-wheel drive, premium materials, innovative technology",
+            "price": "Starting at $96,500",
+            "price_cents": 9650000,
+            "mileage_km": None,
+            "description": "Sophisticated luxury meets cutting-edge innovation in the 2025 Audi A8.",
+            "is_available": True,
+            "is_featured": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        # Used Cars
+        {
+            "id": "used-1",
+            "year": 2022,
+            "brand": "BMW",
+            "model": "5 Series",
+            "type": "Premium Sedan",
+            "category": "used",
+            "image_url": "https://images.unsplash.com/photo-1555215695-3004980ad54e?w=600&h=400&fit=crop",
+            "mileage": "35,000 km",
+            "features": "One owner, full service history, luxurious interior",
+            "price": "$52,900",
+            "price_cents": 5290000,
+            "mileage_km": 35000,
+            "description": "Meticulously maintained BMW 5 Series with complete service records and premium features.",
+            "is_available": True,
+            "is_featured": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "used-2",
+            "year": 2021,
+            "brand": "Audi",
+            "model": "Q5",
+            "type": "Compact SUV",
+            "category": "used",
+            "image_url": "https://images.unsplash.com/photo-1549317661-bd32c8ce0db2?w=600&h=400&fit=crop",
+            "mileage": "50,000 km",
+            "features": "Fuel-efficient, versatile, perfect for city driving",
+            "price": "$41,500",
+            "price_cents": 4150000,
+            "mileage_km": 50000,
+            "description": "Reliable and efficient Audi Q5, ideal for both urban commuting and weekend adventures.",
+            "is_available": True,
+            "is_featured": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "used-3",
+            "year": 2020,
+            "brand": "Mercedes-Benz",
+            "model": "C 43 AMG",
+            "type": "Performance Sedan",
+            "category": "used",
+            "image_url": "https://images.unsplash.com/photo-1618843479313-40f8afb4b4d8?w=600&h=400&fit=crop",
+            "mileage": "28,000 km",
+            "features": "Certified pre-owned, sport package, pristine condition",
+            "price": "$48,750",
+            "price_cents": 4875000,
+            "mileage_km": 28000,
+            "description": "Certified pre-owned AMG with sport package, delivering performance and luxury in perfect harmony.",
+            "is_available": True,
+            "is_featured": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        },
+        {
+            "id": "used-4",
+            "year": 2021,
+            "brand": "Lexus",
+            "model": "RX 350",
+            "type": "Luxury SUV",
+            "category": "used",
+            "image_url": "https://images.unsplash.com/photo-1590362891991-f776e747a588?w=600&h=400&fit=crop",
+            "mileage": "42,000 km",
+            "features": "Hybrid efficiency, premium interior, advanced safety features",
+            "price": "$45,200",
+            "price_cents": 4520000,
+            "mileage_km": 42000,
+            "description": "Premium Lexus RX 350 combining luxury comfort with exceptional reliability and fuel efficiency.",
+            "is_available": True,
+            "is_featured": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+    ]
 
 async def seed_initial_data():
     """Seed database with initial mock data"""
     try:
         # Seed testimonials if empty
         if await testimonials.count_documents({}) == 0:
-            testimonials_data = [
-                {
-                    "id": "test-1",
-                    "name": "Sarah L.",
-                    "email": "sarah.l@example.com",
-                    "image": "https://images.unsplash.com/photo-1494790108755-2616b152c5d6?w=200&h=200&fit=crop&crop=face",
-                    "rating": 5,
-                    "quote": "Working with Ben was a game-changer. He listened to my needs and found the exact car I wanted without any pressure. Highly recommend!",
-                    "car_purchased": "2024 BMW X5",
-                    "is_approved": True,
-                    "created_at": datetime.utcnow(),
-                    "approved_at": datetime.utcnow()
-                },
-                {
-                    "id": "test-2",
-                    "name": "Mark T.",
-                    "email": "mark.t@example.com",
-                    "image": "https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=200&h=200&fit=crop&crop=face",
-                    "rating": 5,
-                    "quote": "The process was incredibly smooth from start to finish. Ben is knowledgeable, professional, and genuinely cares about his customers.",
-                    "car_purchased": "2023 Mercedes C-Class",
-                    "is_approved": True,
-                    "created_at": datetime.utcnow(),
-                    "approved_at": datetime.utcnow()
-                },
-                {
-                    "id": "test-3",
-                    "name": "Jessica R.",
-                    "email": "jessica.r@example.com",
-                    "image": "https://images.unsplash.com/photo-1438761681033-6461ffad8d80?w=200&h=200&fit=crop&crop=face",
-                    "rating": 5,
-                    "quote": "I've bought several cars over the years, and this was by far the best experience. Transparent pricing and excellent follow-up.",
-                    "car_purchased": "2024 Audi Q7",
-                    "is_approved": True,
-                    "created_at": datetime.utcnow(),
-                    "approved_at": datetime.utcnow()
-                },
-                {
-                    "id": "test-4",
-                    "name": "David M.",
-                    "email": "david.m@example.com",
-                    "image": "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=200&h=200&fit=crop&crop=face",
-                    "rating": 5,
-                    "quote": "Ben made car buying stress-free. His expertise and honest approach helped me make the right decision with confidence.",
-                    "car_purchased": "2024 Porsche 911",
-                    "is_approved": True,
-                    "created_at": datetime.utcnow(),
-                    "approved_at": datetime.utcnow()
-                },
-                {
-                    "id": "test-5",
-                    "name": "Lisa K.",
-                    "email": "lisa.k@example.com",
-                    "image": "https://images.unsplash.com/photo-1489424731084-a5d8b219a5bb?w=200&h=200&fit=crop&crop=face",
-                    "rating": 5,
-                    "quote": "Exceptional service from start to finish. Ben went above and beyond to ensure I got exactly what I was looking for.",
-                    "car_purchased": "2023 Lexus RX",
-                    "is_approved": True,
-                    "created_at": datetime.utcnow(),
-                    "approved_at": datetime.utcnow()
-                }
-            ]
-            await testimonials.insert_many(testimonials_data)
+            await testimonials.insert_many(initial_testimonials())
             logger.info("Testimonials seeded successfully")
         
         # Seed vehicles if empty
         if await vehicles.count_documents({}) == 0:
-            vehicles_data = [
-                # New Cars
-                {
-                    "id": "new-1",
-                    "year": 2025,
-                    "brand": "Mercedes-Benz",
-                    "model": "S-Class",
-                    "type": "Luxury Sedan",
-                    "category": "new",
-                    "image_url": "https://images.unsplash.com/photo-1563720223185-11003d516935?w=600&h=400&fit=crop",
-                    "features": "Cutting-edge technology, unparalleled comfort, dynamic performance",
-                    "price": "Starting at $115,000",
-                    "description": "Experience the pinnacle of luxury with the 2025 Mercedes-Benz S-Class, featuring advanced driver assistance and premium amenities.",
-                    "is_available": True,
-                    "is_featured": True,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "new-2",
-                    "year": 2025,
-                    "brand": "BMW",
-                    "model": "iX",
-                    "type": "Electric SUV",
-                    "category": "new",
-                    "image_url": "https://images.unsplash.com/photo-1609521263047-f8f205293f24?w=600&h=400&fit=crop",
-                    "features": "Zero emissions, spacious interior, advanced safety suite",
-                    "price": "Starting at $87,500",
-                    "description": "The future of sustainable luxury driving with the BMW iX, combining electric performance with premium comfort.",
-                    "is_available": True,
-                    "is_featured": True,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "new-3",
-                    "year": 2025,
-                    "brand": "Porsche",
-                    "model": "911 Turbo",
-                    "type": "Sports Coupe",
-                    "category": "new",
-                    "image_url": "https://images.unsplash.com/photo-1544829099-b9a0c5303bea?w=600&h=400&fit=crop",
-                    "features": "Exhilarating speed, precision handling, iconic design",
-                    "price": "Starting at $174,300",
-                    "description": "Unleash pure performance with the legendary Porsche 911 Turbo, engineered for driving enthusiasts.",
-                    "is_available": True,
-                    "is_featured": False,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "new-4",
-                    "year": 2025,
-                    "brand": "Audi",
-                    "model": "A8",
-                    "type": "Executive Sedan",
-                    "category": "new",
-                    "image_url": "https://images.unsplash.com/photo-1606664515524-ed2f786a0bd6?w=600&h=400&fit=crop",
-                    "features": "Advanced quattro all-wheel drive, premium materials, innovative technology",
-                    "price": "Starting at $96,500",
-                    "description": "Sophisticated luxury meets cutting-edge innovation in the 2025 Audi A8.",
-                    "is_available": True,
-                    "is_featured": False,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                # Used Cars
-                {
-                    "id": "used-1",
-                    "year": 2022,
-                    "brand": "BMW",
-                    "model": "5 Series",
-                    "type": "Premium Sedan",
-                    "category": "used",
-                    "image_url": "https://images.unsplash.com/photo-1555215695-3004980ad54e?w=600&h=400&fit=crop",
-                    "mileage": "35,000 km",
-                    "features": "One owner, full service history, luxurious interior",
-                    "price": "$52,900",
-                    "description": "Meticulously maintained BMW 5 Series with complete service records and premium features.",
-                    "is_available": True,
-                    "is_featured": True,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "used-2",
-                    "year": 2021,
-                    "brand": "Audi",
-                    "model": "Q5",
-                    "type": "Compact SUV",
-                    "category": "used",
-                    "image_url": "https://images.unsplash.com/photo-1549317661-bd32c8ce0db2?w=600&h=400&fit=crop",
-                    "mileage": "50,000 km",
-                    "features": "Fuel-efficient, versatile, perfect for city driving",
-                    "price": "$41,500",
-                    "description": "Reliable and efficient Audi Q5, ideal for both urban commuting and weekend adventures.",
-                    "is_available": True,
-                    "is_featured": False,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "used-3",
-                    "year": 2020,
-                    "brand": "Mercedes-Benz",
-                    "model": "C 43 AMG",
-                    "type": "Performance Sedan",
-                    "category": "used",
-                    "image_url": "https://images.unsplash.com/photo-1618843479313-40f8afb4b4d8?w=600&h=400&fit=crop",
-                    "mileage": "28,000 km",
-                    "features": "Certified pre-owned, sport package, pristine condition",
-                    "price": "$48,750",
-                    "description": "Certified pre-owned AMG with sport package, delivering performance and luxury in perfect harmony.",
-                    "is_available": True,
-                    "is_featured": True,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                {
-                    "id": "used-4",
-                    "year": 2021,
-                    "brand": "Lexus",
-                    "model": "RX 350",
-                    "type": "Luxury SUV",
-                    "category": "used",
-                    "image_url": "https://images.unsplash.com/photo-1590362891991-f776e747a588?w=600&h=400&fit=crop",
-                    "mileage": "42,000 km",
-                    "features": "Hybrid efficiency, premium interior, advanced safety features",
-                    "price": "$45,200",
-                    "description": "Premium Lexus RX 350 combining luxury comfort with exceptional reliability and fuel efficiency.",
-                    "is_available": True,
-                    "is_featured": False,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-            ]
-            await vehicles.insert_many(vehicles_data)
+            await vehicles.insert_many([
+                {**doc, "search_terms": search_terms_for(doc)} for doc in initial_vehicles()
+            ])
             logger.info("Vehicles seeded successfully")
             
     except Exception as e:
         logger.error(f"Error seeding initial data: {e}")
 
+async def ping_database(timeout: float = 2.0) -> bool:
+    try:
+        await asyncio.wait_for(get_database().command("ping"), timeout=timeout)
+        return True
+    except Exception:
+        return False
+
 async def close_db_connection():
     """Close database connection"""
-    client.close()
\ No newline at end of file
+    global _client
+    if index_build.task and not index_build.task.done():
+        index_build.task.cancel()
+    if _client is not None:
+        _client.close()
+        _client = None
\ No newline at end of file
@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, Type, Union
+import csv
+import io
+import json
+
+from models import DataFormat
+from serialization import encode_document, to_jsonable
+
+# Media types for streamed NDJSON/CSV bodies
+MEDIA_TYPES = {
+    DataFormat.NDJSON: "application/x-ndjson",
+    DataFormat.CSV: "text/csv",
+}
+
+# Documents fetched per round-trip while streaming
+EXPORT_BATCH_SIZE = 1000
+
+def _csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Nested values (e.g. image_srcset) as JSON rather than a Python repr"""
+    return {
+        name: json.dumps(value, separators=(",", ":")) if isinstance(value, (dict, list)) else value
+        for name, value in row.items()
+    }
+
+async def stream_documents(cursor, model: Type[BaseModel], export_format: DataFormat) -> AsyncIterator[Union[str, bytes]]:
+    """Stream documents from a Motor cursor as NDJSON or CSV, one row at a time.
+
+    Only the current batch is ever held in memory, however large the export.
+    """
+    if export_format == DataFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(model.model_fields.keys()), extrasaction="ignore")
+        writer.writeheader()
+        async for doc in cursor:
+            writer.writerow(_csv_row(to_jsonable(model, doc)))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        async for doc in cursor:
+            yield encode_document(model, doc) + b"\n"
+
+def attachment_headers(name: str, export_format: DataFormat) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'}
@@ -0,0 +1,416 @@
+"""Image derivatives: each source image is ingested once, resized to WebP (and
+AVIF where the installed Pillow can encode it) in a process pool, and stored on
+local disk under the SHA-256 of the source bytes.
+
+Because a derivative's path is derived from its content, a URL never changes
+meaning and can be served with an immutable cache lifetime.
+
+Remote images are fetched only over http(s) from hosts that resolve to public
+addresses; every redirect hop is checked again, and each connection is opened
+to the address that passed the check rather than to a fresh DNS answer.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import io
+import ipaddress
+import logging
+import multiprocessing
+import os
+import re
+
+import httpcore
+import httpx
+
+from cache import catalog_cache
+from snapshots import snapshot_builder
+from database import images, testimonials, vehicles
+from models import ImageAsset, ImageStatus
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = Path(os.environ.get('IMAGE_DIR', str(ROOT_DIR / 'images')))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+IMAGE_MAX_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', str(15 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.environ.get('IMAGE_FETCH_TIMEOUT', '10'))
+IMAGE_FETCH_MAX_REDIRECTS = int(os.environ.get('IMAGE_FETCH_MAX_REDIRECTS', '3'))
+# A render still marked processing after this long is treated as abandoned
+IMAGE_RENDER_TIMEOUT = float(os.environ.get('IMAGE_RENDER_TIMEOUT', '300'))
+
+IMAGE_URL_PREFIX = "/api/images"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Variant name -> maximum width in pixels; images are never upscaled
+VARIANTS = {
+    "thumb": 160,
+    "card": 400,
+    "hero": 1200,
+}
+
+ENCODER_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 55},
+}
+MEDIA_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+# Collections whose documents carry image_url / image_id / image_srcset
+OWNERS = {
+    "vehicles": vehicles,
+    "testimonials": testimonials,
+}
+
+FETCH_SCHEMES = ("http", "https")
+
+_DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_FILE_PATTERN = re.compile(r"^(?P<variant>[a-z]+)\.(?P<format>[a-z0-9]+)$")
+
+class ImageSourceError(Exception):
+    """A remote image URL the pipeline refuses to fetch"""
+
+async def public_addresses(host: str, port: int) -> List[str]:
+    """Resolve host, refusing it if any of its addresses is not public"""
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port)
+    except OSError as e:
+        raise ImageSourceError(f"Could not resolve {host}: {e}")
+    resolved = []
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise ImageSourceError(f"{host} resolves to a non-public address")
+        resolved.append(str(address))
+    return resolved
+
+async def check_source_url(url: httpx.URL):
+    """Refuse non-http(s) URLs and hosts that resolve to non-public addresses"""
+    if url.scheme not in FETCH_SCHEMES:
+        raise ImageSourceError(f"Only http and https image URLs are allowed, not '{url.scheme}'")
+    if not url.host:
+        raise ImageSourceError("Image URL has no host")
+    await public_addresses(url.host, url.port or (443 if url.scheme == "https" else 80))
+
+class PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that connects only to a vetted public address of the host.
+
+    The host is resolved and checked at connect time and the socket is opened
+    to that address, so a DNS answer that changes after check_source_url
+    (rebinding) cannot point the request somewhere else. TLS is negotiated
+    afterwards, with SNI and certificate checks for the original host name.
+    """
+
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await public_addresses(host, port)
+        return await self._backend.connect_tcp(
+            addresses[0], port, timeout=timeout, local_address=local_address, socket_options=socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise ImageSourceError("Image URLs cannot use a unix socket")
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+def source_transport() -> httpx.AsyncHTTPTransport:
+    """Transport for remote image fetches, pinned to vetted public addresses"""
+    transport = httpx.AsyncHTTPTransport()
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(), network_backend=PublicAddressBackend()
+    )
+    return transport
+
+def supported_formats() -> Tuple[str, ...]:
+    """Formats the installed Pillow can encode, WebP first"""
+    from PIL import Image, features
+    try:
+        import pillow_avif  # noqa: F401  registers AVIF on Pillow < 11.2
+    except ImportError:
+        pass
+    formats = ["webp"] if features.check("webp") else []
+    if "AVIF" in Image.SAVE:
+        formats.append("avif")
+    return tuple(formats)
+
+def image_directory(digest: str, root: Path = IMAGE_DIR) -> Path:
+    return root / digest[:2] / digest
+
+def derivative_path(digest: str, filename: str, root: Path = IMAGE_DIR) -> Optional[Path]:
+    """Resolve a served file name, or None if it is not a derivative name"""
+    match = _FILE_PATTERN.match(filename)
+    if not _DIGEST_PATTERN.match(digest) or not match:
+        return None
+    if match["variant"] not in VARIANTS or match["format"] not in MEDIA_TYPES:
+        return None
+    return image_directory(digest, root) / filename
+
+def build_srcset(digest: str, variants: Dict[str, Dict[str, int]], formats) -> Dict[str, str]:
+    """srcset strings per format, one candidate per distinct width"""
+    srcset = {}
+    for fmt in formats:
+        candidates = {}
+        for name, size in variants.items():
+            candidates.setdefault(size["width"], f"{IMAGE_URL_PREFIX}/{digest}/{name}.{fmt} {size['width']}w")
+        srcset[fmt] = ", ".join(candidates[width] for width in sorted(candidates))
+    return srcset
+
+def render_derivatives(source: bytes, digest: str, root: str, formats: Tuple[str, ...]) -> Dict[str, Any]:
+    """Resize and encode every variant; runs in a worker process.
+
+    Files are written to a temporary name and renamed, so a reader never sees
+    a partial file and a re-run after a crash simply fills in what is missing.
+    """
+    from PIL import Image, ImageOps
+
+    directory = image_directory(digest, Path(root))
+    directory.mkdir(parents=True, exist_ok=True)
+    with Image.open(io.BytesIO(source)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+    for name, max_width in VARIANTS.items():
+        width = min(max_width, image.width)
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            target = directory / f"{name}.{fmt}"
+            if target.exists():
+                continue
+            partial = target.with_suffix(f"{target.suffix}.{os.getpid()}.tmp")
+            resized.save(partial, **ENCODER_OPTIONS[fmt])
+            os.replace(partial, target)
+        variants[name] = {"width": width, "height": height}
+    return {"width": image.width, "height": image.height, "variants": variants}
+
+class ImagePipeline:
+    """Ingests images and renders their derivatives in a process pool.
+
+    Rendering is CPU-bound, so it runs outside the event loop; the asyncio
+    side only hashes, writes the original and records progress in the
+    ``images`` collection. Owners (vehicles, testimonials) are pointed at an
+    image only once its derivatives exist.
+    """
+
+    def __init__(self, root: Path = IMAGE_DIR, workers: int = IMAGE_WORKERS):
+        self.root = root
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._formats: Optional[Tuple[str, ...]] = None
+
+    def start(self):
+        if self._executor is None:
+            # Forking a process that runs an event loop and Mongo threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def stop(self):
+        """Wait for in-flight renders, then shut the pool down"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def formats(self) -> Tuple[str, ...]:
+        if self._formats is None:
+            self._formats = supported_formats()
+        return self._formats
+
+    async def fetch(self, url: str) -> bytes:
+        """Download a remote image, refusing bodies over IMAGE_MAX_BYTES.
+
+        Redirects are followed by hand, so each hop's host is checked before
+        it is requested, and connections go only to the checked addresses.
+        """
+        target = httpx.URL(url)
+        async with self._client() as client:
+            for _ in range(IMAGE_FETCH_MAX_REDIRECTS + 1):
+                await check_source_url(target)
+                async with client.stream("GET", target) as response:
+                    if response.is_redirect and response.next_request is not None:
+                        target = response.next_request.url
+                        continue
+                    response.raise_for_status()
+                    chunks = []
+                    size = 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > IMAGE_MAX_BYTES:
+                            raise ValueError(f"Image at {url} exceeds {IMAGE_MAX_BYTES} bytes")
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+        raise ImageSourceError(f"Image at {url} redirected more than {IMAGE_FETCH_MAX_REDIRECTS} times")
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=IMAGE_FETCH_TIMEOUT, transport=source_transport())
+
+    async def ingest(
+        self,
+        data: bytes,
+        source_url: Optional[str] = None,
+        owner: Optional[Tuple[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Store an image and schedule its derivatives; returns the image record.
+
+        An image that was ingested before is not rendered again, and one that
+        is still being rendered (by any worker) is not rendered twice: its
+        record is returned and ``owner`` waits for that render. ``owner`` is a
+        (collection name, document id) pair to attach the image to once its
+        derivatives are ready.
+        """
+        if len(data) > IMAGE_MAX_BYTES:
+            raise ValueError(f"Image exceeds {IMAGE_MAX_BYTES} bytes")
+        digest = hashlib.sha256(data).hexdigest()
+
+        existing = await images.find_one({"id": digest}, {"_id": 0})
+        if existing and existing["status"] == ImageStatus.READY.value:
+            if owner:
+                await self.attach(owner, existing)
+            return existing
+
+        record = await self._claim(digest, source_url, existing)
+        if record is None:
+            return await self._wait_for_render(digest, existing, owner)
+
+        task = asyncio.create_task(self._render(digest, data, owner))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return record
+
+    async def ingest_url(self, url: str, owner: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+        return await self.ingest(await self.fetch(url), source_url=url, owner=owner)
+
+    async def _claim(self, digest: str, source_url: Optional[str], existing: Optional[Dict[str, Any]]):
+        """Mark an image as being rendered by this process, or None if another render owns it"""
+        record = ImageAsset(id=digest, source_url=source_url).dict()
+        if existing is None:
+            try:
+                await images.insert_one(dict(record))
+                return record
+            except DuplicateKeyError:
+                return None
+        if existing["status"] == ImageStatus.FAILED.value:
+            claim = {"id": digest, "status": ImageStatus.FAILED.value}
+        elif existing["created_at"] < datetime.utcnow() - timedelta(seconds=IMAGE_RENDER_TIMEOUT):
+            claim = {"id": digest, "status": ImageStatus.PROCESSING.value, "created_at": existing["created_at"]}
+        else:
+            return None
+        # Keep owners that were waiting on an abandoned render
+        record["pending_owners"] = existing.get("pending_owners", [])
+        replaced = await images.find_one_and_replace(claim, record, projection={"_id": 0})
+        return record if replaced else None
+
+    async def _wait_for_render(self, digest: str, existing, owner: Optional[Tuple[str, str]]) -> Dict[str, Any]:
+        """Leave owner to the render in progress, or attach it if that render just finished"""
+        if owner:
+            queued = await images.find_one_and_update(
+                {"id": digest, "status": ImageStatus.PROCESSING.value},
+                {"$addToSet": {"pending_owners": list(owner)}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER,
+            )
+            if queued:
+                return queued
+        current = await images.find_one({"id": digest}, {"_id": 0}) or existing
+        if owner and current and current["status"] == ImageStatus.READY.value:
+            await self.attach(owner, current)
+        return current
+
+    async def _render(self, digest: str, data: bytes, owner: Optional[Tuple[str, str]]):
+        self.start()
+        formats = self.formats
+        try:
+            directory = image_directory(digest, self.root)
+            directory.mkdir(parents=True, exist_ok=True)
+            original = directory / "original"
+            if not original.exists():
+                original.write_bytes(data)
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor, render_derivatives, data, digest, str(self.root), formats
+            )
+            update = {
+                "status": ImageStatus.READY.value,
+                "width": result["width"],
+                "height": result["height"],
+                "formats": list(formats),
+                "variants": result["variants"],
+                "srcset": build_srcset(digest, result["variants"], formats),
+                "error": None,
+            }
+            record = await images.find_one_and_update(
+                {"id": digest}, {"$set": update}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+            )
+            if record:
+                # Owners that asked for this image while it was rendering
+                owners = {tuple(pending) for pending in record.get("pending_owners", [])}
+                if owner:
+                    owners.add(owner)
+                for pending in sorted(owners):
+                    await self.attach(pending, record)
+            logger.info(f"Rendered image derivatives for {digest[:12]}")
+        except Exception as e:
+            logger.error(f"Error rendering image {digest[:12]}: {e}")
+            await images.update_one(
+                {"id": digest}, {"$set": {"status": ImageStatus.FAILED.value, "error": str(e)}}
+            )
+
+    async def attach(self, owner: Tuple[str, str], record: Dict[str, Any]):
+        """Point a vehicle or testimonial at a rendered image"""
+        collection_name, doc_id = owner
+        update = {"image_id": record["id"], "image_srcset": record["srcset"]}
+        if collection_name == "vehicles":
+            update["updated_at"] = datetime.utcnow()
+        await OWNERS[collection_name].update_one({"id": doc_id}, {"$set": update})
+        catalog_cache.invalidate(collection_name)
+        snapshot_builder.schedule(collection_name)
+
+    async def _ingest_owners(self, collection_name: str, query: Dict[str, Any], limit: int = 0) -> Dict[str, int]:
+        """Ingest image_url, one document at a time, for owners matching query that have no derivatives"""
+        counts = {"processed": 0, "failed": 0}
+        query = {**query, "image_url": {"$nin": [None, ""]}, "image_id": None}
+        cursor = OWNERS[collection_name].find(query, {"_id": 0, "id": 1, "image_url": 1})
+        if limit:
+            cursor = cursor.limit(limit)
+        async for doc in cursor:
+            try:
+                await self.ingest_url(doc["image_url"], owner=(collection_name, doc["id"]))
+                counts["processed"] += 1
+            except Exception as e:
+                logger.error(f"Error ingesting image for {collection_name}/{doc['id']}: {e}")
+                counts["failed"] += 1
+        return counts
+
+    async def backfill(self, collection_name: str, limit: int = 0) -> Dict[str, int]:
+        """Ingest image_url for owners that have no derivatives yet"""
+        counts = await self._ingest_owners(collection_name, {}, limit)
+        await self.stop()
+        return counts
+
+    def schedule_reingest(self, collection_name: str, doc_ids: List[str]):
+        """Fetch and render the new image_url of documents whose image changed, in the background"""
+        task = asyncio.create_task(self._ingest_owners(collection_name, {"id": {"$in": doc_ids}}))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": len(self._tasks), "workers": self.workers}
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+import logging
+
+from database import db
+from models import VehicleCategory, VehicleSort
+from pagination import encode_cursor, keyset_filter, position_filter
+from vehicle_search import build_vehicle_query, sort_for
+
+logger = logging.getLogger(__name__)
+
+# A plan that examines more documents than this per document returned is
+# filtering after the index rather than being bounded by it
+MAX_EXAMINED_PER_RETURNED = 2
+
+class HotQuery(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List] = None
+    limit: int = 51
+
+def _page_sort(field: str, direction: int = -1) -> List:
+    return [(field, direction), ("id", direction)]
+
+def _cursor_page(filter_dict: Dict[str, Any], field: str, value: Any, direction: int = -1) -> Dict[str, Any]:
+    return keyset_filter(filter_dict, field, encode_cursor(field, value, "~"), direction)
+
+def _catalog_query(name: str, sort: VehicleSort = VehicleSort.NEWEST, **params) -> HotQuery:
+    field, direction = sort_for(sort)
+    return HotQuery(name, "vehicles", build_vehicle_query(**params), _page_sort(field, direction))
+
+def hot_queries() -> List[HotQuery]:
+    """The query shapes issued by the API's endpoints"""
+    now = datetime.utcnow()
+    return [
+        # Contacts
+        HotQuery("get_contacts", "contact_submissions", {}, _page_sort("submitted_at")),
+        HotQuery("get_contacts?status", "contact_submissions", {"status": "new"}, _page_sort("submitted_at")),
+        HotQuery("get_contacts?cursor", "contact_submissions",
+                 _cursor_page({"status": "new"}, "submitted_at", now), _page_sort("submitted_at")),
+        HotQuery("update_contact", "contact_submissions", {"id": "~"}, limit=1),
+        HotQuery("export_contacts?after", "contact_submissions",
+                 position_filter({"status": "new"}, "submitted_at", now, "~", direction=1),
+                 _page_sort("submitted_at", 1), limit=1000),
+        # Inquiries
+        HotQuery("get_inquiries", "car_inquiries", {}, _page_sort("submitted_at")),
+        HotQuery("get_inquiries?status", "car_inquiries", {"status": "new"}, _page_sort("submitted_at")),
+        HotQuery("get_inquiries?car_id", "car_inquiries", {"car_id": "~"}, _page_sort("submitted_at")),
+        HotQuery("get_inquiries?cursor", "car_inquiries",
+                 _cursor_page({}, "submitted_at", now), _page_sort("submitted_at")),
+        HotQuery("update_inquiry", "car_inquiries", {"id": "~"}, limit=1),
+        # Inquiry analytics
+        HotQuery("top_vehicles", "inquiry_rollups", {"day": {"$gte": now}}),
+        HotQuery("time_series?car_id", "inquiry_rollups", {"car_id": "~", "day": {"$gte": now}}),
+        # Lead retention and the archive search
+        HotQuery("archive_leads", "car_inquiries",
+                 {"$or": [{"status": "closed", "submitted_at": {"$lt": now}}, {"submitted_at": {"$lt": now}}]},
+                 [("submitted_at", 1), ("id", 1)], limit=1000),
+        HotQuery("get_archived_contacts?email", "contact_submissions_archive", {"email": "~"},
+                 _page_sort("submitted_at")),
+        HotQuery("get_archived_inquiries?car_id", "car_inquiries_archive", {"car_id": "~"},
+                 _page_sort("submitted_at")),
+        # Testimonials
+        HotQuery("get_testimonials", "testimonials", {"is_approved": True}, [("created_at", -1)], limit=100),
+        HotQuery("approve_testimonial", "testimonials", {"id": "~"}, limit=1),
+        # Vehicles
+        _catalog_query("get_vehicles"),
+        _catalog_query("get_vehicles?category", category=VehicleCategory.USED),
+        _catalog_query("get_vehicles?featured_only", featured_only=True),
+        _catalog_query("get_vehicles?category&featured_only", category=VehicleCategory.NEW, featured_only=True),
+        _catalog_query("get_vehicles?sort=price_asc", VehicleSort.PRICE_LOW, category=VehicleCategory.USED),
+        _catalog_query("get_vehicles?sort=mileage", VehicleSort.MILEAGE, category=VehicleCategory.USED),
+        _catalog_query("get_vehicles?sort=year", VehicleSort.YEAR, category=VehicleCategory.USED),
+        _catalog_query("get_vehicles?sort=brand", VehicleSort.BRAND, category=VehicleCategory.USED),
+        _catalog_query("get_vehicles?q", q="leather sunroof"),
+        _catalog_query("get_vehicles?q=prefix", q="toyo"),
+        HotQuery("get_vehicle", "vehicles", {"id": "~"}, limit=1),
+        HotQuery("get_vehicle_batch", "vehicles", {"id": {"$in": ["~", "~~"]}}),
+        HotQuery("get_similar_vehicles", "vehicles", {"id": {"$in": ["~"]}, "is_available": True}),
+        # Similarity index build and refresh polls
+        HotQuery("similarity_index_build", "vehicles", {"is_available": True}),
+        HotQuery("similarity_index_refresh", "vehicles", {"updated_at": {"$gt": now}}),
+    ]
+
+def _stages(plan: Any) -> Iterator[str]:
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+async def explain_query(query: HotQuery) -> Dict[str, Any]:
+    cursor = db[query.collection].find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    plan = await cursor.limit(query.limit).explain()
+    winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+    stages = list(_stages(winning))
+    stats = plan.get("executionStats", {})
+    examined = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+    return {
+        "name": query.name,
+        "collection": query.collection,
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "docs_examined": examined,
+        "returned": returned,
+        "unselective": examined > MAX_EXAMINED_PER_RETURNED * max(returned, 1),
+    }
+
+async def audit_indexes() -> List[Dict[str, Any]]:
+    """Explain every hot query and report its winning plan's stages and selectivity"""
+    return [await explain_query(query) for query in hot_queries()]
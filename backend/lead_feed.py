@@ -0,0 +1,242 @@
+"""Live feed of new and updated leads for the admin inbox.
+
+One watcher per process follows contact_submissions and car_inquiries and fans
+each event out to every connected subscriber. It uses a MongoDB change stream
+when the server supports one (replica set or sharded cluster) and otherwise
+polls both collections once per interval, however many admins are connected.
+The watcher runs only while someone is subscribed.
+
+Each event carries the lead id as its SSE id, so a reconnecting browser sends
+it back as Last-Event-ID and is first sent the leads it missed.
+"""
+from fastapi import Request
+from pymongo.errors import OperationFailure, PyMongoError
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+
+from database import get_database, contact_submissions, car_inquiries
+from models import ContactSubmission, CarInquiry
+from serialization import encode_document
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# "auto" tries a change stream first; "poll" skips it
+LEAD_FEED_MODE = os.environ.get('LEAD_FEED_MODE', 'auto')
+LEAD_FEED_POLL_INTERVAL = float(os.environ.get('LEAD_FEED_POLL_INTERVAL', '1'))
+# Buffered leads are stored up to a flush interval after their submitted_at
+LEAD_FEED_POLL_LOOKBACK = float(os.environ.get('LEAD_FEED_POLL_LOOKBACK', '10'))
+LEAD_FEED_HEARTBEAT = float(os.environ.get('LEAD_FEED_HEARTBEAT', '15'))
+LEAD_FEED_QUEUE_SIZE = int(os.environ.get('LEAD_FEED_QUEUE_SIZE', '100'))
+
+# Collection name -> (event type, response model)
+FEED_SOURCES = {
+    contact_submissions.name: ("contact", ContactSubmission),
+    car_inquiries.name: ("inquiry", CarInquiry),
+}
+
+_OPERATIONS = {"insert": "created", "update": "updated", "replace": "updated"}
+
+def format_event(event: str, data: bytes, event_id: Optional[str] = None) -> bytes:
+    """One Server-Sent Events message"""
+    head = b"id: " + event_id.encode() + b"\n" if event_id else b""
+    return head + b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+class LeadFeed:
+    def __init__(
+        self,
+        mode: str = LEAD_FEED_MODE,
+        poll_interval: float = LEAD_FEED_POLL_INTERVAL,
+        lookback: float = LEAD_FEED_POLL_LOOKBACK,
+        queue_size: int = LEAD_FEED_QUEUE_SIZE,
+        heartbeat: float = LEAD_FEED_HEARTBEAT,
+    ):
+        self.mode = mode
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.lookback = lookback
+        self.queue_size = queue_size
+        self.source: Optional[str] = None
+        self.published = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    async def events(self, request: Request, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE body for one admin connection.
+
+        Sends the leads stored after ``last_event_id`` (if given), then lead
+        events as they arrive, keepalive comments while idle, and a final
+        ``reset`` event (refetch, then reconnect) if the watcher stops, the
+        client falls too far behind, or the missed leads can't be replayed.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        try:
+            yield b"retry: 3000\n\n"
+            replayed: Set[str] = set()
+            if last_event_id:
+                missed = await self._missed(last_event_id)
+                if missed is None:
+                    yield format_event("reset", b"{}")
+                    return
+                for collection_name, doc in missed:
+                    replayed.add(doc["id"])
+                    yield self._message(collection_name, "created", doc)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    yield format_event("reset", b"{}")
+                    return
+                lead_id, body = message
+                if lead_id in replayed:
+                    # Already sent while catching up
+                    replayed.discard(lead_id)
+                    continue
+                yield body
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers and self._task:
+                self._task.cancel()
+                self._task = None
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+        }
+
+    def _message(self, collection_name: str, operation: str, doc: Dict[str, Any]) -> bytes:
+        event_type, model = FEED_SOURCES[collection_name]
+        doc.pop("_id", None)
+        return format_event(f"{event_type}.{operation}", encode_document(model, doc), doc["id"])
+
+    async def _missed(self, last_event_id: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Leads stored after the one with id ``last_event_id``, oldest first.
+
+        None when that lead is unknown or more leads were missed than a
+        subscriber queue holds; the client should then refetch instead.
+        """
+        sources = (contact_submissions, car_inquiries)
+        since = None
+        for collection in sources:
+            last = await collection.find_one({"id": last_event_id}, {"_id": 0, "submitted_at": 1})
+            if last:
+                since = last["submitted_at"]
+                break
+        if since is None:
+            return None
+        missed = []
+        for collection in sources:
+            docs = await collection.find(
+                {"submitted_at": {"$gte": since}, "id": {"$ne": last_event_id}}, {"_id": 0}
+            ).sort([("submitted_at", 1), ("id", 1)]).to_list(self.queue_size + 1)
+            missed.extend((collection.name, doc) for doc in docs)
+        if len(missed) > self.queue_size:
+            return None
+        missed.sort(key=lambda item: (item[1]["submitted_at"], item[1]["id"]))
+        return missed
+
+    def _publish(self, collection_name: str, operation: str, doc: Dict[str, Any]):
+        message = (doc["id"], self._message(collection_name, operation, doc))
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A stalled client is cut off and told to refetch, rather than slowing everyone
+                self._disconnect(queue)
+
+    def _disconnect(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def _watch(self):
+        try:
+            if self.mode != "poll":
+                try:
+                    await self._follow_change_stream()
+                    return
+                except (OperationFailure, NotImplementedError, AttributeError) as e:
+                    logger.info(f"Change streams unavailable, polling for new leads instead: {e}")
+            await self._poll()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Lead feed watcher stopped: {e}")
+            for queue in list(self._subscribers):
+                self._disconnect(queue)
+
+    async def _follow_change_stream(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(FEED_SOURCES)},
+            "operationType": {"$in": list(_OPERATIONS)},
+        }}]
+        async with get_database().watch(pipeline, full_document="updateLookup") as stream:
+            self.source = "change_stream"
+            logger.info("Lead feed following a change stream")
+            async for change in stream:
+                doc = change.get("fullDocument")
+                if doc:
+                    self._publish(change["ns"]["coll"], _OPERATIONS[change["operationType"]], doc)
+
+    async def _poll(self):
+        """Fallback: re-read the recent window of each collection once per interval.
+
+        Only new leads are seen this way; status changes need a change stream.
+        The window overlaps between polls so leads written late by the buffered
+        writer are not skipped, and ids already published are suppressed.
+        """
+        self.source = "poll"
+        started = datetime.utcnow()
+        while True:
+            since = datetime.utcnow() - timedelta(seconds=self.lookback)
+            for collection in (contact_submissions, car_inquiries):
+                try:
+                    docs = await collection.find(
+                        {"submitted_at": {"$gte": max(since, started)}}, {"_id": 0}
+                    ).sort([("submitted_at", 1), ("id", 1)]).to_list(None)
+                except PyMongoError as e:
+                    logger.error(f"Error polling {collection.name} for new leads: {e}")
+                    continue
+                for doc in docs:
+                    if doc["id"] in self._seen:
+                        continue
+                    self._remember(doc["id"])
+                    self._publish(collection.name, "created", doc)
+            await asyncio.sleep(self.poll_interval)
+
+    def _remember(self, lead_id: str):
+        self._seen[lead_id] = None
+        while len(self._seen) > 10_000:
+            self._seen.popitem(last=False)
+
+lead_feed = LeadFeed()
@@ -0,0 +1,317 @@
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
+from collections import Counter
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+
+from database import contact_submissions, car_inquiries
+from models import ContactSubmission, CarInquiry
+from stats import record_submission
+from analytics import record_inquiries
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# "direct" awaits insert_one per submission; "buffered" queues and batches them
+LEAD_WRITE_MODE = os.environ.get('LEAD_WRITE_MODE', 'direct')
+LEAD_BATCH_SIZE = int(os.environ.get('LEAD_BATCH_SIZE', '100'))
+LEAD_FLUSH_INTERVAL = float(os.environ.get('LEAD_FLUSH_INTERVAL', '0.5'))
+LEAD_SPILL_DIR = Path(os.environ.get('LEAD_SPILL_DIR', str(ROOT_DIR / 'spill')))
+LEAD_SPILL_FSYNC = os.environ.get('LEAD_SPILL_FSYNC', 'false').lower() == 'true'
+
+# Duplicate key: the document was already written before a crash
+DUPLICATE_KEY_ERROR = 11000
+
+def _fsync_descriptor(fd: int):
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class LeadWriter:
+    """Writes one kind of lead, either directly or through a batched queue.
+
+    In buffered mode each submission is appended to a local JSONL spill file
+    before it is acknowledged. A flush rotates that file aside, writes the
+    queued documents with insert_many and deletes the rotated file once they
+    are stored. Files left behind by a crash are replayed on start; the unique
+    ``id`` index makes the replay idempotent, so the first flush makes sure it
+    exists rather than racing the background index build.
+
+    Spill files are per process (``{kind}.{pid}.jsonl``), so workers sharing
+    LEAD_SPILL_DIR never rotate each other's files. Each process holds a lock on
+    its live file; at start a worker adopts only files whose owner no longer
+    holds that lock, under a directory-wide lock so one worker recovers them.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        collection,
+        model: Type[BaseModel],
+        buffered: bool = False,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        spill_dir: Path = LEAD_SPILL_DIR,
+        fsync: bool = False,
+        after_store: Optional[Callable[[List[BaseModel]], Awaitable[None]]] = None,
+    ):
+        self.kind = kind
+        self.collection = collection
+        self.model = model
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.fsync = fsync
+        self.after_store = after_store
+
+        self._queue: List[BaseModel] = []
+        self._pending_files: List[Path] = []
+        self._spill = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._segment = 0
+        self._id_index_ready = False
+
+        self.written = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def spill_path(self) -> Path:
+        return self.spill_dir / f"{self.kind}.{os.getpid()}.jsonl"
+
+    async def start(self):
+        if not self.buffered:
+            return
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_dir / f"{self.kind}.lock", "a") as recovery_lock:
+            fcntl.flock(recovery_lock, fcntl.LOCK_EX)
+            self._recover()
+            self._spill = open(self.spill_path, "a", encoding="utf-8")
+            fcntl.flock(self._spill, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._task = asyncio.create_task(self._run())
+        if self._queue:
+            logger.info(f"Recovered {len(self._queue)} unflushed {self.kind} from spill files")
+            self._wakeup.set()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.buffered:
+            await self.flush()
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+            if not self._queue and self.spill_path.stat().st_size == 0:
+                self.spill_path.unlink()
+
+    async def write(self, obj: BaseModel):
+        """Store a validated submission, or queue it durably in buffered mode"""
+        if not self.buffered:
+            await self.collection.insert_one(obj.dict())
+            # The lead is stored from here on: a counter failure must not reach
+            # the client as an error it would retry into a duplicate
+            await self._count([obj])
+            return
+
+        self._spill.write(json.dumps(jsonable_encoder(obj)) + "\n")
+        self._spill.flush()
+        # Queue and spill line stay paired: nothing awaits between the two
+        self._queue.append(obj)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        if self.fsync:
+            # A duplicate descriptor stays valid if a flush rotates the file meanwhile
+            await asyncio.to_thread(_fsync_descriptor, os.dup(self._spill.fileno()))
+
+    async def flush(self):
+        """Write everything queued so far with a single insert_many"""
+        async with self._flush_lock:
+            if not self._queue:
+                return
+            if not await self._ensure_id_index():
+                self.flush_failures += 1
+                return
+            # Swap the queue and its spill file together, with no await in between.
+            # Rotating first means a failed rotation leaves both untouched.
+            try:
+                self._pending_files.append(self._rotate_spill())
+            except OSError as e:
+                self.flush_failures += 1
+                logger.error(f"Error rotating {self.kind} spill file: {e}")
+                return
+            batch, self._queue = self._queue, []
+
+            started = time.perf_counter()
+            try:
+                stored = await self._insert(batch)
+            except Exception as e:
+                self.flush_failures += 1
+                self._queue[:0] = batch
+                logger.error(f"Error flushing {len(batch)} {self.kind}: {e}")
+                return
+            finally:
+                self.last_flush_seconds = time.perf_counter() - started
+
+            for path in self._pending_files:
+                path.unlink(missing_ok=True)
+            self._pending_files = []
+            self.flushes += 1
+            self.written += len(stored)
+            await self._count(stored)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "buffered" if self.buffered else "direct",
+            "queue_depth": len(self._queue),
+            "pending_spill_files": len(self._pending_files),
+            "written": self.written,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "last_flush_seconds": round(self.last_flush_seconds, 6),
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in {self.kind} flusher: {e}")
+
+    async def _ensure_id_index(self) -> bool:
+        """Create the unique id index that makes replayed inserts skip stored leads"""
+        if not self._id_index_ready:
+            try:
+                await self.collection.create_index("id", unique=True)
+                self._id_index_ready = True
+            except Exception as e:
+                logger.error(f"Error ensuring the {self.kind} id index before flushing: {e}")
+        return self._id_index_ready
+
+    async def _insert(self, batch: List[BaseModel]) -> List[BaseModel]:
+        """Insert a batch, returning the documents that were newly stored"""
+        try:
+            await self.collection.insert_many([obj.dict() for obj in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            duplicates = {error["index"] for error in errors}
+            return [obj for index, obj in enumerate(batch) if index not in duplicates]
+        return batch
+
+    async def _count(self, batch: List[BaseModel]):
+        """Update counters and rollups for stored leads, logging rather than raising failures"""
+        try:
+            days = Counter(obj.submitted_at.replace(hour=0, minute=0, second=0, microsecond=0) for obj in batch)
+            for day, count in days.items():
+                await record_submission(self.kind, day, count)
+            if self.after_store:
+                await self.after_store(batch)
+        except Exception as e:
+            logger.error(f"Error recording {len(batch)} stored {self.kind}: {e}")
+
+    def _rotated_path(self) -> Path:
+        self._segment += 1
+        return self.spill_dir / f"{self.kind}.{os.getpid()}.{int(time.time() * 1000)}-{self._segment}.flushing"
+
+    def _rotate_spill(self) -> Path:
+        rotated = self._rotated_path()
+        self.spill_path.rename(rotated)
+        try:
+            spill = open(self.spill_path, "a", encoding="utf-8")
+            fcntl.flock(spill, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            rotated.rename(self.spill_path)
+            raise
+        self._spill.close()
+        self._spill = spill
+        return rotated
+
+    def _recover(self):
+        """Adopt and queue spill files left behind by processes that have exited.
+
+        Runs under the directory-wide recovery lock. A live file that can be
+        locked has no owner; flushing files belong to the process whose id they
+        carry. Adopted files are renamed into this process's namespace so that
+        a worker starting later does not replay them again.
+        """
+        live_owners = set()
+        orphans = []
+        for path in sorted(self.spill_dir.glob(f"{self.kind}.*.jsonl")):
+            with open(path, "a") as spill:
+                try:
+                    fcntl.flock(spill, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    live_owners.add(path.name.split(".")[1])
+                    continue
+                orphans.append(path)
+        for path in sorted(self.spill_dir.glob(f"{self.kind}.*.flushing")):
+            if path.name.split(".")[1] not in live_owners:
+                orphans.append(path)
+
+        for orphan in orphans:
+            path = self._rotated_path()
+            orphan.rename(path)
+            with open(path, encoding="utf-8") as spill:
+                for line in spill:
+                    if line.strip():
+                        try:
+                            self._queue.append(self.model(**json.loads(line)))
+                        except ValueError as e:
+                            # A torn final line from a crash mid-write
+                            logger.error(f"Skipping unreadable {self.kind} spill line in {orphan.name}: {e}")
+            self._pending_files.append(path)
+
+class LeadPipeline:
+    def __init__(self, buffered: bool):
+        options = dict(
+            buffered=buffered,
+            batch_size=LEAD_BATCH_SIZE,
+            flush_interval=LEAD_FLUSH_INTERVAL,
+            spill_dir=LEAD_SPILL_DIR,
+            fsync=LEAD_SPILL_FSYNC,
+        )
+        self.contacts = LeadWriter("contacts", contact_submissions, ContactSubmission, **options)
+        self.inquiries = LeadWriter(
+            "inquiries", car_inquiries, CarInquiry, after_store=record_inquiries, **options
+        )
+
+    async def start(self):
+        await self.contacts.start()
+        await self.inquiries.start()
+
+    async def stop(self):
+        await self.contacts.stop()
+        await self.inquiries.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"contacts": self.contacts.stats(), "inquiries": self.inquiries.stats()}
+
+lead_pipeline = LeadPipeline(buffered=LEAD_WRITE_MODE == 'buffered')
@@ -0,0 +1,219 @@
+"""Maintenance commands for the Ben Fortier Car Sales API.
+
+Run from the backend directory, e.g. ``python manage.py backfill-vehicle-numbers``.
+"""
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from database import close_db_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+cli = typer.Typer(help="Ben Fortier Car Sales maintenance commands")
+
+def _run(coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_db_connection()
+    return asyncio.run(runner())
+
+@cli.command("seed")
+def seed_command():
+    """Insert the launch testimonials and vehicles into empty collections"""
+    from database import seed_initial_data
+
+    _run(seed_initial_data())
+    typer.echo("Seeded empty collections")
+
+@cli.command("build-snapshots")
+def build_snapshots_command():
+    """Render the public catalog snapshots and their manifest"""
+    from snapshots import snapshot_builder
+
+    manifest = _run(snapshot_builder.build())
+    typer.echo(json.dumps(manifest, indent=2))
+
+@cli.command("archive-leads")
+def archive_leads_command(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count the leads due for archiving")
+):
+    """Move closed and expired leads to the archive now, whatever LEAD_RETENTION_ENABLED says"""
+    from retention import lead_retention
+
+    if dry_run:
+        typer.echo(json.dumps(_run(lead_retention.count_due()), indent=2))
+        return
+    typer.echo(json.dumps(_run(lead_retention.run_once()), indent=2))
+
+@cli.command("backfill-vehicle-numbers")
+def backfill_vehicle_numbers_command(
+    batch_size: int = typer.Option(1000, min=1, help="Documents per bulk_write")
+):
+    """Fill price_cents and mileage_km on existing vehicle documents"""
+    from migrations import backfill_vehicle_numbers
+
+    converted = _run(backfill_vehicle_numbers(batch_size))
+    typer.echo(f"Backfilled {converted} vehicles")
+
+@cli.command("backfill-search-terms")
+def backfill_search_terms_command(
+    batch_size: int = typer.Option(1000, min=1, help="Documents per bulk_write")
+):
+    """Fill search_terms on existing vehicle documents for one-word search"""
+    from migrations import backfill_search_terms
+
+    converted = _run(backfill_search_terms(batch_size))
+    typer.echo(f"Backfilled {converted} vehicles")
+
+@cli.command("process-images")
+def process_images_command(
+    collection: str = typer.Option("vehicles", help="vehicles or testimonials"),
+    limit: int = typer.Option(0, min=0, help="Stop after this many documents (0 for all)")
+):
+    """Render image derivatives for documents whose image_url has none yet"""
+    from images import image_pipeline, OWNERS
+
+    if collection not in OWNERS:
+        raise typer.BadParameter(f"Unknown collection: {collection}")
+    counts = _run(image_pipeline.backfill(collection, limit))
+    typer.echo(f"Processed {counts['processed']} images, {counts['failed']} failed")
+
+@cli.command("rebuild-inquiry-rollups")
+def rebuild_inquiry_rollups_command():
+    """Recompute the per-vehicle daily inquiry rollups from car_inquiries"""
+    from analytics import rebuild_inquiry_rollups
+
+    count = _run(rebuild_inquiry_rollups())
+    typer.echo(f"Rebuilt {count} inquiry rollups")
+
+@cli.command("audit-indexes")
+def audit_indexes_command(
+    ensure: bool = typer.Option(True, help="Create the indexes in INDEX_SPECS before auditing")
+):
+    """Explain each endpoint's query and fail on collection scans or unselective plans"""
+    from database import create_indexes
+    from index_audit import MAX_EXAMINED_PER_RETURNED, audit_indexes
+
+    async def run():
+        if ensure:
+            await create_indexes()
+        return await audit_indexes()
+
+    results = _run(run())
+    for result in results:
+        status = "COLLSCAN" if result["collscan"] else "SCANS" if result["unselective"] else "ok"
+        note = " (in-memory sort)" if result["in_memory_sort"] else ""
+        typer.echo(f"{status:9} {result['collection']:20} {result['name']}: {' <- '.join(result['stages'])}{note}"
+                   f" [{result['docs_examined']} examined / {result['returned']} returned]")
+
+    scans = [result["name"] for result in results if result["collscan"]]
+    unselective = [result["name"] for result in results if result["unselective"] and not result["collscan"]]
+    if scans:
+        typer.echo(f"{len(scans)} hot path(s) fall back to COLLSCAN: {', '.join(scans)}", err=True)
+    if unselective:
+        typer.echo(f"{len(unselective)} hot path(s) examine more than {MAX_EXAMINED_PER_RETURNED} documents "
+                   f"per document returned: {', '.join(unselective)}", err=True)
+    if scans or unselective:
+        raise typer.Exit(code=1)
+    typer.echo(f"All {len(results)} hot paths use a selective index")
+
+@cli.command("generate-data")
+def generate_data_command(
+    scale: str = typer.Option("10k", help="Dataset size: 10k, 100k or 1m"),
+    seed: int = typer.Option(42, help="Random seed for a reproducible dataset"),
+    drop: bool = typer.Option(False, "--drop", help="Empty the lead, catalog and derived collections first"),
+    yes: bool = typer.Option(False, "--yes", help="Confirm --drop")
+):
+    """Fill the database with a synthetic dataset scaled from the seed data"""
+    from synthetic_data import SCALES, generate_dataset
+
+    if scale.lower() not in SCALES:
+        raise typer.BadParameter(f"scale must be one of {', '.join(SCALES)}")
+    if drop and not yes:
+        typer.echo(f"--drop deletes every lead, vehicle and testimonial in {os.environ['DB_NAME']}; "
+                   "pass --yes to confirm", err=True)
+        raise typer.Exit(code=1)
+    counts = _run(generate_dataset(SCALES[scale.lower()], seed=seed, drop=drop))
+    typer.echo(json.dumps(counts))
+
+@cli.command("benchmark")
+def benchmark_command(
+    mix: str = typer.Option("mixed", help="Traffic mix: catalog, leads, admin or mixed"),
+    requests: int = typer.Option(2000, min=1, help="Total requests to issue"),
+    concurrency: int = typer.Option(32, min=1, help="Concurrent clients"),
+    scale: str = typer.Option("10k", help="Dataset scale the database was generated with (generated in-process for mongomock://)"),
+    base_url: Optional[str] = typer.Option(None, help="Benchmark a running server instead of the in-process app"),
+    output: Optional[Path] = typer.Option(None, help="Write JSON results to this file")
+):
+    """Run a scripted traffic mix and report req/s and latency percentiles"""
+    from benchmark import MIXES, run_benchmark
+    from synthetic_data import SCALES
+
+    if mix not in MIXES:
+        raise typer.BadParameter(f"mix must be one of {', '.join(MIXES)}")
+    results = _run(run_benchmark(mix, requests, concurrency, SCALES[scale.lower()], base_url))
+    text = json.dumps(results, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    typer.echo(text)
+
+@cli.command("bench-serialization")
+def bench_serialization_command(
+    items: int = typer.Option(100, min=1, help="Vehicles per rendered list"),
+    rounds: int = typer.Option(200, min=1, help="Lists rendered per path")
+):
+    """Compare per-item list rendering cost before and after the fast path"""
+    from benchmark import serialization_benchmark
+
+    typer.echo(json.dumps(serialization_benchmark(items, rounds), indent=2))
+
+@cli.command("bench-compression")
+def bench_compression_command(
+    sizes: str = typer.Option("10,50,100", help="Comma-separated vehicle counts per list"),
+    rounds: int = typer.Option(50, min=1, help="Compressions per encoding and list")
+):
+    """Compare compression CPU time against bytes saved per encoding and level"""
+    from benchmark import compression_benchmark
+
+    counts = tuple(int(size) for size in sizes.split(","))
+    typer.echo(json.dumps(compression_benchmark(counts, rounds), indent=2))
+
+@cli.command("bench-recommendations")
+def bench_recommendations_command(
+    items: int = typer.Option(20000, min=1, help="Synthetic vehicles to index"),
+    queries: int = typer.Option(10000, min=1, help="Top-k lookups to time")
+):
+    """Time the similarity index build, top-k lookups and an incremental refresh"""
+    from benchmark import recommendation_benchmark
+
+    typer.echo(json.dumps(recommendation_benchmark(items, queries), indent=2))
+
+@cli.command("compare-benchmarks")
+def compare_benchmarks_command(
+    baseline: Path = typer.Argument(..., exists=True, help="Results from the reference commit"),
+    current: Path = typer.Argument(..., exists=True, help="Results from the commit under test"),
+    tolerance: float = typer.Option(0.10, help="Allowed relative slowdown before failing")
+):
+    """Compare two benchmark result files and fail on regressions"""
+    from benchmark import compare_results
+
+    regressions = compare_results(json.loads(baseline.read_text()), json.loads(current.read_text()), tolerance)
+    for regression in regressions:
+        typer.echo(f"REGRESSION {regression}", err=True)
+    if regressions:
+        raise typer.Exit(code=1)
+    typer.echo("No regressions")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,186 @@
+"""Minimal Prometheus-style metrics: counters, gauges and histograms rendered
+in the text exposition format, plus request and MongoDB command instrumentation.
+"""
+from pymongo import monitoring
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+class Gauge(Counter):
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_label = 'le="' + le + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """Add a callable producing exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",)
+))
+mongo_command_duration = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection", ("collection", "command")
+))
+mongo_command_failures = registry.register(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands by collection", ("collection", "command")
+))
+serialization_duration = registry.register(Histogram(
+    "response_serialization_seconds", "Time spent validating and encoding response bodies", ("model",)
+))
+compression_duration = registry.register(Histogram(
+    "response_compression_seconds", "Time spent compressing response bodies", ("encoding",)
+))
+compression_saved_bytes = registry.register(Counter(
+    "response_compression_saved_bytes_total", "Bytes removed from response bodies by compression", ("encoding",)
+))
+submissions_rejected = registry.register(Counter(
+    "submissions_rejected_total", "Public submissions refused before any write", ("kind", "reason")
+))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request against its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": "500"}
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = str(message["status"])
+            await send(message)
+
+        # The route is only known after routing, so in-flight is tracked per method
+        http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, method, route_path, status["code"])
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command pymongo sends, keyed by collection and command name"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "*"
+        self._pending[(event.request_id, event.operation_id or 0)] = (collection, event.command_name)
+
+    def succeeded(self, event):
+        labels = self._pending.pop((event.request_id, event.operation_id or 0), ("*", event.command_name))
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, *labels)
+
+    def failed(self, event):
+        labels = self._pending.pop((event.request_id, event.operation_id or 0), ("*", event.command_name))
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, *labels)
+        mongo_command_failures.inc(*labels)
@@ -0,0 +1,74 @@
+from pymongo import UpdateOne
+import logging
+
+from models import SEARCH_TERM_FIELDS, parse_price_cents, parse_mileage_km, search_terms_for
+from database import vehicles
+
+logger = logging.getLogger(__name__)
+
+# Documents still missing one of the canonical numeric fields
+_NEEDS_NUMBERS = {"$or": [
+    {"price_cents": {"$exists": False}},
+    {"mileage_km": {"$exists": False}},
+]}
+
+async def backfill_vehicle_numbers(batch_size: int = 1000) -> int:
+    """Backfill price_cents and mileage_km on vehicles written before they existed.
+
+    Documents are walked in ``_id`` order one batch at a time, so memory stays
+    at one batch regardless of catalog size. Converted documents no longer
+    match the filter, which makes the command safe to interrupt and re-run.
+    """
+    converted = 0
+    last_id = None
+    while True:
+        query = _NEEDS_NUMBERS if last_id is None else {"$and": [_NEEDS_NUMBERS, {"_id": {"$gt": last_id}}]}
+        batch = await vehicles.find(
+            query, {"_id": 1, "price": 1, "mileage": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "price_cents": parse_price_cents(doc.get("price")),
+                    "mileage_km": parse_mileage_km(doc.get("mileage")),
+                }}
+            )
+            for doc in batch
+        ]
+        result = await vehicles.bulk_write(operations, ordered=False)
+        converted += result.modified_count
+        last_id = batch[-1]["_id"]
+        logger.info(f"Backfilled numeric fields on {converted} vehicles (last _id {last_id})")
+
+    return converted
+
+async def backfill_search_terms(batch_size: int = 1000) -> int:
+    """Backfill search_terms on vehicles written before one-word search used it.
+
+    Walks ``_id`` order in batches like backfill_vehicle_numbers; filled
+    documents stop matching, so the command can be interrupted and re-run.
+    """
+    converted = 0
+    last_id = None
+    missing = {"search_terms": {"$exists": False}}
+    projection = {"_id": 1, **{field: 1 for field in SEARCH_TERM_FIELDS}}
+    while True:
+        query = missing if last_id is None else {"$and": [missing, {"_id": {"$gt": last_id}}]}
+        batch = await vehicles.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"search_terms": search_terms_for(doc)}})
+            for doc in batch
+        ]
+        result = await vehicles.bulk_write(operations, ordered=False)
+        converted += result.modified_count
+        last_id = batch[-1]["_id"]
+        logger.info(f"Backfilled search terms on {converted} vehicles (last _id {last_id})")
+
+    return converted
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, EmailStr, model_validator
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
+import re
+import string
 import uuid
 from enum import Enum
 
@@ -25,6 +27,107 @@ class VehicleCategory(str, Enum):
     NEW = "new"
     USED = "used"
 
+class VehicleSort(str, Enum):
+    NEWEST = "newest"
+    BRAND = "brand"
+    YEAR = "year"
+    PRICE_LOW = "price_asc"
+    PRICE_HIGH = "price_desc"
+    MILEAGE = "mileage"
+
+class DataFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class ImageStatus(str, Enum):
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+# Numeric parsing for display strings. An amount may carry a K or M suffix
+# ("$52.9K"); the suffix must not run into a word, so "km" is not a K.
+_AMOUNT = r"(\d[\d,]*(?:\.\d+)?)\s*([kKmM](?![A-Za-z]))?"
+_AMOUNT_PATTERN = re.compile(_AMOUNT)
+_PRICE_PATTERN = re.compile(r"[$€£]\s*" + _AMOUNT)
+_MILEAGE_PATTERN = re.compile(_AMOUNT + r"\s*(km|kilomet(?:er|re)s?|mi(?:les?)?)\b", re.IGNORECASE)
+_MILES_PATTERN = re.compile(r"\bmi(les?)?\b", re.IGNORECASE)
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def _amount(number: str, suffix: Optional[str]) -> float:
+    return float(number.replace(",", "")) * _SUFFIXES.get((suffix or "").lower(), 1)
+
+def _only(matches: List[Any]) -> Optional[Any]:
+    """The single match, or None when there are none or several to choose from"""
+    return matches[0] if len(matches) == 1 else None
+
+def parse_price_cents(price: Optional[str]) -> Optional[int]:
+    """Parse a display price such as "Starting at $115,000" or "$52.9K" into integer cents.
+
+    The amount marked with a currency sign wins over other numbers ("From 2025:
+    $115,000"); a string with several marked amounts, or several unmarked
+    numbers and no marked one, is ambiguous and gives None.
+    """
+    if not price:
+        return None
+    match = _only(_PRICE_PATTERN.findall(price) or _AMOUNT_PATTERN.findall(price))
+    if match is None:
+        return None
+    return int(round(_amount(*match) * 100))
+
+def parse_mileage_km(mileage: Optional[str]) -> Optional[int]:
+    """Parse a display mileage such as "35,000 km" or "22K miles" into integer kilometres.
+
+    The number followed by a distance unit wins over other numbers ("2019 model,
+    45,000 km"); several such numbers, or several bare numbers, give None.
+    """
+    if not mileage:
+        return None
+    marked = _MILEAGE_PATTERN.findall(mileage)
+    if marked:
+        match = _only(marked)
+        if match is None:
+            return None
+        number, suffix, unit = match
+        miles = unit.lower().startswith("mi")
+    else:
+        match = _only(_AMOUNT_PATTERN.findall(mileage))
+        if match is None:
+            return None
+        number, suffix = match
+        miles = bool(_MILES_PATTERN.search(mileage))
+    value = _amount(number, suffix)
+    if miles:
+        value *= 1.609344
+    return int(round(value))
+
+def fill_numeric_fields(data):
+    """Derive price_cents/mileage_km from the display strings present in a payload"""
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    if data.get("price") is not None and data.get("price_cents") is None:
+        data["price_cents"] = parse_price_cents(data["price"])
+    if data.get("mileage") is not None and data.get("mileage_km") is None:
+        data["mileage_km"] = parse_mileage_km(data["mileage"])
+    return data
+
+# Searchable text fields; their lowercased words are stored on each vehicle as
+# search_terms so a one-word search is an anchored prefix match on an index
+SEARCH_TERM_FIELDS = ("brand", "model", "type", "features", "description")
+_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+def _search_words(text: Optional[str]):
+    """Yield the lowercased words of text, keeping joined words whole as well as split (f-150, f, 150)"""
+    for chunk in (text or "").lower().split():
+        parts = _WORD_PATTERN.findall(chunk)
+        yield from parts
+        if len(parts) > 1:
+            yield chunk.strip(string.punctuation)
+
+def search_terms_for(data: Dict[str, Any]) -> List[str]:
+    """Distinct words of a vehicle's searchable fields, sorted"""
+    return sorted({word for field in SEARCH_TERM_FIELDS for word in _search_words(data.get(field))})
+
 # Contact Models
 class ContactSubmissionCreate(BaseModel):
     full_name: str = Field(..., min_length=1, max_length=100)
@@ -86,6 +189,8 @@ class Testimonial(BaseModel):
     name: str
     email: str
     image_url: Optional[str] = None
+    image_id: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None
     rating: int
     quote: str
     car_purchased: Optional[str] = None
@@ -109,8 +214,15 @@ class VehicleCreate(BaseModel):
     description: str = Field(..., max_length=1000)
     price: str = Field(..., max_length=50)
     mileage: Optional[str] = Field(None, max_length=20)  # for used cars
+    price_cents: Optional[int] = Field(None, ge=0)
+    mileage_km: Optional[int] = Field(None, ge=0)
     is_featured: bool = False
 
+    @model_validator(mode="before")
+    @classmethod
+    def derive_numeric_fields(cls, data):
+        return fill_numeric_fields(data)
+
 class Vehicle(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     year: int
@@ -119,15 +231,25 @@ class Vehicle(BaseModel):
     type: str
     category: VehicleCategory
     image_url: str
+    image_id: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None
     features: str
     description: str
     price: str
     mileage: Optional[str] = None
+    price_cents: Optional[int] = None
+    mileage_km: Optional[int] = None
     is_available: bool = True
     is_featured: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+def vehicle_document(vehicle: Vehicle) -> Dict[str, Any]:
+    """The stored form of a vehicle: its fields plus the derived search_terms"""
+    doc = vehicle.dict()
+    doc["search_terms"] = search_terms_for(doc)
+    return doc
+
 class VehicleUpdate(BaseModel):
     year: Optional[int] = Field(None, ge=1990, le=2030)
     brand: Optional[str] = Field(None, min_length=1, max_length=50)
@@ -139,9 +261,70 @@ class VehicleUpdate(BaseModel):
     description: Optional[str] = Field(None, max_length=1000)
     price: Optional[str] = Field(None, max_length=50)
     mileage: Optional[str] = Field(None, max_length=20)
+    price_cents: Optional[int] = Field(None, ge=0)
+    mileage_km: Optional[int] = Field(None, ge=0)
     is_available: Optional[bool] = None
     is_featured: Optional[bool] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def derive_numeric_fields(cls, data):
+        return fill_numeric_fields(data)
+
+class VehicleImportError(BaseModel):
+    row: int
+    errors: Any
+
+class VehicleImportResult(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    upserted: int
+    failed: int
+    errors: List[VehicleImportError]
+
+# Most ids one batch lookup may ask for
+VEHICLE_BATCH_MAX_IDS = 250
+
+class VehicleBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=VEHICLE_BATCH_MAX_IDS)
+
+class VehicleBatch(BaseModel):
+    vehicles: List[Vehicle]
+    missing: List[str]
+
+# Image Models
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+
+class ImageAsset(BaseModel):
+    id: str
+    source_url: Optional[str] = None
+    status: ImageStatus = ImageStatus.PROCESSING
+    width: Optional[int] = None
+    height: Optional[int] = None
+    formats: List[str] = []
+    variants: Dict[str, ImageVariant] = {}
+    srcset: Dict[str, str] = {}
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ImageFetch(BaseModel):
+    url: str = Field(..., max_length=2000)
+
+# Analytics Models
+class VehicleDemand(BaseModel):
+    car_id: str
+    count: int
+    year: Optional[int] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+
+class DemandPoint(BaseModel):
+    day: date
+    count: int
+
 # Dashboard Models
 class DashboardStats(BaseModel):
     total_contacts: int
@@ -0,0 +1,104 @@
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+# Response header carrying the opaque token for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+def encode_cursor(sort_field: str, sort_value: Any, doc_id: str) -> str:
+    """Encode the (sort value, id) position of the last document into an opaque token"""
+    payload = json.dumps([sort_field, _encode_value(sort_value), doc_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, str]:
+    """Decode a cursor token, raising a 400 if it was tampered with or belongs to another sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        field, sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = _decode_value(sort_value)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if field != sort_field:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    return sort_value, str(doc_id)
+
+def keyset_filter(
+    filter_dict: Dict[str, Any],
+    sort_field: str,
+    cursor: Optional[str],
+    direction: int = -1,
+) -> Dict[str, Any]:
+    """Combine a query filter with the keyset condition for documents after the cursor"""
+    if not cursor:
+        return filter_dict
+
+    sort_value, doc_id = decode_cursor(cursor, sort_field)
+    return position_filter(filter_dict, sort_field, sort_value, doc_id, direction)
+
+def position_filter(
+    filter_dict: Dict[str, Any],
+    sort_field: str,
+    sort_value: Any,
+    doc_id: str,
+    direction: int = -1,
+) -> Dict[str, Any]:
+    """Combine a query filter with the condition for documents past (sort_value, doc_id).
+
+    MongoDB orders missing/null values first, so they are at the start of an
+    ascending walk and at the end of a descending one.
+    """
+    past = "$gt" if direction == 1 else "$lt"
+    if sort_value is None:
+        clauses = [{sort_field: None, "id": {past: doc_id}}]
+        if direction == 1:
+            clauses.append({sort_field: {"$ne": None}})
+    else:
+        clauses = [
+            {sort_field: {past: sort_value}},
+            {sort_field: sort_value, "id": {past: doc_id}},
+        ]
+        if direction == -1:
+            clauses.append({sort_field: None})
+    after_cursor = {"$or": clauses}
+
+    if not filter_dict:
+        return after_cursor
+    return {"$and": [filter_dict, after_cursor]}
+
+async def fetch_page(
+    collection,
+    filter_dict: Dict[str, Any],
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    direction: int = -1,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page ordered on (sort_field, id), newest first by default.
+
+    One extra document is requested to learn whether another page exists, so
+    the cost of a page is independent of how deep the client has paged.
+    """
+    query = keyset_filter(filter_dict, sort_field, cursor, direction)
+    docs = await collection.find(query, projection).sort(
+        [(sort_field, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(sort_field, last.get(sort_field), last["id"])
+    return docs, next_cursor
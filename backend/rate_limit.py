@@ -0,0 +1,266 @@
+"""Abuse protection for the public submission endpoints.
+
+Each POST is admitted in two steps before anything is written:
+
+1. Duplicate suppression: an ``Idempotency-Key`` header (scoped to the client
+   IP), or else a hash of the submitted fields, is claimed for
+   ``SUBMISSION_DEDUPE_WINDOW`` seconds. A repeat within the window replays the
+   first response instead of writing; a reused key with different fields is a
+   422.
+2. Token buckets per client IP and per email address; an empty bucket is a
+   429 with ``Retry-After``.
+
+State lives in process memory by default. ``RATE_LIMIT_BACKEND=mongo`` keeps
+it in MongoDB instead, so every worker shares the same buckets and keys.
+"""
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from collections import OrderedDict
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import time
+
+from database import rate_limits, submission_keys
+from metrics import submissions_rejected
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_IP_BURST = int(os.environ.get('RATE_LIMIT_IP_BURST', '10'))
+RATE_LIMIT_IP_PERIOD = float(os.environ.get('RATE_LIMIT_IP_PERIOD', '60'))
+RATE_LIMIT_EMAIL_BURST = int(os.environ.get('RATE_LIMIT_EMAIL_BURST', '3'))
+RATE_LIMIT_EMAIL_PERIOD = float(os.environ.get('RATE_LIMIT_EMAIL_PERIOD', '600'))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+SUBMISSION_DEDUPE_WINDOW = float(os.environ.get('SUBMISSION_DEDUPE_WINDOW', '120'))
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+def client_ip(request: Request) -> str:
+    """The caller's address; X-Forwarded-For is only honoured behind a trusted proxy"""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+class BucketSpec:
+    """A bucket holding up to burst tokens, refilled evenly over period seconds"""
+
+    def __init__(self, burst: int, period: float):
+        self.burst = burst
+        self.rate = burst / period if period > 0 else math.inf
+
+    def retry_after(self, tokens: float) -> int:
+        return max(1, math.ceil((1 - tokens) / self.rate))
+
+class MemoryBuckets:
+    """Token buckets in a bounded LRU dict; fine for a single worker"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, spec: BucketSpec) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        tokens, updated = self._state.pop(key, (spec.burst, now))
+        tokens = min(spec.burst, tokens + (now - updated) * spec.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._state[key] = (tokens, now)
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+        return allowed, tokens
+
+class MongoBuckets:
+    """Token buckets shared by every worker, updated atomically by one pipeline update"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, spec: BucketSpec) -> Tuple[bool, float]:
+        now = datetime.utcnow()
+        refilled = {"$min": [spec.burst, {"$add": [
+            {"$ifNull": ["$tokens", spec.burst]},
+            {"$multiply": [
+                {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]},
+                spec.rate,
+            ]},
+        ]}]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    # A full bucket carries no information, so it may expire
+                    "expires_at": now + timedelta(seconds=spec.burst / spec.rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"], doc["tokens"]
+
+class MemoryClaims:
+    """Idempotency keys held in process memory"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._claims: "OrderedDict[str, Tuple[float, str, Optional[bytes]]]" = OrderedDict()
+
+    async def claim(self, key: str, window: float, fingerprint: str) -> Tuple[bool, Optional[bytes], Optional[str]]:
+        """Reserve key; returns (claimed, stored body and fingerprint of an earlier claim)"""
+        now = time.monotonic()
+        existing = self._claims.get(key)
+        if existing and existing[0] > now:
+            return False, existing[2], existing[1]
+        self._claims[key] = (now + window, fingerprint, None)
+        self._claims.move_to_end(key)
+        while len(self._claims) > self.max_keys:
+            self._claims.popitem(last=False)
+        return True, None, None
+
+    async def complete(self, key: str, body: bytes):
+        if key in self._claims:
+            self._claims[key] = (*self._claims[key][:2], body)
+
+    async def release(self, key: str):
+        self._claims.pop(key, None)
+
+class MongoClaims:
+    """Idempotency keys shared by every worker; a TTL index removes expired ones"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def claim(self, key: str, window: float, fingerprint: str) -> Tuple[bool, Optional[bytes], Optional[str]]:
+        now = datetime.utcnow()
+        # An expired key the TTL monitor has not removed yet can be taken over
+        await self.collection.delete_one({"_id": key, "expires_at": {"$lte": now}})
+        try:
+            await self.collection.insert_one(
+                {"_id": key, "fingerprint": fingerprint, "body": None, "expires_at": now + timedelta(seconds=window)}
+            )
+            return True, None, None
+        except DuplicateKeyError:
+            existing = await self.collection.find_one({"_id": key}) or {}
+            return False, existing.get("body"), existing.get("fingerprint")
+
+    async def complete(self, key: str, body: bytes):
+        await self.collection.update_one({"_id": key}, {"$set": {"body": body}})
+
+    async def release(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+class Admission:
+    """Outcome of admitting one submission.
+
+    ``replay`` is set when the submission repeats an earlier one; otherwise
+    the handler writes, then calls ``complete`` with its response body (or
+    ``release`` if the write failed, so a retry is not taken for a duplicate).
+    """
+
+    def __init__(self, guard: "SubmissionGuard", key: Optional[str], replay: Optional[Response] = None):
+        self.guard = guard
+        self.key = key
+        self.replay = replay
+
+    async def complete(self, response: Response) -> Response:
+        if self.key:
+            await self.guard.claims.complete(self.key, response.body)
+        return response
+
+    async def release(self):
+        if self.key:
+            await self.guard.claims.release(self.key)
+
+class SubmissionGuard:
+    """Duplicate suppression followed by per-IP and per-email token buckets"""
+
+    def __init__(
+        self,
+        backend: str = RATE_LIMIT_BACKEND,
+        ip_limit: BucketSpec = BucketSpec(RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PERIOD),
+        email_limit: BucketSpec = BucketSpec(RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PERIOD),
+        dedupe_window: float = SUBMISSION_DEDUPE_WINDOW,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.enabled = enabled
+        if backend == "mongo":
+            self.buckets = MongoBuckets(rate_limits)
+            self.claims = MongoClaims(submission_keys)
+        else:
+            self.buckets = MemoryBuckets()
+            self.claims = MemoryClaims()
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+        self.dedupe_window = dedupe_window
+
+    @staticmethod
+    def fingerprint(payload: BaseModel) -> str:
+        """A hash of the normalized submitted fields"""
+        normalized = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(normalized.lower().encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def submission_key(kind: str, request: Request, fingerprint: str) -> str:
+        """The client's idempotency key scoped to its IP, or else the fields' fingerprint"""
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key:
+            # Another caller guessing or reusing the key cannot replay this client's response
+            scoped = f"{client_ip(request)}\n{idempotency_key[:200]}"
+            return f"{kind}:key:{hashlib.blake2b(scoped.encode(), digest_size=16).hexdigest()}"
+        return f"{kind}:hash:{fingerprint}"
+
+    async def admit(self, request: Request, kind: str, email: str, payload: BaseModel) -> Admission:
+        """Replay a duplicate, reject an over-limit caller with 429, or admit"""
+        if not self.enabled:
+            return Admission(self, None)
+        fingerprint = self.fingerprint(payload)
+        key = self.submission_key(kind, request, fingerprint) if self.dedupe_window > 0 else None
+        if key:
+            claimed, body, claimed_fingerprint = await self.claims.claim(key, self.dedupe_window, fingerprint)
+            if not claimed:
+                if claimed_fingerprint is not None and claimed_fingerprint != fingerprint:
+                    submissions_rejected.inc(kind, "key_reused")
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"This {IDEMPOTENCY_HEADER} was already used for a different submission",
+                    )
+                submissions_rejected.inc(kind, "duplicate")
+                if body is None:
+                    raise HTTPException(status_code=409, detail="This submission is already being processed")
+                return Admission(self, None, Response(content=body, media_type="application/json"))
+
+        checks = (
+            (f"ip:{client_ip(request)}", self.ip_limit),
+            (f"email:{email.lower()}", self.email_limit),
+        )
+        for bucket_key, spec in checks:
+            allowed, tokens = await self.buckets.take(bucket_key, spec)
+            if not allowed:
+                if key:
+                    await self.claims.release(key)
+                submissions_rejected.inc(kind, "rate_limited")
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many submissions, please try again later",
+                    headers={"Retry-After": str(spec.retry_after(tokens))},
+                )
+        return Admission(self, key)
+
+submission_guard = SubmissionGuard()
@@ -0,0 +1,336 @@
+"""Related-vehicle recommendations from an in-memory similarity index.
+
+Every available vehicle becomes a weighted feature vector: one-hot brand, body
+type and category, plus year, log price and mileage scaled so that a few years,
+about a third in price or tens of thousands of kilometres weigh about as much
+as a different brand. Similarity is the negative squared distance between
+vectors. The K most similar vehicles of every row are kept in a neighbour
+table, so answering a query is a row lookup.
+
+Each worker builds its own index on startup, then polls for vehicles whose
+``updated_at`` moved and recomputes only the rows those changes can affect. A
+full rebuild every ``RECOMMENDATION_REBUILD_INTERVAL`` seconds picks up
+deletions and rewrites that kept their timestamps.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+
+from database import vehicles
+from models import VehicleCategory
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_NEIGHBORS = int(os.environ.get('RECOMMENDATION_NEIGHBORS', '12'))
+RECOMMENDATION_REFRESH_INTERVAL = float(os.environ.get('RECOMMENDATION_REFRESH_INTERVAL', '30'))
+RECOMMENDATION_REBUILD_INTERVAL = float(os.environ.get('RECOMMENDATION_REBUILD_INTERVAL', '3600'))
+# Rows scored per matrix product; bounds the build's scratch memory to rows x inventory
+BUILD_CHUNK_ROWS = 256
+# A refresh touching more than this share of the index rebuilds it instead
+REFRESH_REBUILD_FRACTION = float(os.environ.get('RECOMMENDATION_REFRESH_REBUILD_FRACTION', '0.05'))
+# Changes are re-read this far back, in case a write landed just behind the previous poll
+REFRESH_LOOKBACK = timedelta(seconds=5)
+
+# Weight of a mismatch in each one-hot block (distance contribution is 2 x weight^2)
+BRAND_WEIGHT = 1.0
+TYPE_WEIGHT = 1.0
+CATEGORY_WEIGHT = 1.0
+# Differences that count as much as one unit of distance
+YEAR_SCALE = 3.0
+LOG_PRICE_SCALE = 0.3
+MILEAGE_SCALE = 40_000.0
+
+CATEGORIES = [category.value for category in VehicleCategory]
+
+FEATURE_PROJECTION = {
+    "_id": 0, "id": 1, "brand": 1, "type": 1, "category": 1, "year": 1,
+    "price_cents": 1, "mileage_km": 1, "is_available": 1, "updated_at": 1,
+}
+
+def _key(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+def _median(values: List[float], default: float) -> float:
+    return float(np.median(values)) if values else default
+
+@dataclass
+class _Layout:
+    """Column layout of the feature matrix, plus the centre of each numeric column"""
+    brands: Dict[str, int]
+    types: Dict[str, int]
+    year: float
+    log_price: float
+    mileage: float
+
+    @classmethod
+    def from_documents(cls, docs: List[Dict[str, Any]]) -> "_Layout":
+        return cls(
+            brands={name: i for i, name in enumerate(sorted({_key(doc.get("brand")) for doc in docs}))},
+            types={name: i for i, name in enumerate(sorted({_key(doc.get("type")) for doc in docs}))},
+            year=_median([doc["year"] for doc in docs if doc.get("year")], 2020.0),
+            log_price=_median([np.log(doc["price_cents"]) for doc in docs if doc.get("price_cents")], 0.0),
+            mileage=_median([doc["mileage_km"] for doc in docs if doc.get("mileage_km") is not None], 0.0),
+        )
+
+    @property
+    def width(self) -> int:
+        return len(self.brands) + len(self.types) + len(CATEGORIES) + 3
+
+    def covers(self, doc: Dict[str, Any]) -> bool:
+        return _key(doc.get("brand")) in self.brands and _key(doc.get("type")) in self.types
+
+    def encode(self, docs: List[Dict[str, Any]]) -> np.ndarray:
+        """One feature row per document"""
+        type_offset = len(self.brands)
+        category_offset = type_offset + len(self.types)
+        numeric = category_offset + len(CATEGORIES)
+        matrix = np.zeros((len(docs), self.width), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            # Unknown values only reach here on rows being deactivated
+            brand = self.brands.get(_key(doc.get("brand")))
+            if brand is not None:
+                matrix[row, brand] = BRAND_WEIGHT
+            body_type = self.types.get(_key(doc.get("type")))
+            if body_type is not None:
+                matrix[row, type_offset + body_type] = TYPE_WEIGHT
+            if doc.get("category") in CATEGORIES:
+                matrix[row, category_offset + CATEGORIES.index(doc["category"])] = CATEGORY_WEIGHT
+            # Centred before scaling so float32 keeps the small differences that matter
+            year = doc.get("year") or self.year
+            log_price = np.log(doc["price_cents"]) if doc.get("price_cents") else self.log_price
+            mileage = doc.get("mileage_km")
+            if mileage is None:
+                mileage = 0.0 if doc.get("category") == VehicleCategory.NEW.value else self.mileage
+            matrix[row, numeric] = (year - self.year) / YEAR_SCALE
+            matrix[row, numeric + 1] = (log_price - self.log_price) / LOG_PRICE_SCALE
+            matrix[row, numeric + 2] = (mileage - self.mileage) / MILEAGE_SCALE
+        return matrix
+
+@dataclass
+class _IndexState:
+    """One immutable generation of the index; refreshes build a new one and swap it in"""
+    layout: _Layout
+    ids: List[str]
+    positions: Dict[str, int]
+    features: np.ndarray   # (rows, width)
+    squared: np.ndarray    # (rows,) squared norms; inf for inactive rows
+    active: np.ndarray     # (rows,) bool
+    neighbors: np.ndarray  # (rows, k) row numbers, most similar first, -1 padded
+    scores: np.ndarray     # (rows, k) matching similarities, -inf padded
+
+def _nearest(state: _IndexState, rows: np.ndarray, k: int):
+    """Top-k rows by similarity (negative squared distance) for each of rows"""
+    neighbors = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    count = min(k, len(state.ids))
+    if count == 0:
+        return neighbors, scores
+    for start in range(0, len(rows), BUILD_CHUNK_ROWS):
+        chunk = rows[start:start + BUILD_CHUNK_ROWS]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, computed in place to keep one block in memory;
+        # |a|^2 is the same along a row, so it is only added to the winners
+        distances = state.features[chunk] @ state.features.T
+        distances *= -2
+        distances += state.squared[None, :]
+        distances[np.arange(len(chunk)), chunk] = np.inf
+        top = np.argpartition(distances, count - 1, axis=1)[:, :count]
+        top_distances = np.take_along_axis(distances, top, axis=1) + state.squared[chunk, None]
+        order = np.argsort(top_distances, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_distances = np.take_along_axis(top_distances, order, axis=1)
+        top[~np.isfinite(top_distances)] = -1
+        neighbors[start:start + len(chunk), :count] = top
+        scores[start:start + len(chunk), :count] = -top_distances
+    return neighbors, scores
+
+def _squared_norms(features: np.ndarray, active: np.ndarray) -> np.ndarray:
+    squared = np.einsum("ij,ij->i", features, features)
+    # An inactive row is infinitely far from everything, so it is never a neighbour
+    squared[~active] = np.inf
+    return squared
+
+def build_state(docs: List[Dict[str, Any]], k: int = RECOMMENDATION_NEIGHBORS) -> _IndexState:
+    """A fresh index over the given (available) vehicles"""
+    layout = _Layout.from_documents(docs)
+    features = layout.encode(docs)
+    active = np.ones(len(docs), dtype=bool)
+    state = _IndexState(
+        layout=layout,
+        ids=[doc["id"] for doc in docs],
+        positions={doc["id"]: row for row, doc in enumerate(docs)},
+        features=features,
+        squared=_squared_norms(features, active),
+        active=active,
+        neighbors=np.empty((0, k), dtype=np.int32),
+        scores=np.empty((0, k), dtype=np.float32),
+    )
+    state.neighbors, state.scores = _nearest(state, np.arange(len(docs)), k)
+    return state
+
+def apply_changes(state: _IndexState, docs: List[Dict[str, Any]]) -> _IndexState:
+    """A new index with changed vehicles re-encoded and only the affected rows re-ranked.
+
+    A row is affected if it is one of the changed vehicles, if one of its
+    current neighbours changed, or if a changed vehicle now beats its k-th
+    neighbour. Available documents must fit the state's layout.
+    """
+    k = state.neighbors.shape[1]
+    indexed = [doc for doc in docs if doc["id"] in state.positions or doc.get("is_available")]
+    if not indexed:
+        return state
+    ids = list(state.ids)
+    positions = dict(state.positions)
+    for doc in indexed:
+        if doc["id"] not in positions:
+            positions[doc["id"]] = len(ids)
+            ids.append(doc["id"])
+    grow = len(ids) - len(state.ids)
+    features = np.vstack([state.features, np.zeros((grow, state.features.shape[1]), dtype=np.float32)])
+    active = np.concatenate([state.active, np.zeros(grow, dtype=bool)])
+    neighbors = np.vstack([state.neighbors, np.full((grow, k), -1, dtype=np.int32)])
+    scores = np.vstack([state.scores, np.full((grow, k), -np.inf, dtype=np.float32)])
+
+    changed = np.array([positions[doc["id"]] for doc in indexed], dtype=np.int64)
+    features[changed] = state.layout.encode(indexed)
+    active[changed] = [bool(doc.get("is_available")) for doc in indexed]
+    new_state = _IndexState(
+        layout=state.layout, ids=ids, positions=positions, features=features,
+        squared=_squared_norms(features, active), active=active, neighbors=neighbors, scores=scores,
+    )
+
+    affected = np.isin(neighbors, changed).any(axis=1)
+    # Scored BUILD_CHUNK_ROWS changed vehicles at a time, so scratch stays at inventory x chunk
+    for start in range(0, len(changed), BUILD_CHUNK_ROWS):
+        chunk = changed[start:start + BUILD_CHUNK_ROWS]
+        cross = 2 * (features @ features[chunk].T) - new_state.squared[:, None] - new_state.squared[None, chunk]
+        affected |= (cross > scores[:, -1:]).any(axis=1)
+    affected[changed] = True
+    affected &= active
+    rows = np.flatnonzero(affected)
+    neighbors[rows], scores[rows] = _nearest(new_state, rows, k)
+    neighbors[~active] = -1
+    scores[~active] = -np.inf
+    return new_state
+
+class SimilarityIndex:
+    def __init__(
+        self,
+        k: int = RECOMMENDATION_NEIGHBORS,
+        refresh_interval: float = RECOMMENDATION_REFRESH_INTERVAL,
+        rebuild_interval: float = RECOMMENDATION_REBUILD_INTERVAL,
+    ):
+        self.k = k
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.builds = 0
+        self.refreshes = 0
+        self.last_build_seconds: Optional[float] = None
+        self._state: Optional[_IndexState] = None
+        self._seen_until: Optional[datetime] = None
+        self._built_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def similar(self, vehicle_id: str, limit: int) -> Optional[List[str]]:
+        """Ids of the most similar available vehicles, or None if vehicle_id is not indexed"""
+        state = self._state
+        if state is None:
+            return None
+        row = state.positions.get(vehicle_id)
+        if row is None or not state.active[row]:
+            return None
+        return [state.ids[neighbor] for neighbor in state.neighbors[row, :limit] if neighbor >= 0]
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def schedule(self):
+        """Look for vehicle changes now instead of at the next poll"""
+        self._wake.set()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "ready": state is not None,
+            "vehicles": int(state.active.sum()) if state is not None else 0,
+            "neighbors": self.k,
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+            "last_build_seconds": self.last_build_seconds,
+        }
+
+    async def rebuild(self):
+        """Rebuild the whole index from the available inventory"""
+        started = time.perf_counter()
+        polled_at = datetime.utcnow()
+        docs = await vehicles.find({"is_available": True}, FEATURE_PROJECTION).to_list(None)
+        self._state = await asyncio.to_thread(build_state, docs, self.k)
+        self._seen_until = polled_at
+        self._built_at = time.monotonic()
+        self.builds += 1
+        self.last_build_seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"Built similarity index over {len(docs)} vehicles in {self.last_build_seconds}s")
+
+    async def refresh(self):
+        """Apply vehicles changed since the last poll; a new column or a large change set rebuilds instead"""
+        polled_at = datetime.utcnow()
+        docs = await vehicles.find(
+            {"updated_at": {"$gt": self._seen_until - REFRESH_LOOKBACK}}, FEATURE_PROJECTION
+        ).to_list(None)
+        if not docs:
+            self._seen_until = polled_at
+            return
+        if not all(self._state.layout.covers(doc) for doc in docs if doc.get("is_available")):
+            await self.rebuild()
+            return
+        if len(docs) > REFRESH_REBUILD_FRACTION * len(self._state.ids):
+            # Re-ranking most rows costs about as much as a rebuild
+            await self.rebuild()
+            return
+        self._state = await asyncio.to_thread(apply_changes, self._state, docs)
+        self._seen_until = polled_at
+        self.refreshes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                if self._state is None or time.monotonic() - self._built_at >= self.rebuild_interval:
+                    await self.rebuild()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error updating similarity index: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+similarity_index = SimilarityIndex()
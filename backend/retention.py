@@ -0,0 +1,376 @@
+"""Retention for the lead collections.
+
+Closed leads older than ``LEAD_RETENTION_CLOSED_DAYS``, and any lead older
+than ``LEAD_RETENTION_MAX_AGE_DAYS``, are moved out of contact_submissions and
+car_inquiries in batches, so the hot collections and their indexes stay the
+size of the open pipeline.
+
+Archived leads go to ``*_archive`` collections (``LEAD_ARCHIVE_TARGET=collection``,
+the default), paged like the live lists, or to compressed NDJSON files under
+``LEAD_ARCHIVE_DIR`` (``file``): zstd when the ``zstandard`` package is
+installed, gzip otherwise. A file search only opens the files whose date range
+overlaps the query.
+
+Each batch is written to the archive before it is deleted from the hot
+collection, so an interrupted run can leave a duplicate but never loses a lead.
+The delete re-applies the retention rules, and leads that stopped matching in
+between (e.g. reopened) stay live and are dropped from the archive again.
+"""
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from pydantic import BaseModel
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+import asyncio
+import gzip
+import hashlib
+import heapq
+import logging
+import os
+import re
+import socket
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from database import (
+    contact_submissions, car_inquiries, contact_submissions_archive, car_inquiries_archive, job_leases
+)
+from models import CarInquiry, ContactSubmission
+from pagination import decode_cursor, encode_cursor, fetch_page
+from serialization import encode_document
+from stats import record_archived
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+LEAD_RETENTION_ENABLED = os.environ.get('LEAD_RETENTION_ENABLED', 'false').lower() == 'true'
+LEAD_RETENTION_CLOSED_DAYS = int(os.environ.get('LEAD_RETENTION_CLOSED_DAYS', '365'))
+# 0 keeps open leads in the hot collections however old they are
+LEAD_RETENTION_MAX_AGE_DAYS = int(os.environ.get('LEAD_RETENTION_MAX_AGE_DAYS', '0'))
+LEAD_RETENTION_BATCH_SIZE = int(os.environ.get('LEAD_RETENTION_BATCH_SIZE', '1000'))
+LEAD_RETENTION_INTERVAL = float(os.environ.get('LEAD_RETENTION_INTERVAL', '86400'))
+LEAD_ARCHIVE_TARGET = os.environ.get('LEAD_ARCHIVE_TARGET', 'collection')
+LEAD_ARCHIVE_DIR = Path(os.environ.get('LEAD_ARCHIVE_DIR', str(ROOT_DIR / 'archive')))
+# Archived documents get an expires_at for the TTL index; 0 keeps them forever
+LEAD_ARCHIVE_TTL_DAYS = int(os.environ.get('LEAD_ARCHIVE_TTL_DAYS', '0'))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', '9'))
+
+NO_ID = {"_id": 0}
+LEASE_NAME = "lead-retention"
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Kind -> (hot collection, archive collection, model, email field)
+ARCHIVE_SOURCES = {
+    "contacts": (contact_submissions, contact_submissions_archive, ContactSubmission, "email"),
+    "inquiries": (car_inquiries, car_inquiries_archive, CarInquiry, "customer_email"),
+}
+
+ARCHIVE_SUFFIX = ".ndjson.zst" if zstandard is not None else ".ndjson.gz"
+_FILE_PATTERN = re.compile(r"^(\d{8}T\d{6})-(\d{8}T\d{6})-[0-9a-f]{12}\.ndjson\.(zst|gz)$")
+_FILE_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, mtime=0)
+
+def _decompress(path: Path) -> bytes:
+    data = path.read_bytes()
+    if path.suffix == ".gz":
+        return gzip.decompress(data)
+    if zstandard is None:
+        raise RuntimeError(f"{path.name} needs the zstandard package")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+def _write_atomic(path: Path, data: bytes):
+    partial = path.with_name(path.name + ".tmp")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+@dataclass
+class ArchiveQuery:
+    """Filters accepted by an archive search"""
+    id: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
+    car_id: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    def to_filter(self, email_field: str) -> Dict[str, Any]:
+        filter_dict: Dict[str, Any] = {}
+        for field, value in (("id", self.id), (email_field, self.email), ("status", self.status), ("car_id", self.car_id)):
+            if value is not None:
+                filter_dict[field] = value
+        submitted = {}
+        if self.since:
+            submitted["$gte"] = self.since
+        if self.until:
+            submitted["$lt"] = self.until
+        if submitted:
+            filter_dict["submitted_at"] = submitted
+        return filter_dict
+
+    def matches(self, doc: Dict[str, Any], email_field: str) -> bool:
+        for field, value in (("id", self.id), (email_field, self.email), ("status", self.status), ("car_id", self.car_id)):
+            if value is not None and doc.get(field) != value:
+                return False
+        if self.since and doc["submitted_at"] < self.since:
+            return False
+        if self.until and doc["submitted_at"] >= self.until:
+            return False
+        return True
+
+class CollectionArchive:
+    """Archived leads in MongoDB collections with the live collections' shape"""
+
+    async def store(self, kind: str, docs: List[Dict[str, Any]], archived_at: datetime):
+        archive = ARCHIVE_SOURCES[kind][1]
+        extra: Dict[str, Any] = {"archived_at": archived_at}
+        if LEAD_ARCHIVE_TTL_DAYS > 0:
+            extra["expires_at"] = archived_at + timedelta(days=LEAD_ARCHIVE_TTL_DAYS)
+        # Replacing by id keeps a re-run of an interrupted batch idempotent
+        await archive.bulk_write(
+            [ReplaceOne({"id": doc["id"]}, {**doc, **extra}, upsert=True) for doc in docs],
+            ordered=False
+        )
+
+    async def discard(self, kind: str, docs: List[Dict[str, Any]], kept_ids: List[str], archived_at: datetime):
+        """Remove this run's copies of leads that stayed in the hot collection"""
+        archive = ARCHIVE_SOURCES[kind][1]
+        await archive.delete_many({"id": {"$in": kept_ids}, "archived_at": archived_at})
+
+    async def search(
+        self, kind: str, query: ArchiveQuery, limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        _, archive, _, email_field = ARCHIVE_SOURCES[kind]
+        return await fetch_page(archive, query.to_filter(email_field), "submitted_at", limit, cursor, NO_ID)
+
+class FileArchive:
+    """Archived leads as compressed NDJSON, one file per batch named by its date range"""
+
+    def __init__(self, directory: Path = LEAD_ARCHIVE_DIR):
+        self.directory = directory
+
+    def _batch_path(self, kind: str, docs: List[Dict[str, Any]]) -> Path:
+        # Named after the batch's contents, so a re-run of an interrupted batch overwrites it
+        digest = hashlib.sha256(",".join(doc["id"] for doc in docs).encode()).hexdigest()[:12]
+        first = docs[0]["submitted_at"].strftime(_FILE_TIME_FORMAT)
+        last = docs[-1]["submitted_at"].strftime(_FILE_TIME_FORMAT)
+        return self.directory / kind / f"{first}-{last}-{digest}{ARCHIVE_SUFFIX}"
+
+    async def store(self, kind: str, docs: List[Dict[str, Any]], archived_at: datetime):
+        model = ARCHIVE_SOURCES[kind][2]
+        body = b"".join(encode_document(model, doc) + b"\n" for doc in docs)
+        path = self._batch_path(kind, docs)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = await asyncio.to_thread(_compress, body)
+        _write_atomic(path, data)
+
+    async def discard(self, kind: str, docs: List[Dict[str, Any]], kept_ids: List[str], archived_at: datetime):
+        """Rewrite a stored batch without the leads that stayed in the hot collection"""
+        kept = set(kept_ids)
+        remaining = [doc for doc in docs if doc["id"] not in kept]
+        if remaining:
+            await self.store(kind, remaining, archived_at)
+        self._batch_path(kind, docs).unlink(missing_ok=True)
+
+    async def search(
+        self, kind: str, query: ArchiveQuery, limit: int, cursor: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        position = decode_cursor(cursor, "submitted_at") if cursor else None
+        return await asyncio.to_thread(self._scan, kind, query, limit, position)
+
+    def _scan(
+        self, kind: str, query: ArchiveQuery, limit: int, position: Optional[Tuple[datetime, str]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        model: Type[BaseModel] = ARCHIVE_SOURCES[kind][2]
+        email_field = ARCHIVE_SOURCES[kind][3]
+        upper = min(filter(None, (query.until, position[0] if position else None)), default=None)
+        candidates = []
+        for path in (self.directory / kind).glob("*.ndjson.*"):
+            match = _FILE_PATTERN.match(path.name)
+            if not match:
+                continue
+            first = datetime.strptime(match.group(1), _FILE_TIME_FORMAT)
+            # Names are truncated to the second, so a file runs to the end of its last second
+            end = datetime.strptime(match.group(2), _FILE_TIME_FORMAT) + timedelta(seconds=1)
+            if (query.since and end <= query.since) or (upper and first > upper):
+                continue
+            candidates.append((end, path.name, path))
+
+        # The newest limit + 1 matches seen so far, oldest on top; ids dedupe re-run batches
+        page: List[Tuple[datetime, str, Dict[str, Any]]] = []
+        on_page = set()
+        for end, _, path in sorted(candidates, reverse=True):
+            if len(page) > limit and page[0][0] >= end:
+                # Files are visited by their newest possible lead, so none of the rest can place
+                break
+            try:
+                lines = _decompress(path).splitlines()
+            except Exception as e:
+                logger.error(f"Error reading lead archive {path.name}: {e}")
+                continue
+            for line in lines:
+                doc = model.model_validate_json(line).model_dump()
+                if doc["id"] in on_page or not query.matches(doc, email_field):
+                    continue
+                key = (doc["submitted_at"], doc["id"])
+                if position and key >= position:
+                    continue
+                if len(page) <= limit:
+                    heapq.heappush(page, (*key, doc))
+                elif key > page[0][:2]:
+                    on_page.discard(heapq.heapreplace(page, (*key, doc))[1])
+                else:
+                    continue
+                on_page.add(doc["id"])
+
+        docs = [doc for _, _, doc in sorted(page, key=lambda entry: entry[:2], reverse=True)]
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor("submitted_at", docs[-1]["submitted_at"], docs[-1]["id"])
+        return docs, next_cursor
+
+class LeadRetention:
+    def __init__(
+        self,
+        target: str = LEAD_ARCHIVE_TARGET,
+        closed_days: int = LEAD_RETENTION_CLOSED_DAYS,
+        max_age_days: int = LEAD_RETENTION_MAX_AGE_DAYS,
+        batch_size: int = LEAD_RETENTION_BATCH_SIZE,
+        interval: float = LEAD_RETENTION_INTERVAL,
+        enabled: bool = LEAD_RETENTION_ENABLED,
+    ):
+        self.target = target
+        self.archive = FileArchive() if target == "file" else CollectionArchive()
+        self.closed_days = closed_days
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.enabled = enabled
+        self.runs = 0
+        self.archived: Counter = Counter()
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def retention_filter(self, now: datetime) -> Optional[Dict[str, Any]]:
+        """Leads due for archiving, or None if both rules are off"""
+        clauses = []
+        if self.closed_days > 0:
+            clauses.append({"status": "closed", "submitted_at": {"$lt": now - timedelta(days=self.closed_days)}})
+        if self.max_age_days > 0:
+            clauses.append({"submitted_at": {"$lt": now - timedelta(days=self.max_age_days)}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    async def count_due(self) -> Dict[str, int]:
+        """How many leads of each kind the next run would archive"""
+        filter_dict = self.retention_filter(datetime.utcnow())
+        if filter_dict is None:
+            return {kind: 0 for kind in ARCHIVE_SOURCES}
+        counts = await asyncio.gather(*(
+            hot.count_documents(filter_dict) for hot, _, _, _ in ARCHIVE_SOURCES.values()
+        ))
+        return dict(zip(ARCHIVE_SOURCES, counts))
+
+    async def run_once(self) -> Dict[str, int]:
+        """Archive every lead currently due, one batch at a time"""
+        now = datetime.utcnow()
+        filter_dict = self.retention_filter(now)
+        moved = {kind: 0 for kind in ARCHIVE_SOURCES}
+        if filter_dict is None:
+            return moved
+        for kind, (hot, _, _, _) in ARCHIVE_SOURCES.items():
+            while True:
+                docs = await hot.find(filter_dict, NO_ID).sort(
+                    [("submitted_at", 1), ("id", 1)]
+                ).limit(self.batch_size).to_list(self.batch_size)
+                if not docs:
+                    break
+                ids = [doc["id"] for doc in docs]
+                await self.archive.store(kind, docs, now)
+                # Only leads still due are deleted; one reopened since the read stays live
+                result = await hot.delete_many({"$and": [filter_dict, {"id": {"$in": ids}}]})
+                if result.deleted_count < len(docs):
+                    kept = await hot.distinct("id", {"id": {"$in": ids}})
+                    if kept:
+                        await self.archive.discard(kind, docs, kept, now)
+                await record_archived(kind, result.deleted_count)
+                moved[kind] += result.deleted_count
+                if result.deleted_count == 0:
+                    break
+        self.runs += 1
+        self.archived.update(moved)
+        self.last_run = now
+        logger.info(f"Archived leads: {moved}")
+        return moved
+
+    async def search(
+        self, kind: str, query: ArchiveQuery, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of archived leads, newest first"""
+        return await self.archive.search(kind, query, limit, cursor)
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "target": self.target,
+            "runs": self.runs,
+            "archived": dict(self.archived),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_error": self.last_error,
+        }
+
+    async def _claim_run(self) -> bool:
+        """Take the shared lease for one interval, so only one worker runs per interval"""
+        now = datetime.utcnow()
+        try:
+            await job_leases.update_one(
+                {"_id": LEASE_NAME, "expires_at": {"$lte": now}},
+                {"$set": {"expires_at": now + timedelta(seconds=self.interval), "holder": LEASE_HOLDER}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._claim_run():
+                    await self.run_once()
+                    self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error archiving leads: {e}")
+            await asyncio.sleep(self.interval)
+
+lead_retention = LeadRetention()
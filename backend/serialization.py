@@ -0,0 +1,68 @@
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter, create_model
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+import time
+
+from metrics import serialization_duration
+
+# Adapters and sparse-fieldset models kept per process; fields= takes any
+# combination of vehicle fields, so these caches must not grow without bound
+MODEL_CACHE_SIZE = 128
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A model with only the given fields of model, for sparse fieldsets.
+
+    Extra keys in the document (e.g. fields fetched only for paging) are
+    ignored, so the encoded body carries exactly the requested fields.
+    """
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in model.model_fields.items()
+        if name in fields
+    }
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+def encode_documents(model: Type[BaseModel], docs: Iterable[Mapping[str, Any]]) -> bytes:
+    """Validate raw Mongo documents once and encode them straight to JSON bytes.
+
+    Validation and encoding both run in pydantic-core, so no intermediate
+    model list is re-validated by FastAPI or walked by jsonable_encoder.
+    """
+    started = time.perf_counter()
+    adapter = _list_adapter(model)
+    body = adapter.dump_json(adapter.validate_python(list(docs)))
+    serialization_duration.observe(time.perf_counter() - started, model.__name__)
+    return body
+
+def encode_document(model: Type[BaseModel], doc: Mapping[str, Any]) -> bytes:
+    """Validate and encode a single raw document"""
+    started = time.perf_counter()
+    adapter = _adapter(model)
+    body = adapter.dump_json(adapter.validate_python(doc))
+    serialization_duration.observe(time.perf_counter() - started, model.__name__)
+    return body
+
+def to_jsonable(model: Type[BaseModel], doc: Mapping[str, Any]) -> Dict[str, Any]:
+    """Validate a raw document into JSON-compatible Python values (e.g. for CSV rows)"""
+    adapter = _adapter(model)
+    return adapter.dump_python(adapter.validate_python(doc), mode="json")
+
+def encode_model(obj: BaseModel) -> bytes:
+    """Encode an already validated model without validating it again"""
+    return _adapter(type(obj)).dump_json(obj)
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+def model_response(obj: BaseModel) -> Response:
+    return json_response(encode_model(obj))
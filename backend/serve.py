@@ -0,0 +1,75 @@
+"""Production entry point: one Uvicorn worker process per available CPU.
+
+Run from the backend directory with ``python serve.py``. Each worker is a
+separate process with its own MongoDB pool and in-process caches, so the
+connections a node opens are roughly WEB_CONCURRENCY x MONGO_MAX_POOL_SIZE.
+
+State that stays per worker:
+
+- The catalog response cache: a write invalidates it only in the worker that
+  handled the write, so the others can serve the old list for up to
+  CATALOG_CACHE_TTL seconds.
+- ``/metrics``: each scrape reports the worker that answered it.
+- Rate limits: with more than one worker the limiter must share its state, so
+  RATE_LIMIT_BACKEND defaults to ``mongo`` and ``memory`` is refused.
+
+Buffered lead spill files and catalog snapshots are coordinated through file
+locks in their directories, so workers can share LEAD_SPILL_DIR and SNAPSHOT_DIR.
+"""
+from dotenv import load_dotenv
+from pathlib import Path
+import logging
+import os
+
+import uvicorn
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring container CPU affinity"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def worker_count() -> int:
+    configured = os.environ.get('WEB_CONCURRENCY')
+    if configured:
+        return max(1, int(configured))
+    return available_cpus()
+
+def check_shared_state(workers: int):
+    """Make per-process settings safe for the given number of workers"""
+    if workers == 1:
+        return
+    backend = os.environ.get('RATE_LIMIT_BACKEND')
+    if backend == 'memory':
+        raise SystemExit(
+            f"RATE_LIMIT_BACKEND=memory would give each of the {workers} workers its own limits; "
+            "use RATE_LIMIT_BACKEND=mongo or WEB_CONCURRENCY=1"
+        )
+    if backend is None:
+        # Workers inherit the environment, so they all pick up the shared backend
+        os.environ['RATE_LIMIT_BACKEND'] = 'mongo'
+
+def main():
+    workers = worker_count()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    check_shared_state(workers)
+    logger.info(f"Starting {workers} workers")
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', '8001')),
+        workers=workers,
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1'),
+        timeout_keep_alive=int(os.environ.get('KEEP_ALIVE_TIMEOUT', '5')),
+        log_level=os.environ.get('LOG_LEVEL', 'info'),
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,63 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, UploadFile, File
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+import asyncio
+import json
 import os
 import logging
+import httpx
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 # Import models and database
 from models import (
-    ContactSubmission, ContactSubmissionCreate, ContactSubmissionUpdate,
-    CarInquiry, CarInquiryCreate, CarInquiryUpdate,
+    ContactSubmission, ContactSubmissionCreate, ContactSubmissionUpdate, ContactStatus,
+    CarInquiry, CarInquiryCreate, CarInquiryUpdate, InquiryStatus,
     Testimonial, TestimonialCreate, TestimonialApprove,
-    Vehicle, VehicleCreate, VehicleUpdate, VehicleCategory,
-    DashboardStats
+    Vehicle, VehicleCreate, VehicleUpdate, VehicleCategory, VehicleSort, vehicle_document,
+    VehicleImportResult, DataFormat, DashboardStats, ImageAsset, ImageFetch,
+    VehicleDemand, DemandPoint, VehicleBatch, VehicleBatchRequest
 )
 from database import (
-    init_database, close_db_connection,
-    contact_submissions, car_inquiries, testimonials, vehicles
+    init_database, close_db_connection, ping_database, index_build,
+    contact_submissions, car_inquiries, testimonials, vehicles, images,
+    catalog_testimonials, catalog_vehicles
+)
+from pagination import fetch_page, position_filter, NEXT_CURSOR_HEADER
+from vehicle_search import build_vehicle_query, sort_for, parse_fields, projection_for
+from cache import catalog_cache
+from vehicle_io import iter_lines, iter_ndjson_rows, iter_csv_rows, import_vehicles
+from exports import stream_documents, attachment_headers, MEDIA_TYPES, EXPORT_BATCH_SIZE
+from stats import compute_dashboard_stats, dashboard_cache
+from lead_writer import lead_pipeline
+from lead_feed import lead_feed
+from analytics import record_status_change, top_vehicles, time_series
+from rate_limit import submission_guard
+from retention import lead_retention, ArchiveQuery
+from metrics import registry, MetricsMiddleware
+from compression import CompressionMiddleware, COMPRESSION_ENABLED
+from recommendations import similarity_index, RECOMMENDATION_NEIGHBORS
+from snapshots import snapshot_builder, IMMUTABLE_CACHE_CONTROL as SNAPSHOT_CACHE_CONTROL, MANIFEST_CACHE_CONTROL
+from images import (
+    image_pipeline, derivative_path, OWNERS, ImageSourceError,
+    IMAGE_MAX_BYTES, IMMUTABLE_CACHE_CONTROL, MEDIA_TYPES as IMAGE_MEDIA_TYPES
+)
+from serialization import encode_documents, encode_document, json_response, model_response, partial_model
+from conditional import (
+    compute_validators, conditional_response,
+    VEHICLE_VERSION_FIELDS, TESTIMONIAL_VERSION_FIELDS
 )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Mongo's _id is never part of an API response, so it is not fetched
+NO_ID = {"_id": 0}
+
+VEHICLE_IMPORT_BATCH_SIZE = int(os.environ.get('VEHICLE_IMPORT_BATCH_SIZE', '500'))
+
 # Create the main app
 app = FastAPI(title="Ben Fortier Car Sales API", version="1.0.0")
 
@@ -37,8 +71,16 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified", "Retry-After"],
 )
 
+# Negotiated gzip/brotli for JSON and text responses above COMPRESSION_MIN_SIZE
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Per-route latency and in-flight metrics
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -46,31 +88,79 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def lead_export_filter(
+    status: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    after: Optional[datetime],
+    after_id: Optional[str],
+) -> dict:
+    """Build the filter for a lead export ordered by (submitted_at, id) ascending"""
+    filter_dict = {}
+    if status:
+        filter_dict["status"] = status
+    submitted_range = {}
+    if since:
+        submitted_range["$gte"] = since
+    if until:
+        submitted_range["$lt"] = until
+    if after and not after_id:
+        submitted_range["$gt"] = after
+    if submitted_range:
+        filter_dict["submitted_at"] = submitted_range
+    if after and after_id:
+        return position_filter(filter_dict, "submitted_at", after, after_id, direction=1)
+    return filter_dict
+
 # Health check
 @api_router.get("/")
 async def root():
     return {"message": "Ben Fortier Car Sales API", "status": "operational"}
 
+@api_router.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and its event loop responsive"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Readiness probe: MongoDB answers and the startup index build has finished"""
+    database_ok = await ping_database()
+    ready = database_ok and index_build.finished
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "database": database_ok,
+            "indexes": index_build.summary(),
+        }
+    )
+
 # Contact Endpoints
 @api_router.post("/contact", response_model=ContactSubmission)
-async def submit_contact(contact_data: ContactSubmissionCreate):
+async def submit_contact(request: Request, contact_data: ContactSubmissionCreate):
     """Submit a new contact form"""
+    admission = await submission_guard.admit(request, "contact", contact_data.email, contact_data)
+    if admission.replay:
+        return admission.replay
     try:
         contact_dict = contact_data.dict()
         contact_obj = ContactSubmission(**contact_dict)
         
-        await contact_submissions.insert_one(contact_obj.dict())
+        await lead_pipeline.contacts.write(contact_obj)
         
         logger.info(f"New contact submission from {contact_obj.email}")
-        return contact_obj
+        return await admission.complete(model_response(contact_obj))
     except Exception as e:
+        await admission.release()
         logger.error(f"Error submitting contact form: {e}")
         raise HTTPException(status_code=500, detail="Failed to submit contact form")
 
 @api_router.get("/contact", response_model=List[ContactSubmission])
 async def get_contacts(
     status: Optional[str] = None,
-    limit: int = Query(50, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
     """Get contact submissions (admin endpoint)"""
     try:
@@ -78,12 +168,39 @@ async def get_contacts(
         if status:
             filter_dict["status"] = status
             
-        contacts = await contact_submissions.find(filter_dict).sort("submitted_at", -1).limit(limit).to_list(limit)
-        return [ContactSubmission(**contact) for contact in contacts]
+        contacts, next_cursor = await fetch_page(contact_submissions, filter_dict, "submitted_at", limit, cursor, NO_ID)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return json_response(encode_documents(ContactSubmission, contacts), headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving contacts: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve contacts")
 
+@api_router.get("/contact/export")
+async def export_contacts(
+    format: DataFormat = DataFormat.CSV,
+    status: Optional[ContactStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    after_id: Optional[str] = None
+):
+    """Stream contact submissions oldest first as CSV or NDJSON (admin endpoint)
+
+    Pass the last exported row's ``submitted_at`` as ``after`` (and its ``id``
+    as ``after_id``) to resume an incremental sync.
+    """
+    filter_dict = lead_export_filter(status.value if status else None, since, until, after, after_id)
+    cursor = contact_submissions.find(filter_dict, NO_ID).sort(
+        [("submitted_at", 1), ("id", 1)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        stream_documents(cursor, ContactSubmission, format),
+        media_type=MEDIA_TYPES[format],
+        headers=attachment_headers("contacts", format)
+    )
+
 @api_router.put("/contact/{contact_id}", response_model=ContactSubmission)
 async def update_contact(contact_id: str, update_data: ContactSubmissionUpdate):
     """Update contact status (admin endpoint)"""
@@ -93,13 +210,14 @@ async def update_contact(contact_id: str, update_data: ContactSubmissionUpdate):
         result = await contact_submissions.find_one_and_update(
             {"id": contact_id},
             {"$set": update_dict},
+            projection=NO_ID,
             return_document=True
         )
         
         if not result:
             raise HTTPException(status_code=404, detail="Contact not found")
             
-        return ContactSubmission(**result)
+        return json_response(encode_document(ContactSubmission, result))
     except HTTPException:
         raise
     except Exception as e:
@@ -108,17 +226,21 @@ async def update_contact(contact_id: str, update_data: ContactSubmissionUpdate):
 
 # Car Inquiry Endpoints
 @api_router.post("/inquiries", response_model=CarInquiry)
-async def submit_inquiry(inquiry_data: CarInquiryCreate):
+async def submit_inquiry(request: Request, inquiry_data: CarInquiryCreate):
     """Submit a car inquiry"""
+    admission = await submission_guard.admit(request, "inquiry", inquiry_data.customer_email, inquiry_data)
+    if admission.replay:
+        return admission.replay
     try:
         inquiry_dict = inquiry_data.dict()
         inquiry_obj = CarInquiry(**inquiry_dict)
         
-        await car_inquiries.insert_one(inquiry_obj.dict())
+        await lead_pipeline.inquiries.write(inquiry_obj)
         
         logger.info(f"New car inquiry for {inquiry_obj.car_id} from {inquiry_obj.customer_email}")
-        return inquiry_obj
+        return await admission.complete(model_response(inquiry_obj))
     except Exception as e:
+        await admission.release()
         logger.error(f"Error submitting car inquiry: {e}")
         raise HTTPException(status_code=500, detail="Failed to submit inquiry")
 
@@ -126,7 +248,8 @@ async def submit_inquiry(inquiry_data: CarInquiryCreate):
 async def get_inquiries(
     status: Optional[str] = None,
     car_id: Optional[str] = None,
-    limit: int = Query(50, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
     """Get car inquiries (admin endpoint)"""
     try:
@@ -136,36 +259,162 @@ async def get_inquiries(
         if car_id:
             filter_dict["car_id"] = car_id
             
-        inquiries = await car_inquiries.find(filter_dict).sort("submitted_at", -1).limit(limit).to_list(limit)
-        return [CarInquiry(**inquiry) for inquiry in inquiries]
+        inquiries, next_cursor = await fetch_page(car_inquiries, filter_dict, "submitted_at", limit, cursor, NO_ID)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return json_response(encode_documents(CarInquiry, inquiries), headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving inquiries: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve inquiries")
 
+@api_router.get("/inquiries/export")
+async def export_inquiries(
+    format: DataFormat = DataFormat.CSV,
+    status: Optional[InquiryStatus] = None,
+    car_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    after_id: Optional[str] = None
+):
+    """Stream car inquiries oldest first as CSV or NDJSON (admin endpoint)
+
+    Pass the last exported row's ``submitted_at`` as ``after`` (and its ``id``
+    as ``after_id``) to resume an incremental sync.
+    """
+    filter_dict = lead_export_filter(status.value if status else None, since, until, after, after_id)
+    if car_id:
+        filter_dict = {"$and": [filter_dict, {"car_id": car_id}]} if filter_dict else {"car_id": car_id}
+    cursor = car_inquiries.find(filter_dict, NO_ID).sort(
+        [("submitted_at", 1), ("id", 1)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        stream_documents(cursor, CarInquiry, format),
+        media_type=MEDIA_TYPES[format],
+        headers=attachment_headers("inquiries", format)
+    )
+
+@api_router.put("/inquiries/{inquiry_id}", response_model=CarInquiry)
+async def update_inquiry(inquiry_id: str, update_data: CarInquiryUpdate):
+    """Update inquiry status (admin endpoint)"""
+    try:
+        update_dict = {k: v.value for k, v in update_data.dict().items() if v is not None}
+        if not update_dict:
+            raise HTTPException(status_code=400, detail="No changes given")
+        
+        # The previous status comes back atomically, so the rollups move exactly one count
+        previous = await car_inquiries.find_one_and_update(
+            {"id": inquiry_id},
+            {"$set": update_dict},
+            projection=NO_ID
+        )
+        
+        if not previous:
+            raise HTTPException(status_code=404, detail="Inquiry not found")
+        if "status" in update_dict:
+            await record_status_change(previous, previous["status"], update_dict["status"])
+            
+        return json_response(encode_document(CarInquiry, {**previous, **update_dict}))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating inquiry: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update inquiry")
+
+# Lead Archive
+@api_router.get("/archive/contacts", response_model=List[ContactSubmission])
+async def get_archived_contacts(
+    id: Optional[str] = None,
+    email: Optional[str] = None,
+    status: Optional[ContactStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Search archived contact submissions, newest first (admin endpoint)"""
+    try:
+        query = ArchiveQuery(id=id, email=email, status=status.value if status else None, since=since, until=until)
+        contacts, next_cursor = await lead_retention.search("contacts", query, limit, cursor)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return json_response(encode_documents(ContactSubmission, contacts), headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching archived contacts: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search archived contacts")
+
+@api_router.get("/archive/inquiries", response_model=List[CarInquiry])
+async def get_archived_inquiries(
+    id: Optional[str] = None,
+    email: Optional[str] = None,
+    car_id: Optional[str] = None,
+    status: Optional[InquiryStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Search archived car inquiries, newest first (admin endpoint)"""
+    try:
+        query = ArchiveQuery(
+            id=id, email=email, car_id=car_id, status=status.value if status else None, since=since, until=until
+        )
+        inquiries, next_cursor = await lead_retention.search("inquiries", query, limit, cursor)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return json_response(encode_documents(CarInquiry, inquiries), headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching archived inquiries: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search archived inquiries")
+
+@api_router.get("/archive/stats")
+async def get_archive_stats():
+    """Get retention settings, run counters and leads currently due (admin endpoint)"""
+    return {**lead_retention.stats(), "due": await lead_retention.count_due()}
+
 # Testimonial Endpoints
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials(approved_only: bool = True):
+async def get_testimonials(request: Request, approved_only: bool = True):
     """Get testimonials (public endpoint)"""
     try:
+        cache_key = catalog_cache.make_key("testimonials", {"approved_only": approved_only})
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return cached.to_response(request)
+
         filter_dict = {"is_approved": True} if approved_only else {}
-        testimonials_list = await testimonials.find(filter_dict).sort("created_at", -1).to_list(100)
-        return [Testimonial(**testimonial) for testimonial in testimonials_list]
+        # Moderation reads (approved_only=false) must see the primary's latest writes
+        source = catalog_testimonials if approved_only else testimonials
+        testimonials_list = await source.find(filter_dict, NO_ID).sort("created_at", -1).to_list(100)
+        headers = compute_validators(testimonials_list, TESTIMONIAL_VERSION_FIELDS, last_modified=False)
+        not_modified = conditional_response(request, headers)
+        if not_modified:
+            return not_modified
+        return catalog_cache.store(cache_key, encode_documents(Testimonial, testimonials_list), headers, request)
     except Exception as e:
         logger.error(f"Error retrieving testimonials: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve testimonials")
 
 @api_router.post("/testimonials", response_model=Testimonial)
-async def submit_testimonial(testimonial_data: TestimonialCreate):
+async def submit_testimonial(request: Request, testimonial_data: TestimonialCreate):
     """Submit a new testimonial"""
+    admission = await submission_guard.admit(request, "testimonial", testimonial_data.email, testimonial_data)
+    if admission.replay:
+        return admission.replay
     try:
         testimonial_dict = testimonial_data.dict()
         testimonial_obj = Testimonial(**testimonial_dict)
         
         await testimonials.insert_one(testimonial_obj.dict())
+        catalog_cache.invalidate("testimonials")
         
         logger.info(f"New testimonial submitted by {testimonial_obj.email}")
-        return testimonial_obj
+        return await admission.complete(model_response(testimonial_obj))
     except Exception as e:
+        await admission.release()
         logger.error(f"Error submitting testimonial: {e}")
         raise HTTPException(status_code=500, detail="Failed to submit testimonial")
 
@@ -180,13 +429,16 @@ async def approve_testimonial(testimonial_id: str, approval_data: TestimonialApp
         result = await testimonials.find_one_and_update(
             {"id": testimonial_id},
             {"$set": update_dict},
+            projection=NO_ID,
             return_document=True
         )
         
         if not result:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        catalog_cache.invalidate("testimonials")
+        snapshot_builder.schedule("testimonials")
             
-        return Testimonial(**result)
+        return json_response(encode_document(Testimonial, result))
     except HTTPException:
         raise
     except Exception as e:
@@ -196,41 +448,193 @@ async def approve_testimonial(testimonial_id: str, approval_data: TestimonialApp
 # Vehicle Endpoints
 @api_router.get("/vehicles", response_model=List[Vehicle])
 async def get_vehicles(
+    request: Request,
     category: Optional[VehicleCategory] = None,
     available_only: bool = True,
     featured_only: bool = False,
-    limit: int = Query(50, le=100)
+    brand: Optional[str] = Query(None, max_length=50),
+    body_type: Optional[str] = Query(None, max_length=50),
+    year_min: Optional[int] = Query(None, ge=1990, le=2030),
+    year_max: Optional[int] = Query(None, ge=1990, le=2030),
+    price_min: Optional[int] = Query(None, ge=0),
+    price_max: Optional[int] = Query(None, ge=0),
+    mileage_min: Optional[int] = Query(None, ge=0),
+    mileage_max: Optional[int] = Query(None, ge=0),
+    q: Optional[str] = Query(None, max_length=100),
+    sort: VehicleSort = VehicleSort.NEWEST,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, max_length=300)
 ):
-    """Get vehicles"""
+    """Get vehicles, filtered and sorted in the database"""
     try:
-        filter_dict = {}
-        if category:
-            filter_dict["category"] = category.value
-        if available_only:
-            filter_dict["is_available"] = True
-        if featured_only:
-            filter_dict["is_featured"] = True
+        selected = parse_fields(fields)
+        search = dict(
+            category=category,
+            available_only=available_only,
+            featured_only=featured_only,
+            brand=brand,
+            body_type=body_type,
+            year_min=year_min,
+            year_max=year_max,
+            price_min=price_min,
+            price_max=price_max,
+            mileage_min=mileage_min,
+            mileage_max=mileage_max,
+            q=q,
+        )
+        cache_key = catalog_cache.make_key("vehicles", {
+            **search, "sort": sort, "limit": limit, "cursor": cursor, "fields": selected
+        })
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return cached.to_response(request)
+
+        filter_dict = build_vehicle_query(**search)
+        sort_field, direction = sort_for(sort)
             
-        vehicles_list = await vehicles.find(filter_dict).sort("created_at", -1).limit(limit).to_list(limit)
-        return [Vehicle(**vehicle) for vehicle in vehicles_list]
+        vehicles_list, next_cursor = await fetch_page(
+            catalog_vehicles, filter_dict, sort_field, limit, cursor, projection_for(selected, sort_field),
+            direction=direction
+        )
+        # The field selection is part of the representation, so it is part of the ETag
+        headers = compute_validators(
+            vehicles_list, VEHICLE_VERSION_FIELDS, extra=f"{next_cursor or ''}|{','.join(selected or ())}",
+            last_modified=False
+        )
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+        not_modified = conditional_response(request, headers)
+        if not_modified:
+            return not_modified
+        model = partial_model(Vehicle, selected) if selected else Vehicle
+        return catalog_cache.store(cache_key, encode_documents(model, vehicles_list), headers, request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving vehicles: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve vehicles")
 
+@api_router.get("/vehicles/export")
+async def export_vehicle_inventory(
+    format: DataFormat = DataFormat.NDJSON,
+    category: Optional[VehicleCategory] = None,
+    available_only: bool = False
+):
+    """Stream the vehicle inventory as NDJSON or CSV (admin endpoint)"""
+    filter_dict = {}
+    if category:
+        filter_dict["category"] = category.value
+    if available_only:
+        filter_dict["is_available"] = True
+
+    cursor = vehicles.find(filter_dict, NO_ID).sort([("created_at", -1), ("id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        stream_documents(cursor, Vehicle, format),
+        media_type=MEDIA_TYPES[format],
+        headers=attachment_headers("vehicles", format)
+    )
+
+@api_router.post("/vehicles/batch", response_model=VehicleBatch)
+async def get_vehicle_batch(batch: VehicleBatchRequest):
+    """Get several vehicles by id in one request, in the order asked for"""
+    try:
+        requested = list(dict.fromkeys(batch.ids))
+        # Shares the per-vehicle entries of GET /vehicles/{id}; only misses go to the database
+        bodies = {}
+        for vehicle_id in requested:
+            cached = catalog_cache.get(catalog_cache.make_key("vehicles", {"id": vehicle_id}))
+            if cached:
+                bodies[vehicle_id] = cached.body
+
+        misses = [vehicle_id for vehicle_id in requested if vehicle_id not in bodies]
+        if misses:
+            async for vehicle in catalog_vehicles.find({"id": {"$in": misses}}, NO_ID):
+                entry = catalog_cache.put(
+                    catalog_cache.make_key("vehicles", {"id": vehicle["id"]}),
+                    encode_document(Vehicle, vehicle),
+                    compute_validators([vehicle], VEHICLE_VERSION_FIELDS)
+                )
+                bodies[vehicle["id"]] = entry.body
+
+        # Each body is already encoded JSON, so the envelope is assembled around them
+        found = [bodies[vehicle_id] for vehicle_id in requested if vehicle_id in bodies]
+        missing = [vehicle_id for vehicle_id in requested if vehicle_id not in bodies]
+        return json_response(
+            b'{"vehicles":[' + b",".join(found) + b'],"missing":' + json.dumps(missing).encode() + b"}"
+        )
+    except Exception as e:
+        logger.error(f"Error retrieving vehicle batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve vehicles")
+
 @api_router.get("/vehicles/{vehicle_id}", response_model=Vehicle)
-async def get_vehicle(vehicle_id: str):
+async def get_vehicle(request: Request, vehicle_id: str):
     """Get specific vehicle"""
     try:
-        vehicle = await vehicles.find_one({"id": vehicle_id})
+        cache_key = catalog_cache.make_key("vehicles", {"id": vehicle_id})
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return cached.to_response(request)
+
+        vehicle = await catalog_vehicles.find_one({"id": vehicle_id}, NO_ID)
         if not vehicle:
             raise HTTPException(status_code=404, detail="Vehicle not found")
-        return Vehicle(**vehicle)
+        headers = compute_validators([vehicle], VEHICLE_VERSION_FIELDS)
+        not_modified = conditional_response(request, headers)
+        if not_modified:
+            return not_modified
+        return catalog_cache.store(cache_key, encode_document(Vehicle, vehicle), headers, request)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error retrieving vehicle: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve vehicle")
 
+@api_router.get("/vehicles/{vehicle_id}/similar", response_model=List[Vehicle])
+async def get_similar_vehicles(
+    request: Request,
+    vehicle_id: str,
+    limit: int = Query(6, ge=1, le=RECOMMENDATION_NEIGHBORS),
+    fields: Optional[str] = Query(None, max_length=300)
+):
+    """Get the available vehicles most similar to one listing, most similar first"""
+    try:
+        selected = parse_fields(fields)
+        cache_key = catalog_cache.make_key("vehicles", {"similar_to": vehicle_id, "limit": limit, "fields": selected})
+        cached = catalog_cache.get(cache_key)
+        if cached:
+            return cached.to_response(request)
+
+        if not similarity_index.ready:
+            raise HTTPException(status_code=503, detail="Recommendations are not available yet")
+        similar_ids = similarity_index.similar(vehicle_id, limit)
+        if similar_ids is None:
+            # Sold or not indexed yet: no recommendations, but not an error
+            if not await catalog_vehicles.find_one({"id": vehicle_id}, {"_id": 0, "id": 1}):
+                raise HTTPException(status_code=404, detail="Vehicle not found")
+            similar_ids = []
+
+        found = {
+            doc["id"]: doc
+            for doc in await catalog_vehicles.find(
+                {"id": {"$in": similar_ids}, "is_available": True}, projection_for(selected, "id")
+            ).to_list(len(similar_ids))
+        }
+        vehicles_list = [found[similar_id] for similar_id in similar_ids if similar_id in found]
+        headers = compute_validators(
+            vehicles_list, VEHICLE_VERSION_FIELDS, extra=",".join(selected or ()), last_modified=False
+        )
+        not_modified = conditional_response(request, headers)
+        if not_modified:
+            return not_modified
+        model = partial_model(Vehicle, selected) if selected else Vehicle
+        return catalog_cache.store(cache_key, encode_documents(model, vehicles_list), headers, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving similar vehicles: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve similar vehicles")
+
 @api_router.post("/vehicles", response_model=Vehicle)
 async def create_vehicle(vehicle_data: VehicleCreate):
     """Create new vehicle (admin endpoint)"""
@@ -238,42 +642,272 @@ async def create_vehicle(vehicle_data: VehicleCreate):
         vehicle_dict = vehicle_data.dict()
         vehicle_obj = Vehicle(**vehicle_dict)
         
-        await vehicles.insert_one(vehicle_obj.dict())
+        await vehicles.insert_one(vehicle_document(vehicle_obj))
+        catalog_cache.invalidate("vehicles")
+        snapshot_builder.schedule("vehicles")
+        similarity_index.schedule()
         
         logger.info(f"New vehicle created: {vehicle_obj.year} {vehicle_obj.brand} {vehicle_obj.model}")
-        return vehicle_obj
+        return model_response(vehicle_obj)
     except Exception as e:
         logger.error(f"Error creating vehicle: {e}")
         raise HTTPException(status_code=500, detail="Failed to create vehicle")
 
+@api_router.post("/vehicles/bulk", response_model=VehicleImportResult)
+async def bulk_import_vehicles(request: Request, format: Optional[DataFormat] = None):
+    """Upsert vehicles from a streamed NDJSON or CSV body (admin endpoint)
+
+    Rows with an ``id`` are upserted on it; rows without one are inserted.
+    The format defaults to the request's Content-Type.
+    """
+    try:
+        if format is None:
+            content_type = request.headers.get("content-type", "")
+            format = DataFormat.CSV if "csv" in content_type else DataFormat.NDJSON
+
+        lines = iter_lines(request.stream())
+        rows = iter_csv_rows(lines) if format == DataFormat.CSV else iter_ndjson_rows(lines)
+        report = await import_vehicles(vehicles, rows, VEHICLE_IMPORT_BATCH_SIZE)
+        if report.inserted or report.updated or report.upserted:
+            catalog_cache.invalidate("vehicles")
+            snapshot_builder.schedule("vehicles")
+            similarity_index.schedule()
+        if report.image_changed:
+            image_pipeline.schedule_reingest("vehicles", report.image_changed)
+
+        logger.info(f"Vehicle import: {report.rows} rows, {report.failed} failed")
+        return VehicleImportResult(**report.summary())
+    except Exception as e:
+        logger.error(f"Error importing vehicles: {e}")
+        raise HTTPException(status_code=500, detail="Failed to import vehicles")
+
+# Image Endpoints
+async def ingest_image(file: Optional[UploadFile], url: Optional[str], owner=None) -> dict:
+    """Ingest an uploaded file, or fetch url; raises 4xx for unusable input"""
+    try:
+        if file is not None:
+            return await image_pipeline.ingest(await file.read(IMAGE_MAX_BYTES + 1), owner=owner)
+        if url:
+            return await image_pipeline.ingest_url(url, owner=owner)
+    except ImageSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image URL: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Could not fetch image: {e}")
+    raise HTTPException(status_code=400, detail="An image file or URL is required")
+
+@api_router.post("/images", response_model=ImageAsset, status_code=202)
+async def upload_image(file: UploadFile = File(...)):
+    """Upload an image; derivatives are rendered in the background (admin endpoint)"""
+    try:
+        record = await ingest_image(file, None)
+        return json_response(encode_document(ImageAsset, record), status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting image: {e}")
+        raise HTTPException(status_code=500, detail="Failed to ingest image")
+
+@api_router.post("/images/fetch", response_model=ImageAsset, status_code=202)
+async def fetch_image(fetch_data: ImageFetch):
+    """Fetch a remote image; derivatives are rendered in the background (admin endpoint)"""
+    try:
+        record = await ingest_image(None, fetch_data.url)
+        return json_response(encode_document(ImageAsset, record), status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching image: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch image")
+
+async def ingest_owner_image(owner: str, owner_id: str, file: Optional[UploadFile]):
+    """Render derivatives for a vehicle or testimonial photo.
+
+    With no upload the document's current image_url is fetched. The document
+    gets its image_id and image_srcset once the derivatives are ready.
+    """
+    doc = await OWNERS[owner].find_one({"id": owner_id}, {"_id": 0, "image_url": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail=f"{owner[:-1].capitalize()} not found")
+    record = await ingest_image(file, doc.get("image_url"), owner=(owner, owner_id))
+    return json_response(encode_document(ImageAsset, record), status_code=202)
+
+@api_router.post("/vehicles/{vehicle_id}/image", response_model=ImageAsset, status_code=202)
+async def set_vehicle_image(vehicle_id: str, file: Optional[UploadFile] = File(None)):
+    """Upload (or re-fetch) a vehicle photo and render its derivatives (admin endpoint)"""
+    try:
+        return await ingest_owner_image("vehicles", vehicle_id, file)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting vehicle image: {e}")
+        raise HTTPException(status_code=500, detail="Failed to ingest image")
+
+@api_router.post("/testimonials/{testimonial_id}/image", response_model=ImageAsset, status_code=202)
+async def set_testimonial_image(testimonial_id: str, file: Optional[UploadFile] = File(None)):
+    """Upload (or re-fetch) a testimonial photo and render its derivatives (admin endpoint)"""
+    try:
+        return await ingest_owner_image("testimonials", testimonial_id, file)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting testimonial image: {e}")
+        raise HTTPException(status_code=500, detail="Failed to ingest image")
+
+@api_router.get("/images/{digest}", response_model=ImageAsset)
+async def get_image(digest: str):
+    """Get an image's processing status and srcset"""
+    try:
+        record = await images.find_one({"id": digest}, NO_ID)
+        if not record:
+            raise HTTPException(status_code=404, detail="Image not found")
+        return json_response(encode_document(ImageAsset, record))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving image: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve image")
+
+@api_router.get("/images/{digest}/{filename}", include_in_schema=False)
+async def get_image_derivative(digest: str, filename: str):
+    """Serve a rendered derivative; its URL is content-addressed, so it never changes"""
+    path = derivative_path(digest, filename)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type=IMAGE_MEDIA_TYPES[path.suffix[1:]],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
+
+# Catalog Snapshots
+@api_router.get("/snapshots/{filename}", include_in_schema=False)
+async def get_snapshot(request: Request, filename: str):
+    """Serve manifest.json or a versioned, precompressed catalog snapshot"""
+    resolved = snapshot_builder.resolve(filename, request.headers.get("accept-encoding"))
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    path, coding = resolved
+    if filename == "manifest.json":
+        return FileResponse(path, media_type="application/json", headers={"Cache-Control": MANIFEST_CACHE_CONTROL})
+    headers = {"Cache-Control": SNAPSHOT_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if coding:
+        headers["Content-Encoding"] = coding
+    return FileResponse(path, media_type="application/json", headers=headers)
+
+# Lead Pipeline Stats
+@api_router.get("/leads/pipeline")
+async def get_lead_pipeline_stats():
+    """Get lead write queue depth and flush counters (admin endpoint)"""
+    return lead_pipeline.stats()
+
+@api_router.get("/leads/stream")
+async def stream_leads(request: Request):
+    """Server-Sent Events feed of new and updated leads (admin endpoint)"""
+    return StreamingResponse(
+        lead_feed.events(request, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/leads/stream/stats")
+async def get_lead_stream_stats():
+    """Get the live feed's source and subscriber count (admin endpoint)"""
+    return lead_feed.stats()
+
+# Recommendation Stats
+@api_router.get("/recommendations/stats")
+async def get_recommendation_stats():
+    """Get the similarity index's size and build counters (admin endpoint)"""
+    return similarity_index.stats()
+
+# Cache Stats
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Get catalog cache hit/miss counters (admin endpoint)"""
+    return catalog_cache.stats()
+
+# Inquiry Analytics
+@api_router.get("/analytics/inquiries/top", response_model=List[VehicleDemand])
+async def get_top_inquired_vehicles(
+    metric: str = "total",
+    days: int = Query(7, ge=1, le=366),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Vehicles ranked by inquiries over the last days (admin endpoint)
+
+    ``metric`` is ``total``, ``type:<inquiry type>`` or ``status:<status>``.
+    """
+    try:
+        ranked = await top_vehicles(metric, days, limit)
+        return json_response(encode_documents(VehicleDemand, ranked))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ranking vehicles by inquiries: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve inquiry analytics")
+
+@api_router.get("/analytics/inquiries/timeseries", response_model=List[DemandPoint])
+async def get_inquiry_time_series(
+    metric: str = "total",
+    days: int = Query(30, ge=1, le=366),
+    car_id: Optional[str] = None
+):
+    """Daily inquiry counts, for one vehicle or the whole inventory (admin endpoint)"""
+    try:
+        series = await time_series(metric, days, car_id)
+        return json_response(encode_documents(DemandPoint, series))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error retrieving inquiry time series: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve inquiry analytics")
+
 # Dashboard Stats
 @api_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats():
     """Get dashboard statistics (admin endpoint)"""
     try:
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        total_contacts = await contact_submissions.count_documents({})
-        total_inquiries = await car_inquiries.count_documents({})
-        total_testimonials = await testimonials.count_documents({"is_approved": True})
-        total_vehicles = await vehicles.count_documents({"is_available": True})
-        pending_testimonials = await testimonials.count_documents({"is_approved": False})
-        new_contacts_today = await contact_submissions.count_documents({"submitted_at": {"$gte": today}})
-        new_inquiries_today = await car_inquiries.count_documents({"submitted_at": {"$gte": today}})
-        
-        return DashboardStats(
-            total_contacts=total_contacts,
-            total_inquiries=total_inquiries,
-            total_testimonials=total_testimonials,
-            total_vehicles=total_vehicles,
-            pending_testimonials=pending_testimonials,
-            new_contacts_today=new_contacts_today,
-            new_inquiries_today=new_inquiries_today
-        )
+        cache_key = dashboard_cache.make_key("dashboard", {})
+        cached = dashboard_cache.get(cache_key)
+        if cached:
+            return cached.to_response()
+
+        stats = encode_document(DashboardStats, await compute_dashboard_stats())
+        return dashboard_cache.store(cache_key, stats)
     except Exception as e:
         logger.error(f"Error retrieving dashboard stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve dashboard stats")
 
+# Prometheus metrics
+def collect_app_metrics():
+    """Expose cache and lead-queue counters alongside the request metrics"""
+    cache_stats = catalog_cache.stats()
+    lines = [
+        "# TYPE catalog_cache_hits_total counter",
+        f"catalog_cache_hits_total {cache_stats['hits']}",
+        "# TYPE catalog_cache_misses_total counter",
+        f"catalog_cache_misses_total {cache_stats['misses']}",
+        "# TYPE catalog_cache_bytes gauge",
+        f"catalog_cache_bytes {cache_stats['bytes']}",
+        "# TYPE lead_queue_depth gauge",
+    ]
+    for kind, writer_stats in lead_pipeline.stats().items():
+        lines.append(f'lead_queue_depth{{kind="{kind}"}} {writer_stats["queue_depth"]}')
+    lines.append("# TYPE image_renders_pending gauge")
+    lines.append(f"image_renders_pending {image_pipeline.stats()['pending']}")
+    return lines
+
+registry.register_collector(collect_app_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, MongoDB and cache metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -281,9 +915,19 @@ app.include_router(api_router)
 @app.on_event("startup")
 async def startup_event():
     await init_database()
+    await lead_pipeline.start()
+    lead_retention.start()
+    asyncio.create_task(snapshot_builder.ensure())
+    similarity_index.start()
     logger.info("Ben Fortier Car Sales API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await lead_feed.stop()
+    await lead_retention.stop()
+    await lead_pipeline.stop()
+    await image_pipeline.stop()
+    await snapshot_builder.stop()
+    await similarity_index.stop()
     await close_db_connection()
     logger.info("Database connection closed")
\ No newline at end of file
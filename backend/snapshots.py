@@ -0,0 +1,188 @@
+"""Pre-rendered catalog snapshots for anonymous traffic.
+
+Each snapshot is one public list (new cars, used cars, featured cars, approved
+testimonials) encoded exactly like the API response. It is written to disk under
+a content-hashed name, together with gzip and brotli copies. manifest.json maps
+each snapshot name to its current file and whether the list was cut off at its
+row limit (clients then read the paged API instead). Versioned files never
+change, so they can be cached for a year; only the small manifest has to be
+revalidated.
+
+A rebuild is scheduled whenever vehicles or testimonials change. Bursts of
+writes are coalesced into one rebuild. Workers sharing SNAPSHOT_DIR take a
+file lock around each build, so only one of them writes at a time.
+"""
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+
+from database import testimonials, vehicles
+from models import Testimonial, Vehicle
+from serialization import encode_documents
+from compression import ENCODERS, compress, negotiate
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', str(ROOT_DIR / 'snapshots')))
+SNAPSHOT_VEHICLE_LIMIT = int(os.environ.get('SNAPSHOT_VEHICLE_LIMIT', '500'))
+SNAPSHOT_DEBOUNCE = float(os.environ.get('SNAPSHOT_DEBOUNCE', '1'))
+# Superseded versions kept for clients still holding an older manifest
+SNAPSHOT_KEEP_VERSIONS = int(os.environ.get('SNAPSHOT_KEEP_VERSIONS', '3'))
+
+MANIFEST_NAME = "manifest.json"
+BUILD_LOCK_NAME = ".build.lock"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+NO_ID = {"_id": 0}
+
+_FILE_PATTERN = re.compile(r"^[a-z-]+\.[0-9a-f]{16}\.json$")
+
+# Snapshot name -> (source collection, model, filter, sort, limit)
+SNAPSHOTS: Dict[str, Tuple[Any, Any, Dict[str, Any], List[Tuple[str, int]], int]] = {
+    "vehicles-new": (vehicles, Vehicle, {"category": "new", "is_available": True},
+                     [("created_at", -1), ("id", -1)], SNAPSHOT_VEHICLE_LIMIT),
+    # Ordered like the used-cars page's default (brand) view
+    "vehicles-used": (vehicles, Vehicle, {"category": "used", "is_available": True},
+                      [("brand", 1), ("id", 1)], SNAPSHOT_VEHICLE_LIMIT),
+    "vehicles-featured": (vehicles, Vehicle, {"is_available": True, "is_featured": True},
+                          [("created_at", -1), ("id", -1)], SNAPSHOT_VEHICLE_LIMIT),
+    "testimonials": (testimonials, Testimonial, {"is_approved": True}, [("created_at", -1)], 100),
+}
+
+# Collection name -> the snapshots built from it
+SNAPSHOTS_BY_COLLECTION = {
+    "vehicles": ["vehicles-new", "vehicles-used", "vehicles-featured"],
+    "testimonials": ["testimonials"],
+}
+
+def _write_atomic(path: Path, data: bytes):
+    partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+class SnapshotBuilder:
+    def __init__(self, directory: Path = SNAPSHOT_DIR, debounce: float = SNAPSHOT_DEBOUNCE):
+        self.directory = directory
+        self.debounce = debounce
+        self.builds = 0
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def schedule(self, collection_name: str):
+        """Mark a collection's snapshots stale; they are rebuilt shortly after"""
+        self._dirty.update(SNAPSHOTS_BY_COLLECTION[collection_name])
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._rebuild_later())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            await self._task
+
+    async def build(self, names=None, only_if_missing: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Render the named snapshots (all by default) and update the manifest"""
+        async with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / BUILD_LOCK_NAME, "a") as build_lock:
+                # Another worker may hold the lock for a whole build; wait off the loop
+                await asyncio.to_thread(fcntl.flock, build_lock, fcntl.LOCK_EX)
+                manifest = self.read_manifest()
+                if only_if_missing and set(SNAPSHOTS) <= set(manifest):
+                    return manifest
+                for name in names or SNAPSHOTS:
+                    manifest[name] = await self._render(name)
+                    self._prune(name, manifest[name]["file"])
+                _write_atomic(self.directory / MANIFEST_NAME, json.dumps(manifest, sort_keys=True).encode())
+                self.builds += 1
+                return manifest
+
+    async def ensure(self):
+        """Build everything once if the manifest is missing or incomplete"""
+        if set(SNAPSHOTS) <= set(self.read_manifest()):
+            return
+        try:
+            # Every worker calls this on startup; the first to get the lock builds
+            await self.build(only_if_missing=True)
+        except Exception as e:
+            logger.error(f"Error building initial snapshots: {e}")
+
+    def resolve(self, filename: str, accept_encoding: Optional[str]) -> Optional[Tuple[Path, Optional[str]]]:
+        """The file to send for a request and its Content-Encoding, or None if unknown"""
+        if filename == MANIFEST_NAME:
+            path = self.directory / MANIFEST_NAME
+            return (path, None) if path.is_file() else None
+        if not _FILE_PATTERN.match(filename):
+            return None
+        path = self.directory / filename
+        if not path.is_file():
+            return None
+        available = [coding for coding, (_, suffix) in ENCODERS.items()
+                     if path.with_name(filename + suffix).is_file()]
+        coding = negotiate(accept_encoding, available)
+        if coding:
+            return path.with_name(filename + ENCODERS[coding][1]), coding
+        return path, None
+
+    def read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            manifest = json.loads((self.directory / MANIFEST_NAME).read_bytes())
+        except (FileNotFoundError, ValueError):
+            return {}
+        # Entries written before the truncated flag existed are rebuilt
+        return {name: entry for name, entry in manifest.items() if isinstance(entry, dict)}
+
+    async def _rebuild_later(self):
+        await asyncio.sleep(self.debounce)
+        while self._dirty:
+            names, self._dirty = sorted(self._dirty), set()
+            try:
+                await self.build(names)
+                logger.info(f"Rebuilt snapshots: {', '.join(names)}")
+            except Exception as e:
+                logger.error(f"Error rebuilding snapshots {names}: {e}")
+
+    async def _render(self, name: str) -> Dict[str, Any]:
+        """Write one snapshot and return its manifest entry"""
+        collection, model, filter_dict, sort, limit = SNAPSHOTS[name]
+        # One row past the limit tells a complete list from a cut-off one
+        docs = await collection.find(filter_dict, NO_ID).sort(sort).to_list(limit + 1)
+        truncated = len(docs) > limit
+        if truncated:
+            logger.warning(f"Snapshot {name} holds only the first {limit} rows")
+        body = encode_documents(model, docs[:limit])
+        filename = f"{name}.{hashlib.sha256(body).hexdigest()[:16]}.json"
+        target = self.directory / filename
+        if not target.exists():
+            for coding, (_, suffix) in ENCODERS.items():
+                encoded = await asyncio.to_thread(compress, body, coding)
+                _write_atomic(target.with_name(filename + suffix), encoded)
+            # The plain file goes last: its presence means the set is complete
+            _write_atomic(target, body)
+        return {"file": filename, "truncated": truncated}
+
+    def _prune(self, name: str, current: str):
+        """Delete all but the newest SNAPSHOT_KEEP_VERSIONS versions of a snapshot"""
+        versions = sorted(
+            self.directory.glob(f"{name}.*.json"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        for path in versions[SNAPSHOT_KEEP_VERSIONS:]:
+            if path.name == current:
+                continue
+            for _, suffix in ENCODERS.values():
+                path.with_name(path.name + suffix).unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+
+snapshot_builder = SnapshotBuilder()
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+
+from database import db, contact_submissions, car_inquiries, testimonials, vehicles
+from cache import ResponseCache
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# One document per (kind, day), incremented as leads arrive
+dashboard_counters = db.dashboard_counters
+
+# Lead collections whose daily arrivals are counted incrementally
+COUNTED_COLLECTIONS = {
+    "contacts": contact_submissions,
+    "inquiries": car_inquiries,
+}
+
+# Short-lived cache so a dashboard refresh storm costs one set of queries
+dashboard_cache = ResponseCache(
+    ttl_seconds=float(os.environ.get('DASHBOARD_STATS_TTL', '10')),
+    max_entries=1,
+)
+
+def _day_key(kind: str, day: datetime) -> str:
+    return f"{kind}:{day.strftime('%Y-%m-%d')}"
+
+async def record_submission(kind: str, submitted_at: Optional[datetime] = None, count: int = 1):
+    """Increment the daily counter for newly stored leads.
+
+    A day's counter is created from a count of that day's stored leads (which
+    already include these), so leads stored before the counter existed are not
+    missed. ``$max`` lets concurrent first writers settle on the largest count.
+    """
+    day = (submitted_at or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    key = {"_id": _day_key(kind, day)}
+    try:
+        result = await dashboard_counters.update_one(key, {"$inc": {"count": count}})
+        if result.matched_count:
+            return
+        stored = await COUNTED_COLLECTIONS[kind].count_documents(
+            {"submitted_at": {"$gte": day, "$lt": day + timedelta(days=1)}}
+        )
+        await dashboard_counters.update_one(key, {"$max": {"count": max(stored, count)}}, upsert=True)
+    except Exception as e:
+        # Counters are advisory; the dashboard falls back to counting
+        logger.error(f"Error updating {kind} counter: {e}")
+
+def _archived_key(kind: str) -> str:
+    return f"archived:{kind}"
+
+async def record_archived(kind: str, count: int):
+    """Count leads moved out of the hot collections, so totals still include them"""
+    if count:
+        await dashboard_counters.update_one({"_id": _archived_key(kind)}, {"$inc": {"count": count}}, upsert=True)
+
+async def _count_today(kind: str, today: datetime, counters: Dict[str, int]) -> int:
+    key = _day_key(kind, today)
+    if key in counters:
+        return counters[key]
+    # No counter yet (e.g. the day counters were introduced): use the submitted_at index
+    return await COUNTED_COLLECTIONS[kind].count_documents({"submitted_at": {"$gte": today}})
+
+async def _testimonial_counts() -> Dict[str, int]:
+    result = await testimonials.aggregate([
+        {"$group": {"_id": "$is_approved", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    counts = {bool(row["_id"]): row["count"] for row in result}
+    return {"approved": counts.get(True, 0), "pending": counts.get(False, 0)}
+
+async def compute_dashboard_stats() -> Dict[str, int]:
+    """Collect dashboard figures with all queries in flight at once.
+
+    Collection totals come from collection metadata plus the archived-lead
+    counters, and today's arrivals from the daily counters, so cost stays flat
+    as the lead collections grow.
+    """
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    day_keys = [_day_key(kind, today) for kind in COUNTED_COLLECTIONS]
+    counter_keys = day_keys + [_archived_key(kind) for kind in COUNTED_COLLECTIONS]
+
+    (
+        total_contacts,
+        total_inquiries,
+        testimonial_counts,
+        total_vehicles,
+        counter_docs,
+    ) = await asyncio.gather(
+        contact_submissions.estimated_document_count(),
+        car_inquiries.estimated_document_count(),
+        _testimonial_counts(),
+        vehicles.count_documents({"is_available": True}),
+        dashboard_counters.find({"_id": {"$in": counter_keys}}).to_list(len(counter_keys)),
+    )
+    counters = {doc["_id"]: doc["count"] for doc in counter_docs}
+    new_contacts_today, new_inquiries_today = await asyncio.gather(
+        _count_today("contacts", today, counters),
+        _count_today("inquiries", today, counters),
+    )
+
+    return {
+        "total_contacts": total_contacts + counters.get(_archived_key("contacts"), 0),
+        "total_inquiries": total_inquiries + counters.get(_archived_key("inquiries"), 0),
+        "total_testimonials": testimonial_counts["approved"],
+        "total_vehicles": total_vehicles,
+        "pending_testimonials": testimonial_counts["pending"],
+        "new_contacts_today": new_contacts_today,
+        "new_inquiries_today": new_inquiries_today,
+    }
@@ -0,0 +1,157 @@
+from pymongo import ReplaceOne
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+import logging
+import random
+
+from database import (
+    initial_testimonials, initial_vehicles,
+    contact_submissions, car_inquiries, testimonials, vehicles,
+    contact_submissions_archive, car_inquiries_archive
+)
+from models import parse_price_cents, parse_mileage_km, search_terms_for
+from analytics import inquiry_rollups, rebuild_inquiry_rollups
+from stats import dashboard_counters
+
+logger = logging.getLogger(__name__)
+
+# Named dataset sizes: vehicles and each lead collection get this many documents
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+INSERT_BATCH_SIZE = 1000
+
+_CONTACT_STATUSES = ["new", "contacted", "closed"]
+_INQUIRY_STATUSES = ["new", "contacted", "scheduled", "closed"]
+_INQUIRY_TYPES = ["details", "test_drive", "purchase"]
+_FIRST_NAMES = ["Sarah", "Mark", "Jessica", "David", "Lisa", "Omar", "Chloe", "Raj", "Elena", "Tom"]
+_LAST_NAMES = ["L.", "T.", "R.", "M.", "K.", "B.", "N.", "P.", "S.", "W."]
+
+def vehicle_id(index: int) -> str:
+    return f"bench-v-{index}"
+
+def generate_vehicles(count: int, rng: random.Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    """Yield vehicles derived from the seed inventory with varied year, price and mileage"""
+    templates = initial_vehicles()
+    for index in range(count):
+        doc = dict(templates[index % len(templates)])
+        year = rng.randint(2012, 2025)
+        price_dollars = int(parse_price_cents(doc["price"]) / 100 * rng.uniform(0.6, 1.3))
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        doc.update({
+            "id": vehicle_id(index),
+            "year": year,
+            "category": "new" if year >= 2025 else "used",
+            "price": f"${price_dollars:,}",
+            "price_cents": price_dollars * 100,
+            "is_available": rng.random() < 0.9,
+            "is_featured": rng.random() < 0.05,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        if doc["category"] == "used":
+            mileage = f"{rng.randint(5, 180) * 1000:,} km"
+            doc["mileage"] = mileage
+            doc["mileage_km"] = parse_mileage_km(mileage)
+        else:
+            doc.pop("mileage", None)
+            doc["mileage_km"] = None
+        doc["search_terms"] = search_terms_for(doc)
+        yield doc
+
+def _person(rng: random.Random, index: int) -> Dict[str, str]:
+    first = rng.choice(_FIRST_NAMES)
+    last = rng.choice(_LAST_NAMES)
+    return {
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{index}@example.com",
+        "phone": f"555-{rng.randint(1000, 9999)}",
+    }
+
+def generate_contacts(count: int, rng: random.Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    for index in range(count):
+        person = _person(rng, index)
+        yield {
+            "id": f"bench-c-{index}",
+            "full_name": person["name"],
+            "email": person["email"],
+            "phone": person["phone"],
+            "message": "I'd like to learn more about your current inventory and financing options.",
+            "submitted_at": now - timedelta(seconds=rng.randint(0, 3 * 365 * 24 * 3600)),
+            "status": rng.choice(_CONTACT_STATUSES),
+            "notes": None,
+        }
+
+def generate_inquiries(count: int, vehicle_count: int, rng: random.Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    for index in range(count):
+        person = _person(rng, index)
+        yield {
+            "id": f"bench-i-{index}",
+            "car_id": vehicle_id(rng.randrange(vehicle_count)),
+            "car_type": rng.choice(["new", "used"]),
+            "customer_name": person["name"],
+            "customer_email": person["email"],
+            "customer_phone": person["phone"],
+            "inquiry_type": rng.choice(_INQUIRY_TYPES),
+            "message": "Is this vehicle still available for a test drive this weekend?",
+            "submitted_at": now - timedelta(seconds=rng.randint(0, 3 * 365 * 24 * 3600)),
+            "status": rng.choice(_INQUIRY_STATUSES),
+        }
+
+def generate_testimonials(count: int, rng: random.Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    templates = initial_testimonials()
+    for index in range(count):
+        doc = dict(templates[index % len(templates)])
+        created_at = now - timedelta(seconds=rng.randint(0, 3 * 365 * 24 * 3600))
+        approved = rng.random() < 0.8
+        doc.update({
+            "id": f"bench-t-{index}",
+            "is_approved": approved,
+            "created_at": created_at,
+            "approved_at": created_at if approved else None,
+        })
+        yield doc
+
+async def _insert_stream(collection, docs: Iterator[Dict[str, Any]]) -> int:
+    """Write generated documents in batches without materializing the whole set.
+
+    Rows are replaced by id, so generating over an existing dataset (without
+    drop) refreshes the bench-* documents instead of failing on duplicates.
+    """
+    written = 0
+    batch: List[ReplaceOne] = []
+    for doc in docs:
+        batch.append(ReplaceOne({"id": doc["id"]}, doc, upsert=True))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            await collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        written += len(batch)
+    return written
+
+async def generate_dataset(size: int, seed: int = 42, drop: bool = False) -> Dict[str, int]:
+    """Populate every collection with a deterministic synthetic dataset"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    targets = (contact_submissions, car_inquiries, testimonials, vehicles)
+    if drop:
+        # Archived leads too, or rebuilding the rollups would count them again;
+        # the derived counters and rollups describe the dropped leads
+        derived = (contact_submissions_archive, car_inquiries_archive, dashboard_counters, inquiry_rollups)
+        for collection in (*targets, *derived):
+            await collection.delete_many({})
+
+    counts = {
+        "vehicles": await _insert_stream(vehicles, generate_vehicles(size, rng, now)),
+        "contacts": await _insert_stream(contact_submissions, generate_contacts(size, rng, now)),
+        "inquiries": await _insert_stream(car_inquiries, generate_inquiries(size, size, rng, now)),
+        "testimonials": await _insert_stream(testimonials, generate_testimonials(max(size // 100, 10), rng, now)),
+    }
+    counts["inquiry_rollups"] = await rebuild_inquiry_rollups()
+    logger.info(f"Generated synthetic dataset: {counts}")
+    return counts
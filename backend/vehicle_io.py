@@ -0,0 +1,199 @@
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import csv
+import io
+import json
+import logging
+
+from models import Vehicle, VehicleCreate, VehicleUpdate, search_terms_for, vehicle_document
+
+logger = logging.getLogger(__name__)
+
+# Per-row errors kept in the import report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+# Longest line buffered from an import body; a longer one is skipped and reported
+MAX_LINE_BYTES = 1 << 20
+LINE_TOO_LONG = "Line exceeds the maximum length"
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Optional[str]]:
+    """Split a streamed request body into lines (newline included) as it arrives.
+
+    A line longer than ``max_line_bytes`` is dropped as it streams in and
+    yielded as None, so one bad row can't grow the buffer without bound.
+    """
+    pending = bytearray()
+    too_long = False
+    async for chunk in chunks:
+        start = 0
+        # Only the new chunk is searched; pending never holds a newline
+        while (end := chunk.find(b"\n", start)) >= 0:
+            if too_long or len(pending) + end - start > max_line_bytes:
+                yield None
+            else:
+                pending += chunk[start:end + 1]
+                yield pending.decode("utf-8-sig")
+            pending.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            pending += chunk[start:]
+            if len(pending) > max_line_bytes:
+                pending.clear()
+                too_long = True
+    if too_long:
+        yield None
+    elif pending:
+        yield pending.decode("utf-8-sig")
+
+async def iter_ndjson_rows(lines: AsyncIterator[Optional[str]]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, decoded object or error message) for each non-blank line"""
+    number = 0
+    async for line in lines:
+        number += 1
+        if line is None:
+            yield number, LINE_TOO_LONG
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+
+async def iter_csv_rows(lines: AsyncIterator[Optional[str]]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (record number, row dict or error message) for a CSV body with a header line.
+
+    Physical lines are joined until quotes balance so quoted fields may span lines.
+    A record with an overlong line is reported and dropped.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    number = 0
+    async for line in lines:
+        if line is None:
+            # Any quoted field it was part of is dropped along with it
+            pending = ""
+            if header is not None:
+                number += 1
+                yield number, LINE_TOO_LONG
+            continue
+        pending += line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader(io.StringIO(record)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        number += 1
+        yield number, {name: (value if value != "" else None) for name, value in zip(header, values)}
+    if pending.strip():
+        yield number + 1, "Unterminated quoted field"
+
+def _write_for(vehicle_id: Optional[str], vehicle_data: Dict[str, Any], now: datetime,
+               stored_image_url: Optional[str] = None):
+    """Build the bulk operation for a validated row: upsert on id, insert otherwise.
+
+    Rows without an is_available value leave an existing vehicle's availability
+    alone and make new vehicles available. An upsert that changes image_url
+    drops the old image's derivatives, so the vehicle shows the new image_url
+    until the new image has been rendered.
+    """
+    if not vehicle_id:
+        return InsertOne(vehicle_document(Vehicle(**vehicle_data)))
+    on_insert = {"id": vehicle_id, "created_at": now}
+    if "is_available" not in vehicle_data:
+        on_insert["is_available"] = True
+    update = {
+        "$set": {**vehicle_data, "search_terms": search_terms_for(vehicle_data), "updated_at": now},
+        "$setOnInsert": on_insert,
+    }
+    if stored_image_url is not None and stored_image_url != vehicle_data["image_url"]:
+        update["$unset"] = {"image_id": "", "image_srcset": ""}
+    return UpdateOne({"id": vehicle_id}, update, upsert=True)
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        # Ids of existing vehicles whose image_url the import changed
+        self.image_changed: List[str] = []
+
+    def add_error(self, row: int, detail: Any):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": detail})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+async def _flush(collection, batch: List[Tuple[int, Optional[str], Dict[str, Any]]], report: ImportReport):
+    ids = [vehicle_id for _, vehicle_id, _ in batch if vehicle_id]
+    stored = {
+        doc["id"]: doc.get("image_url")
+        async for doc in collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "image_url": 1})
+    } if ids else {}
+    now = datetime.utcnow()
+    operations = [
+        _write_for(vehicle_id, vehicle_data, now, stored.get(vehicle_id))
+        for _, vehicle_id, vehicle_data in batch
+    ]
+    failed = set()
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for write_error in details.get("writeErrors", []):
+            failed.add(write_error["index"])
+            report.add_error(batch[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+    report.inserted += details.get("nInserted", 0)
+    report.updated += details.get("nModified", 0)
+    report.upserted += details.get("nUpserted", 0)
+    report.image_changed.extend(
+        vehicle_id for index, (_, vehicle_id, vehicle_data) in enumerate(batch)
+        if index not in failed and vehicle_id in stored and stored[vehicle_id] != vehicle_data["image_url"]
+    )
+
+async def import_vehicles(collection, rows: AsyncIterator[Tuple[int, Any]], batch_size: int = 500) -> ImportReport:
+    """Validate rows as they arrive and write them in unordered batches"""
+    report = ImportReport()
+    batch: List[Tuple[int, Optional[str], Dict[str, Any]]] = []
+    async for number, row in rows:
+        report.rows += 1
+        if not isinstance(row, dict):
+            report.add_error(number, row if isinstance(row, str) else "Expected an object")
+            continue
+        try:
+            vehicle_data = VehicleCreate(**row).dict()
+            if row.get("is_available") is not None:
+                vehicle_data["is_available"] = VehicleUpdate(is_available=row["is_available"]).is_available
+            batch.append((number, row.get("id"), vehicle_data))
+        except ValidationError as e:
+            report.add_error(number, [
+                {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                for error in e.errors()
+            ])
+            continue
+        if len(batch) >= batch_size:
+            await _flush(collection, batch, report)
+            batch = []
+    if batch:
+        await _flush(collection, batch, report)
+    return report
@@ -0,0 +1,121 @@
+from fastapi import HTTPException
+from typing import Any, Dict, Optional, Tuple
+import re
+
+from models import Vehicle, VehicleCategory, VehicleSort
+from conditional import VEHICLE_VERSION_FIELDS
+
+# Sort key -> (document field, direction); id breaks ties for cursor pagination
+SORT_FIELDS: Dict[VehicleSort, Tuple[str, int]] = {
+    VehicleSort.NEWEST: ("created_at", -1),
+    VehicleSort.BRAND: ("brand", 1),
+    VehicleSort.YEAR: ("year", -1),
+    VehicleSort.PRICE_LOW: ("price_cents", 1),
+    VehicleSort.PRICE_HIGH: ("price_cents", -1),
+    VehicleSort.MILEAGE: ("mileage_km", 1),
+}
+
+# Named field sets for the fields= parameter; None means every field
+FIELD_PRESETS: Dict[str, Optional[Tuple[str, ...]]] = {
+    "card": ("id", "year", "brand", "model", "type", "category", "image_url", "image_srcset",
+             "price", "price_cents", "mileage", "mileage_km", "is_featured"),
+    "detail": None,
+}
+
+def _range(low: Optional[int], high: Optional[int], scale: int = 1) -> Optional[Dict[str, int]]:
+    bounds = {}
+    if low is not None:
+        bounds["$gte"] = low * scale
+    if high is not None:
+        bounds["$lte"] = high * scale
+    return bounds or None
+
+def build_vehicle_query(
+    category: Optional[VehicleCategory] = None,
+    available_only: bool = True,
+    featured_only: bool = False,
+    brand: Optional[str] = None,
+    body_type: Optional[str] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    mileage_min: Optional[int] = None,
+    mileage_max: Optional[int] = None,
+    q: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Translate catalog search parameters into a MongoDB filter.
+
+    Prices are given in whole dollars and compared against ``price_cents``;
+    mileage is given in kilometres and compared against ``mileage_km``. A
+    one-word ``q`` matches the start of any word ("Toyo", "Cam") so search works
+    while the user is typing; longer queries use the text index.
+    """
+    filter_dict: Dict[str, Any] = {}
+    if category:
+        filter_dict["category"] = category.value
+    if available_only:
+        filter_dict["is_available"] = True
+    if featured_only:
+        filter_dict["is_featured"] = True
+    if brand:
+        filter_dict["brand"] = brand
+    if body_type:
+        filter_dict["type"] = {"$regex": re.escape(body_type), "$options": "i"}
+
+    year_range = _range(year_min, year_max)
+    if year_range:
+        filter_dict["year"] = year_range
+    price_range = _range(price_min, price_max, scale=100)
+    if price_range:
+        filter_dict["price_cents"] = price_range
+    mileage_range = _range(mileage_min, mileage_max)
+    if mileage_range:
+        filter_dict["mileage_km"] = mileage_range
+
+    # $text only matches whole (stemmed) words, so a single word is matched as an
+    # anchored, case-sensitive prefix of the lowercased search_terms instead,
+    # which bounds the scan on the search_terms index
+    terms = q.split() if q else []
+    if len(terms) == 1:
+        filter_dict["search_terms"] = {"$regex": "^" + re.escape(terms[0].lower())}
+    elif terms:
+        filter_dict["$text"] = {"$search": " ".join(terms)}
+    return filter_dict
+
+def sort_for(sort: VehicleSort) -> Tuple[str, int]:
+    """Return the (field, direction) pair for a sort key"""
+    return SORT_FIELDS[sort]
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Resolve a preset name or comma-separated field list to Vehicle fields.
+
+    Returns None when the full document is wanted. Fields keep the model's
+    declaration order so equivalent requests share a cache entry.
+    """
+    if not fields or not fields.strip():
+        return None
+    names = set()
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        if name in FIELD_PRESETS:
+            preset = FIELD_PRESETS[name]
+            if preset is None:
+                return None
+            names.update(preset)
+        elif name in Vehicle.model_fields:
+            names.add(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown vehicle field: {name}")
+    names.add("id")
+    return tuple(name for name in Vehicle.model_fields if name in names)
+
+def projection_for(fields: Optional[Tuple[str, ...]], sort_field: str) -> Dict[str, int]:
+    """Mongo projection for the selected fields plus what paging and ETags need"""
+    if fields is None:
+        return {"_id": 0}
+    projection = {"_id": 0}
+    for name in (*fields, sort_field, *VEHICLE_VERSION_FIELDS):
+        projection[name] = 1
+    return projection
@@ -0,0 +1,40 @@
+import React, { useState, useEffect } from 'react';
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+const SimilarVehicles = ({ carId }) => {
+  const [similar, setSimilar] = useState([]);
+
+  useEffect(() => {
+    let cancelled = false;
+    axios.get(`${API}/vehicles/${carId}/similar`, { params: { limit: 3, fields: 'card' } })
+      .then((response) => {
+        if (!cancelled) setSimilar(response.data || []);
+      })
+      .catch(() => {
+        // Recommendations are optional; the panel simply stays hidden
+        if (!cancelled) setSimilar([]);
+      });
+    return () => { cancelled = true; };
+  }, [carId]);
+
+  if (similar.length === 0) return null;
+
+  return (
+    <div>
+      <h4 className="text-yellow-500 font-semibold mb-2">Similar Vehicles</h4>
+      <div className="space-y-2 text-sm">
+        {similar.map((car) => (
+          <div key={car.id} className="flex items-center justify-between">
+            <span className="text-white">{car.year} {car.brand} {car.model}</span>
+            <span className="text-gray-400">{car.price}</span>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
+
+export default SimilarVehicles;
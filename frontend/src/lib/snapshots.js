@@ -0,0 +1,35 @@
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+let manifestRequest = null;
+
+// Public catalog lists are pre-rendered to versioned, long-cached files; the
+// manifest names the current version of each. Resolves to null when there is
+// no usable snapshot: missing, unreachable, or cut off at its row limit.
+export async function fetchSnapshot(snapshotName) {
+  try {
+    if (!manifestRequest) {
+      manifestRequest = axios.get(`${API}/snapshots/manifest.json`).then((response) => response.data);
+    }
+    const manifest = await manifestRequest;
+    const entry = manifest[snapshotName];
+    if (entry && entry.file && !entry.truncated) {
+      const response = await axios.get(`${API}/snapshots/${entry.file}`);
+      return response.data || [];
+    }
+  } catch (err) {
+    manifestRequest = null;
+    console.warn(`Snapshot ${snapshotName} unavailable, using the API`, err);
+  }
+  return null;
+}
+
+// The snapshot when it holds the whole list, otherwise the live API.
+export async function fetchCatalog(snapshotName, apiPath) {
+  const snapshot = await fetchSnapshot(snapshotName);
+  if (snapshot) return snapshot;
+  const response = await axios.get(`${API}${apiPath}`);
+  return response.data || [];
+}
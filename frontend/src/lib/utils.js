@@ -4,3 +4,13 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Widths a catalog card image is rendered at, for <source sizes>
+export const CARD_IMAGE_SIZES = "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw";
+
+// Image srcsets from the API use root-relative URLs; point them at the backend
+export function backendSrcSet(srcset) {
+  if (!srcset) return undefined;
+  const base = process.env.REACT_APP_BACKEND_URL || "";
+  return srcset.split(", ").map((candidate) => `${base}${candidate}`).join(", ");
+}
@@ -1,6 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import { Star, Eye, Heart, Filter, Search, Loader2, CheckCircle, X } from 'lucide-react';
 import axios from 'axios';
+import { backendSrcSet, CARD_IMAGE_SIZES } from '../lib/utils';
+import { fetchCatalog } from '../lib/snapshots';
+import SimilarVehicles from '../components/SimilarVehicles';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -32,8 +35,7 @@ const NewCars = () => {
   const fetchNewCars = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API}/vehicles?category=new`);
-      setCars(response.data || []);
+      setCars(await fetchCatalog('vehicles-new', '/vehicles?category=new'));
     } catch (err) {
       console.error('Error fetching new cars:', err);
       setError('Failed to load inventory. Please try again later.');
@@ -191,11 +193,20 @@ const NewCars = () => {
             >
               {/* Image */}
               <div className="relative overflow-hidden">
-                <img
-                  src={car.image_url}
-                  alt={`${car.year} ${car.brand} ${car.model}`}
-                  className="w-full h-48 object-cover group-hover:scale-105 transition-transform duration-300"
-                />
+                <picture>
+                  {car.image_srcset?.avif && (
+                    <source type="image/avif" srcSet={backendSrcSet(car.image_srcset.avif)} sizes={CARD_IMAGE_SIZES} />
+                  )}
+                  {car.image_srcset?.webp && (
+                    <source type="image/webp" srcSet={backendSrcSet(car.image_srcset.webp)} sizes={CARD_IMAGE_SIZES} />
+                  )}
+                  <img
+                    src={car.image_url}
+                    alt={`${car.year} ${car.brand} ${car.model}`}
+                    loading="lazy"
+                    className="w-full h-48 object-cover group-hover:scale-105 transition-transform duration-300"
+                  />
+                </picture>
                 
                 {/* Overlay Actions */}
                 <div className="absolute top-4 right-4 flex space-x-2">
@@ -274,6 +285,8 @@ const NewCars = () => {
                         <h4 className="text-yellow-500 font-semibold mb-2">Description</h4>
                         <p className="text-gray-300 text-sm">{car.description}</p>
                       </div>
+
+                      <SimilarVehicles carId={car.id} />
                       
                       <div className="grid grid-cols-2 gap-4 text-sm">
                         <div>
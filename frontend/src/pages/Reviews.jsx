@@ -1,9 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Star, MessageCircle, ThumbsUp, Loader2 } from 'lucide-react';
-import axios from 'axios';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API = `${BACKEND_URL}/api`;
+import { fetchCatalog } from '../lib/snapshots';
 
 const Reviews = () => {
   const [selectedReview, setSelectedReview] = useState(null);
@@ -18,8 +15,7 @@ const Reviews = () => {
   const fetchTestimonials = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API}/testimonials`);
-      setTestimonials(response.data || []);
+      setTestimonials(await fetchCatalog('testimonials', '/testimonials'));
     } catch (err) {
       console.error('Error fetching testimonials:', err);
       setError('Failed to load reviews. Please try again later.');
@@ -1,13 +1,26 @@
 import React, { useState, useEffect } from 'react';
 import { Star, Eye, Heart, Filter, Search, CheckCircle, Loader2, X } from 'lucide-react';
 import axios from 'axios';
+import { backendSrcSet, CARD_IMAGE_SIZES } from '../lib/utils';
+import { fetchSnapshot } from '../lib/snapshots';
+import SimilarVehicles from '../components/SimilarVehicles';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// UI sort options -> server-side sort keys
+const SORT_PARAMS = {
+  name: 'brand',
+  year: 'year',
+  price: 'price_asc',
+  mileage: 'mileage'
+};
+
 const UsedCars = () => {
   const [cars, setCars] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [selectedCar, setSelectedCar] = useState(null);
   const [favorites, setFavorites] = useState([]);
@@ -26,14 +39,31 @@ const UsedCars = () => {
   const [inquirySuccess, setInquirySuccess] = useState(false);
 
   useEffect(() => {
-    fetchUsedCars();
-  }, []);
+    const timer = setTimeout(fetchUsedCars, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [searchTerm, sortBy]);
+
+  const listParams = () => {
+    const params = { category: 'used', sort: SORT_PARAMS[sortBy] };
+    if (searchTerm.trim()) params.q = searchTerm.trim();
+    return params;
+  };
 
   const fetchUsedCars = async () => {
     try {
-      setLoading(true);
-      const response = await axios.get(`${API}/vehicles?category=used`);
-      setCars(response.data || []);
+      if (cars.length === 0) setLoading(true);
+      const params = listParams();
+      // The unfiltered default view is pre-rendered unless it outgrew the snapshot
+      const snapshot = !params.q && params.sort === 'brand' ? await fetchSnapshot('vehicles-used') : null;
+      if (snapshot) {
+        setCars(snapshot);
+        setNextCursor(null);
+      } else {
+        const response = await axios.get(`${API}/vehicles`, { params });
+        setCars(response.data || []);
+        setNextCursor(response.headers['x-next-cursor'] || null);
+      }
+      setError('');
     } catch (err) {
       console.error('Error fetching used cars:', err);
       setError('Failed to load inventory. Please try again later.');
@@ -42,6 +72,21 @@ const UsedCars = () => {
     }
   };
 
+  // The API returns one page at a time; X-Next-Cursor points at the next one
+  const loadMoreCars = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/vehicles`, { params: { ...listParams(), cursor: nextCursor } });
+      setCars(prev => [...prev, ...(response.data || [])]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      console.error('Error loading more used cars:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleInquiry = (car) => {
     setSelectedCarForInquiry(car);
     setShowInquiryModal(true);
@@ -87,24 +132,6 @@ const UsedCars = () => {
     );
   };
 
-  const filteredCars = cars.filter(car =>
-    car.brand.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    car.model.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    car.type.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  const sortedCars = [...filteredCars].sort((a, b) => {
-    if (sortBy === 'name') return a.brand.localeCompare(b.brand);
-    if (sortBy === 'year') return b.year - a.year;
-    if (sortBy === 'price') return parseInt(a.price.replace(/[^0-9]/g, '')) - parseInt(b.price.replace(/[^0-9]/g, ''));
-    if (sortBy === 'mileage') {
-      const aMileage = parseInt(a.mileage?.replace(/[^0-9]/g, '') || '0');
-      const bMileage = parseInt(b.mileage?.replace(/[^0-9]/g, '') || '0');
-      return aMileage - bMileage;
-    }
-    return 0;
-  });
-
   if (loading) {
     return (
       <div className="min-h-screen bg-black py-20 flex items-center justify-center">
@@ -194,13 +221,13 @@ const UsedCars = () => {
         {/* Results Count */}
         <div className="mb-8">
           <p className="text-gray-400">
-            Showing {sortedCars.length} of {cars.length} vehicles
+            Showing {cars.length} vehicles{nextCursor && ' (more available)'}
           </p>
         </div>
 
         {/* Cars Grid */}
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8 mb-12">
-          {sortedCars.map((car) => (
+          {cars.map((car) => (
             <div 
               key={car.id} 
               className="bg-gray-900 rounded-xl overflow-hidden border border-gray-800 hover:border-yellow-500/50 transition-all duration-300 group cursor-pointer"
@@ -208,11 +235,20 @@ const UsedCars = () => {
             >
               {/* Image */}
               <div className="relative overflow-hidden">
-                <img
-                  src={car.image_url}
-                  alt={`${car.year} ${car.brand} ${car.model}`}
-                  className="w-full h-48 object-cover group-hover:scale-105 transition-transform duration-300"
-                />
+                <picture>
+                  {car.image_srcset?.avif && (
+                    <source type="image/avif" srcSet={backendSrcSet(car.image_srcset.avif)} sizes={CARD_IMAGE_SIZES} />
+                  )}
+                  {car.image_srcset?.webp && (
+                    <source type="image/webp" srcSet={backendSrcSet(car.image_srcset.webp)} sizes={CARD_IMAGE_SIZES} />
+                  )}
+                  <img
+                    src={car.image_url}
+                    alt={`${car.year} ${car.brand} ${car.model}`}
+                    loading="lazy"
+                    className="w-full h-48 object-cover group-hover:scale-105 transition-transform duration-300"
+                  />
+                </picture>
                 
                 {/* Overlay Actions */}
                 <div className="absolute top-4 right-4 flex space-x-2">
@@ -304,6 +340,8 @@ const UsedCars = () => {
                         <h4 className="text-yellow-500 font-semibold mb-2">Description</h4>
                         <p className="text-gray-300 text-sm">{car.description}</p>
                       </div>
+
+                      <SimilarVehicles carId={car.id} />
                       
                       <div className="grid grid-cols-2 gap-4 text-sm">
                         <div>
@@ -352,6 +390,20 @@ const UsedCars = () => {
           ))}
         </div>
 
+        {/* Load More */}
+        {nextCursor && (
+          <div className="mb-12 text-center">
+            <button
+              onClick={loadMoreCars}
+              disabled={loadingMore}
+              className="inline-flex items-center px-8 py-3 bg-transparent border border-gray-600 text-gray-300 font-semibold rounded-lg hover:border-yellow-500 hover:text-yellow-500 transition-colors disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 className="h-5 w-5 mr-2 animate-spin" />}
+              {loadingMore ? 'Loading...' : 'Load More Vehicles'}
+            </button>
+          </div>
+        )}
+
         {/* Call to Action */}
         <div className="bg-gray-900 rounded-xl p-8 text-center border border-gray-800">
           <h3 className="text-2xl font-bold text-yellow-500 mb-4">
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# Backend modules import each other by bare name and read these at import time
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ["MONGO_URL"] = "mongomock://"
+os.environ["DB_NAME"] = "test_database"
@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics import (
+    inquiry_rollups, metric_field, rebuild_inquiry_rollups, record_inquiries, record_status_change, time_series,
+)
+from database import car_inquiries, car_inquiries_archive
+from models import CarInquiry
+
+
+def inquiry(index, days_ago, inquiry_type="details"):
+    return CarInquiry(
+        car_id=f"car-{index % 3}", car_type="used", customer_name="Ann",
+        customer_email="ann@example.com", inquiry_type=inquiry_type,
+        submitted_at=datetime.utcnow().replace(hour=10) - timedelta(days=days_ago),
+    )
+
+
+async def rollups():
+    docs = await inquiry_rollups.find({}).sort("_id", 1).to_list(None)
+    return [{**doc, "statuses": {k: v for k, v in doc["statuses"].items() if v}} for doc in docs]
+
+
+def test_incremental_rollups_match_a_rebuild():
+    async def scenario():
+        for collection in (car_inquiries, car_inquiries_archive, inquiry_rollups):
+            await collection.delete_many({})
+        stored = [inquiry(i, i % 4, ("details", "test_drive", "purchase")[i % 3]) for i in range(30)]
+        await car_inquiries.insert_many([obj.model_dump() for obj in stored])
+        await record_inquiries(stored)
+
+        changed = stored[4].model_dump()
+        await car_inquiries.update_one({"id": changed["id"]}, {"$set": {"status": "scheduled"}})
+        await record_status_change(changed, "new", "scheduled")
+
+        incremental = await rollups()
+        await rebuild_inquiry_rollups()
+        assert await rollups() == incremental
+
+        series = await time_series(days=5)
+        assert [point["count"] for point in series] == [0, 7, 7, 8, 8]
+
+    asyncio.run(scenario())
+
+
+def test_unknown_metric_is_rejected():
+    assert metric_field("status:closed") == "statuses.closed"
+    with pytest.raises(ValueError):
+        metric_field("revenue")
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+
+import cache
+from cache import ResponseCache, catalog_cache
+from database import testimonials, vehicles
+from server import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    responses = ResponseCache(ttl_seconds=60)
+    key = responses.make_key("vehicles", {"category": "used"})
+    responses.put(key, b"[]")
+
+    clock.now += 59
+    assert responses.get(key).body == b"[]"
+    clock.now += 1
+    assert responses.get(key) is None
+    assert responses.stats()["entries"] == 0
+    assert (responses.hits, responses.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    responses = ResponseCache(max_entries=2)
+    first, second, third = (responses.make_key("vehicles", {"id": name}) for name in "abc")
+    responses.put(first, b'"a"')
+    responses.put(second, b'"b"')
+    responses.get(first)
+    responses.put(third, b'"c"')
+
+    assert responses.get(second) is None
+    assert responses.get(first) is not None and responses.get(third) is not None
+    assert responses.evictions == 1
+
+
+def test_byte_budget_evicts_and_skips_oversized_bodies():
+    responses = ResponseCache(max_bytes=10)
+    small, other, huge = (responses.make_key("vehicles", {"id": name}) for name in "abc")
+    responses.put(small, b"123456")
+    responses.put(other, b"123456")
+    assert responses.get(small) is None
+    assert responses.stats()["bytes"] == 6
+
+    responses.put(huge, b"x" * 11)
+    assert responses.get(huge) is None
+    assert responses.get(other) is not None
+
+
+def test_keys_ignore_parameter_order_and_unset_values():
+    assert ResponseCache.make_key("vehicles", {"a": 1, "b": None, "c": 2}) == \
+        ResponseCache.make_key("vehicles", {"c": 2, "a": 1})
+
+
+def catalog_vehicle(vehicle_id):
+    return {
+        "id": vehicle_id, "year": 2021, "brand": "Audi", "model": "A4", "type": "Sedan", "category": "used",
+        "price": "$20,000", "image_url": "https://example.com/car.jpg", "features": "Sunroof",
+        "description": "Clean", "is_available": True, "created_at": datetime(2024, 5, 1),
+        "updated_at": datetime(2024, 5, 1),
+    }
+
+
+def run(steps):
+    async def call():
+        await vehicles.delete_many({})
+        await testimonials.delete_many({})
+        await vehicles.insert_one(catalog_vehicle("a"))
+        await testimonials.insert_one({
+            "id": "t1", "name": "Sam", "email": "sam@example.com", "rating": 5, "quote": "Great",
+            "is_approved": False, "created_at": datetime(2024, 5, 1),
+        })
+        catalog_cache.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await steps(client)
+    return asyncio.run(call())
+
+
+def test_creating_a_vehicle_invalidates_cached_lists():
+    async def steps(client):
+        await client.get("/api/vehicles")
+        hits = catalog_cache.hits
+        cached = await client.get("/api/vehicles")
+        cached_hits = catalog_cache.hits - hits
+        await client.post("/api/vehicles", json={
+            "year": 2022, "brand": "BMW", "model": "X3", "type": "SUV", "category": "used",
+            "image_url": "https://example.com/x3.jpg", "features": "AWD", "description": "Roomy",
+            "price": "$30,000",
+        })
+        hits = catalog_cache.hits
+        fresh = await client.get("/api/vehicles")
+        return cached, cached_hits, fresh, catalog_cache.hits - hits
+    cached, cached_hits, fresh, fresh_hits = run(steps)
+
+    assert cached_hits == 1 and len(cached.json()) == 1
+    assert fresh_hits == 0
+    assert sorted(doc["brand"] for doc in fresh.json()) == ["Audi", "BMW"]
+
+
+def test_approving_a_testimonial_invalidates_the_public_list():
+    async def steps(client):
+        before = await client.get("/api/testimonials")
+        approved = await client.put("/api/testimonials/t1/approve", json={"is_approved": True})
+        after = await client.get("/api/testimonials")
+        return before, approved, after
+    before, approved, after = run(steps)
+
+    assert before.json() == []
+    assert approved.status_code == 200
+    assert [doc["id"] for doc in after.json()] == ["t1"]
+
+
+def test_cached_entries_replay_304_for_a_matching_etag():
+    async def steps(client):
+        first = await client.get("/api/vehicles/a")
+        hits = catalog_cache.hits
+        again = await client.get("/api/vehicles/a", headers={"If-None-Match": first.headers["etag"]})
+        return first, again, catalog_cache.hits - hits
+    first, again, hits = run(steps)
+
+    assert hits == 1
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.headers["last-modified"] == first.headers["last-modified"]
@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+import compression
+from cache import ResponseCache
+from compression import CompressionMiddleware, accepted_encodings, negotiate
+
+BIG = json.dumps([{"id": index, "brand": "Toyota"} for index in range(200)]).encode()
+SMALL = b'{"ok": true}'
+
+
+def test_accept_encoding_q_values_pick_the_preferred_coding():
+    assert accepted_encodings("gzip;q=0.5, br;q=0.8, identity") == {"gzip": 0.5, "br": 0.8, "identity": 1.0}
+    assert negotiate("gzip;q=0.5, br;q=0.8", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0.9, br;q=0.8", ["br", "gzip"]) == "gzip"
+    assert negotiate("*;q=0.3, gzip;q=0", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=bogus", ["gzip"]) is None
+    assert negotiate(None, ["gzip"]) is None
+
+
+def test_identity_refusal_still_gets_an_offered_coding():
+    assert negotiate("identity;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("identity;q=0", ["br", "gzip"]) is None
+
+
+def make_app(responses=None):
+    app = FastAPI()
+
+    @app.get("/cached")
+    async def cached(request: Request):
+        key = responses.make_key("vehicles", {})
+        entry = responses.get(key) or responses.put(key, BIG, {"ETag": 'W/"v1"'})
+        return entry.to_response(request)
+
+    @app.get("/big")
+    async def big():
+        return Response(content=BIG, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(content=SMALL, media_type="application/json")
+
+    @app.get("/precompressed")
+    async def precompressed():
+        return Response(content=gzip.compress(BIG), media_type="application/json",
+                        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            yield b'{"n": 1}\n'
+            yield b'{"n": 2}\n'
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+def get(path, accept_encoding, responses=None):
+    async def call():
+        transport = httpx.ASGITransport(app=make_app(responses))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+    return asyncio.run(call())
+
+
+def test_large_json_is_compressed_with_the_negotiated_coding():
+    response = get("/big", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.content == BIG
+
+
+def test_bodies_under_the_minimum_size_are_sent_as_is():
+    response = get("/small", "gzip, br")
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == SMALL
+
+
+def test_identity_only_clients_get_the_plain_body_with_vary():
+    response = get("/big", "identity")
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == BIG
+
+
+def test_precompressed_bodies_pass_through(monkeypatch):
+    calls = []
+    monkeypatch.setattr(compression, "compress", lambda body, coding: calls.append(coding) or body)
+    response = get("/precompressed", "gzip, br")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == BIG
+    assert calls == []
+
+
+def test_streamed_bodies_are_not_buffered_for_compression():
+    response = get("/stream", "gzip")
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"n": 1}\n{"n": 2}\n'
+
+
+def test_cached_entries_are_served_from_their_stored_compressed_bodies(monkeypatch):
+    responses = ResponseCache()
+    gzip_response = get("/cached", "gzip", responses)
+    entry = responses.get(responses.make_key("vehicles", {}))
+    assert set(entry.encoded) == set(compression.ENCODERS)
+
+    calls = []
+    monkeypatch.setattr(compression, "compress", lambda body, coding: calls.append(coding) or body)
+    br_response = get("/cached", "br;q=1, gzip;q=0.5", responses)
+
+    assert gzip_response.headers["content-encoding"] == "gzip"
+    assert br_response.headers["content-encoding"] == "br"
+    assert br_response.headers["vary"] == "Accept-Encoding"
+    assert br_response.headers["etag"] == 'W/"v1"'
+    assert br_response.content == gzip_response.content == BIG
+    assert calls == []
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+
+from cache import catalog_cache
+from database import vehicles
+from server import app
+
+
+def vehicle(vehicle_id, brand, updated_at=datetime(2024, 5, 1, 12, 0, 0)):
+    return {
+        "id": vehicle_id, "year": 2021, "brand": brand, "model": "Base", "type": "Sedan",
+        "category": "used", "price": "$20,000", "image_url": "https://example.com/car.jpg",
+        "features": "Sunroof", "description": "Clean", "is_available": True,
+        "created_at": updated_at, "updated_at": updated_at,
+    }
+
+
+def run(steps):
+    async def call():
+        await vehicles.delete_many({})
+        await vehicles.insert_many([vehicle("a", "Audi"), vehicle("b", "BMW")])
+        catalog_cache.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await steps(client)
+    return asyncio.run(call())
+
+
+def test_list_answers_304_to_a_matching_if_none_match():
+    async def steps(client):
+        first = await client.get("/api/vehicles")
+        again = await client.get("/api/vehicles", headers={"If-None-Match": first.headers["etag"]})
+        other = await client.get("/api/vehicles", headers={"If-None-Match": 'W/"stale"'})
+        return first, again, other
+    first, again, other = run(steps)
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    assert "last-modified" not in first.headers
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    assert other.status_code == 200
+
+
+def test_single_vehicle_honours_if_modified_since():
+    async def steps(client):
+        first = await client.get("/api/vehicles/a")
+        same = await client.get("/api/vehicles/a", headers={"If-Modified-Since": first.headers["last-modified"]})
+        older = await client.get("/api/vehicles/a", headers={"If-Modified-Since": "Tue, 30 Apr 2024 12:00:00 GMT"})
+        return first, same, older
+    first, same, older = run(steps)
+
+    assert first.headers["last-modified"] == "Wed, 01 May 2024 12:00:00 GMT"
+    assert same.status_code == 304
+    assert older.status_code == 200
+
+
+def test_list_validators_change_after_a_write():
+    async def steps(client):
+        first = await client.get("/api/vehicles")
+        etag = first.headers["etag"]
+        created = await client.post("/api/vehicles", json={
+            "year": 2022, "brand": "Chevrolet", "model": "Bolt", "type": "Hatchback", "category": "used",
+            "image_url": "https://example.com/bolt.jpg", "features": "EV", "description": "Quiet",
+            "price": "$18,000",
+        })
+        after_create = await client.get("/api/vehicles", headers={"If-None-Match": etag})
+        # A sale leaves every remaining timestamp as it was; only the ETag notices
+        await vehicles.update_one({"id": "b"}, {"$set": {"is_available": False}})
+        catalog_cache.clear()
+        before_sale = after_create.headers["etag"]
+        after_sale = await client.get("/api/vehicles", headers={"If-None-Match": before_sale})
+        return created, after_create, after_sale, before_sale
+    created, after_create, after_sale, before_sale = run(steps)
+
+    assert created.status_code == 200
+    assert after_create.status_code == 200
+    assert len(after_create.json()) == 3
+    assert after_sale.status_code == 200
+    assert after_sale.headers["etag"] != before_sale
+    assert [doc["id"] for doc in after_sale.json()] == [created.json()["id"], "a"]
@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+import httpx
+
+from database import car_inquiries, contact_submissions
+from server import app, lead_export_filter
+
+DAY = datetime(2024, 5, 1)
+
+
+def contact(contact_id, hour, status="new", message="hello"):
+    return {
+        "id": contact_id, "full_name": f"Lead {contact_id}", "email": f"{contact_id}@example.com",
+        "message": message, "submitted_at": DAY.replace(hour=hour), "status": status,
+    }
+
+
+CONTACTS = [
+    contact("c1", 8),
+    contact("c2", 9, status="closed"),
+    # Same timestamp as c2: the id breaks the tie when resuming
+    contact("c3", 9, message='Trade-in, "as is"\nCall after 5'),
+    contact("c4", 10),
+    contact("c5", 11, status="closed"),
+]
+
+
+def export(path, params):
+    async def call():
+        await contact_submissions.delete_many({})
+        await car_inquiries.delete_many({})
+        await contact_submissions.insert_many([dict(doc) for doc in CONTACTS])
+        await car_inquiries.insert_many([
+            {"id": f"i{index}", "car_id": car_id, "car_type": "used", "customer_name": "Sam",
+             "customer_email": "sam@example.com", "inquiry_type": "details", "status": status,
+             "submitted_at": DAY.replace(hour=8 + index)}
+            for index, (car_id, status) in enumerate([("a", "new"), ("b", "new"), ("a", "closed"), ("a", "new")])
+        ])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, params=params)
+    return asyncio.run(call())
+
+
+def ndjson_ids(response):
+    assert response.status_code == 200
+    return [json.loads(line)["id"] for line in response.text.splitlines()]
+
+
+def test_date_range_includes_since_and_excludes_until():
+    response = export("/api/contact/export", {
+        "format": "ndjson", "since": "2024-05-01T09:00:00", "until": "2024-05-01T11:00:00",
+    })
+    assert ndjson_ids(response) == ["c2", "c3", "c4"]
+
+
+def test_status_filter():
+    assert ndjson_ids(export("/api/contact/export", {"format": "ndjson", "status": "closed"})) == ["c2", "c5"]
+
+
+def test_resume_from_the_last_exported_row():
+    after_c2 = {"format": "ndjson", "after": "2024-05-01T09:00:00", "after_id": "c2"}
+    assert ndjson_ids(export("/api/contact/export", after_c2)) == ["c3", "c4", "c5"]
+    # Without an id, everything at the timestamp counts as exported
+    assert ndjson_ids(export("/api/contact/export", {"format": "ndjson", "after": "2024-05-01T09:00:00"})) == \
+        ["c4", "c5"]
+    closed_after_c2 = {**after_c2, "status": "closed"}
+    assert ndjson_ids(export("/api/contact/export", closed_after_c2)) == ["c5"]
+
+
+def test_inquiry_export_combines_car_and_status_filters():
+    response = export("/api/inquiries/export", {"format": "ndjson", "car_id": "a", "status": "new"})
+    assert ndjson_ids(response) == ["i0", "i3"]
+
+
+def test_csv_quotes_commas_quotes_and_newlines():
+    response = export("/api/contact/export", {"format": "csv", "since": "2024-05-01T09:00:00",
+                                              "until": "2024-05-01T10:00:00"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="contacts.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == ["c2", "c3"]
+    assert rows[1]["message"] == 'Trade-in, "as is"\nCall after 5'
+
+
+def test_lead_export_filter_shapes():
+    assert lead_export_filter(None, None, None, None, None) == {}
+    assert lead_export_filter("new", DAY, None, None, None) == {"status": "new", "submitted_at": {"$gte": DAY}}
+    resumed = lead_export_filter(None, None, None, DAY, "c2")
+    assert resumed == {"$or": [{"submitted_at": {"$gt": DAY}}, {"submitted_at": DAY, "id": {"$gt": "c2"}}]}
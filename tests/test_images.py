@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+import pytest
+
+import images
+from images import ImagePipeline, ImageSourceError, PublicAddressBackend, check_source_url, derivative_path
+
+DIGEST = "ab" * 32
+PUBLIC_URL = "http://93.184.216.34/car.jpg"
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/car.jpg",
+    "http://10.0.0.5/car.jpg",
+    "http://192.168.1.1/car.jpg",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/car.jpg",
+    "http://[fe80::1]/car.jpg",
+    "http://[::ffff:127.0.0.1]/car.jpg",
+    "http://localhost/car.jpg",
+])
+def test_non_public_hosts_are_refused(url):
+    with pytest.raises(ImageSourceError):
+        asyncio.run(check_source_url(httpx.URL(url)))
+
+
+def test_only_http_urls_with_a_host_are_fetched():
+    with pytest.raises(ImageSourceError, match="file"):
+        asyncio.run(check_source_url(httpx.URL("file:///etc/passwd")))
+    with pytest.raises(ImageSourceError):
+        asyncio.run(check_source_url(httpx.URL("http:///car.jpg")))
+    asyncio.run(check_source_url(httpx.URL(PUBLIC_URL)))
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.hosts = []
+
+    async def connect_tcp(self, host, port, **kwargs):
+        self.hosts.append(host)
+        return "stream"
+
+
+def test_connections_go_to_the_vetted_address(monkeypatch):
+    answers = iter([["93.184.216.34"], ["10.0.0.5"]])
+
+    async def resolve(host, port):
+        addresses = next(answers)
+        if addresses[0].startswith("10."):
+            raise ImageSourceError(f"{host} resolves to a non-public address")
+        return addresses
+
+    monkeypatch.setattr(images, "public_addresses", resolve)
+    inner = RecordingBackend()
+    backend = PublicAddressBackend(inner)
+
+    assert asyncio.run(backend.connect_tcp("cdn.example.com", 443)) == "stream"
+    # The same name now rebinds to a private address: no connection is opened
+    with pytest.raises(ImageSourceError):
+        asyncio.run(backend.connect_tcp("cdn.example.com", 443))
+    assert inner.hosts == ["93.184.216.34"]
+
+
+def test_the_fetch_transport_refuses_private_addresses_without_the_url_check(monkeypatch):
+    async def skip_check(url):
+        return None
+
+    monkeypatch.setattr(images, "check_source_url", skip_check)
+    with pytest.raises(ImageSourceError, match="non-public"):
+        asyncio.run(ImagePipeline().fetch("http://127.0.0.1:9/car.jpg"))
+
+
+def fetch_with(monkeypatch, handler):
+    pipeline = ImagePipeline()
+    monkeypatch.setattr(pipeline, "_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return asyncio.run(pipeline.fetch(PUBLIC_URL))
+
+
+def test_redirects_are_checked_hop_by_hop(monkeypatch):
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        if request.url.path == "/car.jpg":
+            return httpx.Response(302, headers={"Location": "http://93.184.216.35/moved.jpg"})
+        if request.url.path == "/moved.jpg":
+            return httpx.Response(302, headers={"Location": "http://169.254.169.254/latest/meta-data"})
+        return httpx.Response(200, content=b"secret")
+
+    with pytest.raises(ImageSourceError):
+        fetch_with(monkeypatch, handler)
+    assert requested == [PUBLIC_URL, "http://93.184.216.35/moved.jpg"]
+
+
+def test_redirects_to_public_hosts_are_followed_up_to_the_limit(monkeypatch):
+    def handler(request):
+        if request.url.path == "/car.jpg":
+            return httpx.Response(301, headers={"Location": "/final.jpg"})
+        return httpx.Response(200, content=b"image-bytes")
+
+    assert fetch_with(monkeypatch, handler) == b"image-bytes"
+
+    def loop(request):
+        return httpx.Response(302, headers={"Location": PUBLIC_URL})
+
+    with pytest.raises(ImageSourceError, match="redirected"):
+        fetch_with(monkeypatch, loop)
+
+
+def test_derivative_path_only_resolves_derivative_names(tmp_path):
+    assert derivative_path(DIGEST, "card.webp", tmp_path) == tmp_path / "ab" / DIGEST / "card.webp"
+    assert derivative_path(DIGEST, "hero.avif", tmp_path) == tmp_path / "ab" / DIGEST / "hero.avif"
+    assert derivative_path(DIGEST, "original", tmp_path) is None
+    assert derivative_path(DIGEST, "poster.webp", tmp_path) is None
+    assert derivative_path(DIGEST, "card.png", tmp_path) is None
+    assert derivative_path(DIGEST, "../card.webp", tmp_path) is None
+    assert derivative_path("../" + DIGEST[3:], "card.webp", tmp_path) is None
+    assert derivative_path(DIGEST.upper(), "card.webp", tmp_path) is None
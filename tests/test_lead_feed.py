@@ -0,0 +1,90 @@
+import asyncio
+from datetime import timedelta
+
+from database import car_inquiries, contact_submissions
+from lead_feed import LeadFeed
+from models import CarInquiry, ContactSubmission
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def contact(name):
+    return ContactSubmission(full_name=name, email=f"{name}@example.com", message="hello").dict()
+
+
+def inquiry(name):
+    return CarInquiry(car_id="car-1", car_type="used", customer_name=name,
+                      customer_email=f"{name}@example.com", inquiry_type="test_drive").dict()
+
+
+def next_message(stream):
+    return asyncio.wait_for(stream.__anext__(), timeout=2)
+
+
+def test_polling_feed_emits_resumes_and_stops():
+    async def scenario():
+        await contact_submissions.delete_many({})
+        await car_inquiries.delete_many({})
+        feed = LeadFeed(mode="poll", poll_interval=0.01, heartbeat=0.05)
+
+        request = FakeRequest()
+        stream = feed.events(request)
+        assert await next_message(stream) == b"retry: 3000\n\n"
+        first = contact("ann")
+        await contact_submissions.insert_one(dict(first))
+        message = await next_message(stream)
+        assert message.startswith(f"id: {first['id']}\nevent: contact.created\n".encode())
+        assert b'"full_name":"ann"' in message
+        assert feed.stats() == {"source": "poll", "subscribers": 1, "published": 1}
+
+        request.disconnected = True
+        while True:
+            try:
+                assert await next_message(stream) == b": keepalive\n\n"
+            except StopAsyncIteration:
+                break
+        assert feed.stats()["subscribers"] == 0
+        assert feed._task is None
+
+        # Leads stored while the admin was away are replayed on reconnect
+        missed = [contact("bob"), inquiry("cy")]
+        for step, doc in enumerate(missed, 1):
+            doc["submitted_at"] = first["submitted_at"] + timedelta(milliseconds=10 * step)
+        for doc, collection in zip(missed, (contact_submissions, car_inquiries)):
+            await collection.insert_one(dict(doc))
+        stream = feed.events(FakeRequest(), last_event_id=first["id"])
+        assert await next_message(stream) == b"retry: 3000\n\n"
+        replayed = [await next_message(stream) for _ in missed]
+        assert replayed[0].startswith(f"id: {missed[0]['id']}\nevent: contact.created".encode())
+        assert replayed[1].startswith(f"id: {missed[1]['id']}\nevent: inquiry.created".encode())
+        live = inquiry("dee")
+        await car_inquiries.insert_one(dict(live))
+        assert (await next_message(stream)).startswith(f"id: {live['id']}\n".encode())
+        await stream.aclose()
+        assert feed._task is None
+
+    asyncio.run(scenario())
+
+
+def test_unknown_or_too_old_last_event_id_asks_for_a_refetch():
+    async def scenario():
+        await contact_submissions.delete_many({})
+        feed = LeadFeed(mode="poll", poll_interval=0.01, heartbeat=0.05, queue_size=1)
+        stream = feed.events(FakeRequest(), last_event_id="no-such-lead")
+        assert await next_message(stream) == b"retry: 3000\n\n"
+        assert await next_message(stream) == b"event: reset\ndata: {}\n\n"
+
+        docs = [contact(name) for name in ("ann", "bob", "cy")]
+        await contact_submissions.insert_many([dict(doc) for doc in docs])
+        stream = feed.events(FakeRequest(), last_event_id=docs[0]["id"])
+        assert await next_message(stream) == b"retry: 3000\n\n"
+        assert await next_message(stream) == b"event: reset\ndata: {}\n\n"
+        await feed.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,166 @@
+import asyncio
+import fcntl
+import json
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from lead_writer import LeadWriter
+from models import ContactSubmission
+
+
+def contact(name):
+    return ContactSubmission(full_name=name, email=f"{name}@example.com", message="hello")
+
+
+@pytest.fixture
+def collection():
+    return AsyncMongoMockClient()["leads"]["contacts"]
+
+
+def make_writer(collection, spill_dir, fsync=False):
+    return LeadWriter("contacts", collection, ContactSubmission, buffered=True,
+                      batch_size=1000, flush_interval=60, spill_dir=spill_dir, fsync=fsync)
+
+
+@pytest.mark.parametrize("fsync", [False, True])
+def test_flush_stores_batch_and_removes_rotated_file(tmp_path, collection, fsync):
+    async def scenario():
+        writer = make_writer(collection, tmp_path, fsync)
+        await writer.start()
+        for name in ("ann", "bob"):
+            await writer.write(contact(name))
+        assert len(writer.spill_path.read_text().splitlines()) == 2
+
+        await writer.flush()
+        assert await collection.count_documents({}) == 2
+        assert list(tmp_path.glob("*.flushing")) == []
+        assert writer.spill_path.read_text() == ""
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_rotation_keeps_queue(tmp_path, collection, monkeypatch):
+    async def scenario():
+        writer = make_writer(collection, tmp_path)
+        await writer.start()
+        await writer.write(contact("ann"))
+
+        def broken_rotation():
+            raise OSError("disk full")
+
+        monkeypatch.setattr(writer, "_rotate_spill", broken_rotation)
+        await writer.flush()
+        assert writer.flush_failures == 1
+        assert len(writer._queue) == 1
+        assert await collection.count_documents({}) == 0
+
+        monkeypatch.undo()
+        await writer.stop()
+        assert await collection.count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_insert_requeues_and_keeps_spill(tmp_path, collection, monkeypatch):
+    async def scenario():
+        writer = make_writer(collection, tmp_path)
+        await writer.start()
+        await writer.write(contact("ann"))
+
+        async def broken_insert(batch):
+            raise RuntimeError("primary stepped down")
+
+        monkeypatch.setattr(writer, "_insert", broken_insert)
+        await writer.flush()
+        assert writer.flush_failures == 1
+        assert len(writer._queue) == 1
+        assert len(list(tmp_path.glob("*.flushing"))) == 1
+
+        monkeypatch.undo()
+        await writer.flush()
+        assert await collection.count_documents({}) == 1
+        assert list(tmp_path.glob("*.flushing")) == []
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_recovery_replays_spill_files_idempotently(tmp_path, collection):
+    async def scenario():
+        stored = contact("ann")
+        await collection.create_index("id", unique=True)
+        await collection.insert_one(stored.model_dump())
+
+        lines = [json.dumps(stored.model_dump(mode="json")), json.dumps(contact("bob").model_dump(mode="json"))]
+        (tmp_path / "contacts.4242.1-1.flushing").write_text("\n".join(lines) + "\n")
+        # A crash mid-write leaves a torn last line in the live spill file
+        live = make_writer(collection, tmp_path).spill_path
+        live.write_text(json.dumps(contact("cy").model_dump(mode="json")) + "\n" + '{"id": "torn')
+
+        writer = make_writer(collection, tmp_path)
+        await writer.start()
+        assert len(writer._queue) == 3
+        await writer.stop()
+
+        names = sorted(doc["full_name"] for doc in await collection.find({}).to_list(None))
+        assert names == ["ann", "bob", "cy"]
+        assert list(tmp_path.glob("*.flushing")) == []
+
+    asyncio.run(scenario())
+
+
+def test_recovery_leaves_files_of_live_workers_alone(tmp_path, collection):
+    async def scenario():
+        line = json.dumps(contact("ann").model_dump(mode="json")) + "\n"
+        other_live = tmp_path / "contacts.4242.jsonl"
+        other_flushing = tmp_path / "contacts.4242.1-1.flushing"
+        other_live.write_text(line)
+        other_flushing.write_text(line)
+        (tmp_path / "contacts.777.jsonl").write_text(json.dumps(contact("bob").model_dump(mode="json")) + "\n")
+
+        with open(other_live, "a") as held:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            writer = make_writer(collection, tmp_path)
+            await writer.start()
+            assert [obj.full_name for obj in writer._queue] == ["bob"]
+            await writer.stop()
+
+        assert other_live.exists() and other_flushing.exists()
+        assert not (tmp_path / "contacts.777.jsonl").exists()
+        assert [doc["full_name"] for doc in await collection.find({}).to_list(None)] == ["bob"]
+
+    asyncio.run(scenario())
+
+
+def test_replay_creates_the_unique_index_before_inserting(tmp_path, collection):
+    async def scenario():
+        # The background index build has not run yet
+        stored = contact("ann")
+        await collection.insert_one(stored.model_dump())
+        lines = [json.dumps(stored.model_dump(mode="json")), json.dumps(contact("bob").model_dump(mode="json"))]
+        (tmp_path / "contacts.4242.1-1.flushing").write_text("\n".join(lines) + "\n")
+
+        writer = make_writer(collection, tmp_path)
+        await writer.start()
+        await writer.stop()
+
+        names = sorted(doc["full_name"] for doc in await collection.find({}).to_list(None))
+        assert names == ["ann", "bob"]
+        assert any(index["key"] == [("id", 1)] and index.get("unique")
+                   for index in (await collection.index_information()).values())
+
+    asyncio.run(scenario())
+
+
+def test_direct_write_succeeds_when_counting_fails(collection):
+    async def broken_rollup(batch):
+        raise RuntimeError("rollup collection unavailable")
+
+    async def scenario():
+        writer = LeadWriter("contacts", collection, ContactSubmission, after_store=broken_rollup)
+        await writer.write(contact("ann"))
+        return await collection.count_documents({})
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,72 @@
+import asyncio
+import re
+
+import httpx
+
+from metrics import Counter, Histogram, http_request_duration
+from server import app
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"'
+                         r'(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? -?[0-9.e+-]+$')
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "/a")
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP demo_seconds Demo", "# TYPE demo_seconds histogram"]
+    assert lines[2:] == [
+        'demo_seconds_bucket{route="/a",le="0.1"} 2',
+        'demo_seconds_bucket{route="/a",le="1.0"} 3',
+        'demo_seconds_bucket{route="/a",le="+Inf"} 4',
+        'demo_seconds_sum{route="/a"} 2.65',
+        'demo_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("demo_total", "Demo", ("path",))
+    counter.inc('a"b\\c\nd')
+    assert counter.render()[2] == 'demo_total{path="a\\"b\\\\c\\nd"} 1'
+
+
+def request_counts():
+    return {labels: series[0] for labels, series in http_request_duration._series.items()}
+
+
+def get(*paths):
+    async def call():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    return asyncio.run(call())
+
+
+def test_requests_are_labelled_by_route_template():
+    before = request_counts()
+    get("/api/vehicles/does-not-exist", "/api/vehicles/also-missing", "/no/such/path")
+    after = request_counts()
+
+    def added(labels):
+        return sum(after.get(labels, [0])) - sum(before.get(labels, [0]))
+
+    assert added(("GET", "/api/vehicles/{vehicle_id}", "404")) == 2
+    assert added(("GET", "unmatched", "404")) == 1
+    assert not any("does-not-exist" in route for _, route, _ in after)
+
+
+def test_metrics_endpoint_renders_the_text_exposition_format():
+    get("/api/")
+    response, = get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    body = response.text
+    assert body.endswith("\n")
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/",status="200"}' in body
+    assert "# TYPE catalog_cache_hits_total counter" in body
+    for line in body.splitlines():
+        assert line.startswith("# ") or SAMPLE_LINE.match(line), line
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from pagination import decode_cursor, encode_cursor, fetch_page, position_filter
+
+START = datetime(2024, 3, 1, 9, 30, 15, 123000)
+
+
+def test_cursor_round_trips_datetimes_numbers_and_null():
+    for value in (START, 4250000, "Toyota", None):
+        assert decode_cursor(encode_cursor("field", value, "id-1"), "field") == (value, "id-1")
+
+
+def test_cursor_for_another_sort_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor("year", 2020, "id-1"), "price_cents")
+    assert error.value.status_code == 400
+
+
+def test_tampered_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor", "year")
+    assert error.value.status_code == 400
+
+
+def test_position_filter_keeps_caller_filter():
+    combined = position_filter({"category": "used"}, "year", 2020, "v5", direction=1)
+    assert combined["$and"][0] == {"category": "used"}
+    assert {"year": {"$gt": 2020}} in combined["$and"][1]["$or"]
+
+
+def test_position_filter_descending_from_null_stays_among_nulls():
+    assert position_filter({}, "year", None, "v5") == {"$or": [{"year": None, "id": {"$lt": "v5"}}]}
+
+
+def expected_order(docs, direction):
+    # MongoDB sorts missing/null before any value
+    def key(doc):
+        value = doc.get("year")
+        return (value is not None, value if value is not None else 0, doc["id"])
+    return [doc["id"] for doc in sorted(docs, key=key, reverse=direction == -1)]
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+@pytest.mark.parametrize("limit", [1, 3, 4, 50])
+def test_fetch_page_walks_every_document_once_including_nulls(direction, limit):
+    docs = [{"id": f"v{i:02d}", "year": year} for i, year in enumerate(
+        [2018, None, 2020, 2018, None, 2021, 2020, 2019, None, 2018, 2022]
+    )]
+    docs.append({"id": "v99"})  # a missing field sorts like null
+
+    async def walk():
+        collection = AsyncMongoMockClient()["paging"]["vehicles"]
+        await collection.insert_many([dict(doc) for doc in docs])
+        seen, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(collection, {}, "year", limit, cursor, {"_id": 0}, direction)
+            assert len(page) <= limit
+            seen.extend(doc["id"] for doc in page)
+            if cursor is None:
+                return seen
+
+    assert asyncio.run(walk()) == expected_order(docs, direction)
+
+
+def test_fetch_page_on_datetimes_with_a_filter():
+    docs = [{"id": f"c{i}", "kind": "a" if i % 2 else "b", "submitted_at": START + timedelta(seconds=i // 2)}
+            for i in range(10)]
+
+    async def walk():
+        collection = AsyncMongoMockClient()["paging"]["contacts"]
+        await collection.insert_many([dict(doc) for doc in docs])
+        seen, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(collection, {"kind": "a"}, "submitted_at", 2, cursor, {"_id": 0})
+            seen.extend(doc["id"] for doc in page)
+            if cursor is None:
+                return seen
+
+    assert asyncio.run(walk()) == ["c9", "c7", "c5", "c3", "c1"]
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import rate_limit
+from models import ContactSubmissionCreate
+from rate_limit import BucketSpec, MemoryBuckets, MemoryClaims, SubmissionGuard
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_bucket_allows_a_burst_then_refills_evenly(clock):
+    buckets = MemoryBuckets()
+    spec = BucketSpec(burst=3, period=60)
+
+    assert [run(buckets.take("ip:a", spec))[0] for _ in range(4)] == [True, True, True, False]
+    allowed, tokens = run(buckets.take("ip:a", spec))
+    assert not allowed and spec.retry_after(tokens) == 20
+
+    clock.now += 20
+    assert run(buckets.take("ip:a", spec))[0]
+    assert not run(buckets.take("ip:a", spec))[0]
+
+    # Refill is capped at the burst size however long the caller was idle
+    clock.now += 3600
+    assert [run(buckets.take("ip:a", spec))[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_per_key_and_bounded(clock):
+    buckets = MemoryBuckets(max_keys=2)
+    spec = BucketSpec(burst=1, period=60)
+    for key in ("a", "b"):
+        assert run(buckets.take(key, spec))[0]
+    assert not run(buckets.take("a", spec))[0]
+    run(buckets.take("c", spec))
+    # "b" was least recently used, so it was evicted and starts full again
+    assert run(buckets.take("b", spec))[0]
+
+
+def test_claims_expire_after_the_window(clock):
+    claims = MemoryClaims()
+    assert run(claims.claim("k", 120, "f1")) == (True, None, None)
+    assert run(claims.claim("k", 120, "f1")) == (False, None, "f1")
+
+    run(claims.complete("k", b'{"id":"1"}'))
+    clock.now += 119
+    assert run(claims.claim("k", 120, "f1")) == (False, b'{"id":"1"}', "f1")
+
+    clock.now += 1
+    assert run(claims.claim("k", 120, "f2")) == (True, None, None)
+
+
+def test_released_claim_can_be_taken_again(clock):
+    claims = MemoryClaims()
+    run(claims.claim("k", 120, "f1"))
+    run(claims.release("k"))
+    assert run(claims.claim("k", 120, "f1"))[0]
+
+
+def request(ip, idempotency_key=None):
+    headers = [(b"idempotency-key", idempotency_key.encode())] if idempotency_key else []
+    return Request({"type": "http", "method": "POST", "path": "/api/contact", "headers": headers,
+                    "client": (ip, 5000)})
+
+
+def contact(message="hello"):
+    return ContactSubmissionCreate(full_name="Ann", email="ann@example.com", message=message)
+
+
+def test_idempotency_key_is_scoped_to_the_client_and_payload(clock):
+    guard = SubmissionGuard(backend="memory", ip_limit=BucketSpec(100, 60),
+                            email_limit=BucketSpec(100, 60), dedupe_window=120, enabled=True)
+
+    first = run(guard.admit(request("10.0.0.1", "abc"), "contact", "ann@example.com", contact()))
+    run(first.complete(rate_limit.Response(content=b'{"id":"1"}')))
+
+    repeat = run(guard.admit(request("10.0.0.1", "abc"), "contact", "ann@example.com", contact()))
+    assert repeat.replay is not None and repeat.replay.body == b'{"id":"1"}'
+
+    # The same key from another client is a different submission
+    other = run(guard.admit(request("10.0.0.2", "abc"), "contact", "ann@example.com", contact("hi")))
+    assert other.replay is None
+
+    with pytest.raises(HTTPException) as error:
+        run(guard.admit(request("10.0.0.1", "abc"), "contact", "ann@example.com", contact("changed")))
+    assert error.value.status_code == 422
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+
+from recommendations import BUILD_CHUNK_ROWS, apply_changes, build_state
+
+BRANDS = ["toyota", "honda", "ford", "bmw", "audi"]
+TYPES = ["sedan", "suv", "truck"]
+
+
+def vehicle(rng, index, **overrides):
+    doc = {
+        "id": f"v{index}",
+        "brand": rng.choice(BRANDS),
+        "type": rng.choice(TYPES),
+        "category": rng.choice(["new", "used"]),
+        "year": rng.randint(2010, 2024),
+        "price_cents": rng.randint(1_000_000, 9_000_000),
+        "mileage_km": rng.randint(0, 200_000),
+        "is_available": True,
+    }
+    doc.update(overrides)
+    return doc
+
+
+def neighbours(state, k):
+    return {
+        state.ids[row]: [state.ids[n] for n in state.neighbors[row, :k] if n >= 0]
+        for row in np.flatnonzero(state.active)
+    }
+
+
+def test_apply_changes_matches_a_fresh_build():
+    rng = random.Random(7)
+    k = 8
+    docs = {f"v{i}": vehicle(rng, i) for i in range(1500)}
+    state = build_state(list(docs.values()), k)
+
+    changes = []
+    # More changes than one chunk, so the affected-row scan runs in several blocks
+    for index in rng.sample(range(1500), BUILD_CHUNK_ROWS + 50):
+        changes.append(vehicle(rng, index))
+    for index in rng.sample(range(1500), 40):
+        changes.append(dict(docs[f"v{index}"], is_available=False))
+    changes.extend(vehicle(rng, index) for index in range(1500, 1530))
+    for doc in changes:
+        docs[doc["id"]] = doc
+
+    updated = apply_changes(state, changes)
+    fresh = build_state([doc for doc in docs.values() if doc["is_available"]], k)
+
+    assert neighbours(updated, k) == neighbours(fresh, k)
+
+
+def test_apply_changes_deactivates_and_hides_unavailable_vehicles():
+    rng = random.Random(3)
+    docs = [vehicle(rng, i) for i in range(50)]
+    state = build_state(docs, 5)
+
+    updated = apply_changes(state, [dict(docs[0], is_available=False)])
+
+    assert not updated.active[updated.positions["v0"]]
+    assert all("v0" not in ids for ids in neighbours(updated, 5).values())
+    # The previous generation is left untouched for readers still holding it
+    assert state.active[state.positions["v0"]]
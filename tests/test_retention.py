@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import retention
+from retention import ArchiveQuery, FileArchive, LeadRetention
+from database import contact_submissions
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def lead(index, **overrides):
+    doc = {
+        "id": f"c{index:03d}",
+        "full_name": f"Lead {index}",
+        "email": f"lead{index % 3}@example.com",
+        "phone": None,
+        "message": "hello",
+        "submitted_at": START + timedelta(minutes=index),
+        "status": "closed",
+        "notes": None,
+    }
+    doc.update(overrides)
+    return doc
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = FileArchive(tmp_path)
+    docs = [lead(i) for i in range(40)]
+
+    async def store():
+        # Overlapping batches and a re-run duplicate, as interrupted runs leave behind
+        for start, stop in ((0, 15), (10, 25), (25, 40), (30, 35)):
+            await archive.store("contacts", docs[start:stop], START)
+
+    asyncio.run(store())
+    return archive
+
+
+def page_through(archive, query, limit):
+    ids, cursor = [], None
+    while True:
+        docs, cursor = asyncio.run(archive.search("contacts", query, limit, cursor))
+        assert len(docs) <= limit
+        ids.extend(doc["id"] for doc in docs)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 7, 15, 100])
+def test_file_scan_pages_newest_first_without_gaps_or_duplicates(archive, limit):
+    assert page_through(archive, ArchiveQuery(), limit) == [f"c{i:03d}" for i in reversed(range(40))]
+
+
+def test_file_scan_applies_filters_across_pages(archive):
+    query = ArchiveQuery(email="lead1@example.com", since=START + timedelta(minutes=5),
+                         until=START + timedelta(minutes=31))
+    expected = [f"c{i:03d}" for i in reversed(range(5, 31)) if i % 3 == 1]
+    assert page_through(archive, query, 4) == expected
+
+
+def test_file_scan_stops_before_older_files(archive, monkeypatch):
+    opened = []
+    decompress = retention._decompress
+    monkeypatch.setattr(retention, "_decompress", lambda path: opened.append(path.name) or decompress(path))
+
+    docs, cursor = asyncio.run(archive.search("contacts", ArchiveQuery(), 3, None))
+
+    assert [doc["id"] for doc in docs] == ["c039", "c038", "c037"]
+    assert cursor is not None
+    # The file holding the newest leads is enough; the older ones are never read
+    assert len(opened) == 1 and opened[0].startswith("20240101T122500-20240101T123900-")
+
+
+def test_run_once_keeps_leads_that_stop_matching(tmp_path, monkeypatch):
+    async def scenario():
+        await contact_submissions.delete_many({})
+        old = datetime.utcnow() - timedelta(days=400)
+        await contact_submissions.insert_many([lead(i, submitted_at=old + timedelta(minutes=i)) for i in range(3)])
+        job = LeadRetention(target="file", closed_days=365)
+        job.archive = FileArchive(tmp_path)
+
+        store = job.archive.store
+
+        async def reopen_during_store(kind, docs, archived_at):
+            await store(kind, docs, archived_at)
+            await contact_submissions.update_one({"id": "c001"}, {"$set": {"status": "new"}})
+
+        monkeypatch.setattr(job.archive, "store", reopen_during_store)
+        moved = await job.run_once()
+
+        assert moved["contacts"] == 2
+        assert await contact_submissions.distinct("id") == ["c001"]
+        archived, _ = await FileArchive(tmp_path).search("contacts", ArchiveQuery(), 10, None)
+        assert [doc["id"] for doc in archived] == ["c002", "c000"]
+
+    asyncio.run(scenario())
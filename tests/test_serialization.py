@@ -0,0 +1,100 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import List
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from conditional import VEHICLE_VERSION_FIELDS
+from models import Testimonial, Vehicle
+from serialization import MODEL_CACHE_SIZE, _list_adapter, encode_documents, model_response, partial_model
+from vehicle_search import FIELD_PRESETS, parse_fields, projection_for
+
+DOC = {
+    "id": "v1", "year": 2022, "brand": "Toyota", "model": "Camry", "type": "Sedan", "category": "used",
+    "image_url": "https://example.com/v1.jpg", "features": "Sunroof", "description": "Clean",
+    "price": "$25,000", "price_cents": 2500000, "mileage": "40,000 km", "mileage_km": 40000,
+    "is_available": True, "is_featured": False,
+    "created_at": datetime(2024, 5, 1), "updated_at": datetime(2024, 5, 2), "search_terms": ["toyota"],
+}
+
+
+def test_parse_fields_resolves_presets_and_lists_in_model_order():
+    assert parse_fields(None) is None
+    assert parse_fields(" ") is None
+    assert parse_fields("detail") is None
+    assert parse_fields("card") == tuple(name for name in Vehicle.model_fields if name in FIELD_PRESETS["card"])
+    assert parse_fields("price, brand,,") == ("id", "brand", "price")
+    assert parse_fields("brand,price") == parse_fields("price,brand")
+    assert set(parse_fields("card,description")) == set(FIELD_PRESETS["card"]) | {"description"}
+
+
+def test_parse_fields_rejects_unknown_fields():
+    with pytest.raises(HTTPException) as error:
+        parse_fields("brand,search_terms")
+    assert error.value.status_code == 400
+    assert "search_terms" in error.value.detail
+
+
+def test_projection_adds_the_sort_and_version_fields():
+    assert projection_for(None, "created_at") == {"_id": 0}
+    projection = projection_for(("id", "brand"), "price_cents")
+    assert set(projection) == {"_id", "id", "brand", "price_cents", *VEHICLE_VERSION_FIELDS}
+    assert projection["_id"] == 0
+
+
+def test_encoded_body_has_exactly_the_requested_fields():
+    fields = parse_fields("brand,price")
+    # The document still carries fields fetched only for paging and ETags
+    body = json.loads(encode_documents(partial_model(Vehicle, fields), [DOC]))
+    assert body == [{"id": "v1", "brand": "Toyota", "price": "$25,000"}]
+
+
+def test_model_caches_are_bounded():
+    assert partial_model.cache_info().maxsize == MODEL_CACHE_SIZE
+    assert _list_adapter.cache_info().maxsize == MODEL_CACHE_SIZE
+    names = [name for name in Vehicle.model_fields if name != "id"]
+    for first in names:
+        for second in names:
+            encode_documents(partial_model(Vehicle, ("id", first, second)), [DOC])
+    assert partial_model.cache_info().currsize <= MODEL_CACHE_SIZE
+    assert _list_adapter.cache_info().currsize <= MODEL_CACHE_SIZE
+
+
+def old_response_model_body(response_model, result):
+    """The JSON FastAPI produced when endpoints returned models through response_model"""
+    app = FastAPI()
+
+    @app.get("/old", response_model=response_model)
+    async def old():
+        return result
+
+    async def call():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/old")).json()
+    return asyncio.run(call())
+
+
+def test_encoded_lists_match_the_response_model_path():
+    docs = [
+        DOC,
+        {**DOC, "id": "v2", "category": "new", "mileage": None, "mileage_km": None, "price_cents": None,
+         "image_srcset": {"webp": "/a 160w"}, "created_at": datetime(2024, 5, 1, 8, 30, 15, 123456)},
+    ]
+    new_body = json.loads(encode_documents(Vehicle, docs))
+    assert new_body == old_response_model_body(List[Vehicle], [Vehicle(**doc) for doc in docs])
+    assert new_body[1]["category"] == "new"
+    assert new_body[1]["mileage"] is None
+    assert new_body[1]["created_at"] == "2024-05-01T08:30:15.123456"
+
+
+def test_model_response_matches_the_response_model_path():
+    testimonial = Testimonial(name="Sam", email="sam@example.com", rating=5, quote="Great",
+                              purchase_date=datetime(2024, 4, 2, tzinfo=timezone.utc))
+    new_body = json.loads(model_response(testimonial).body)
+    assert new_body == old_response_model_body(Testimonial, testimonial)
+    assert new_body["approved_at"] is None
+    assert new_body["purchase_date"] == "2024-04-02T00:00:00Z"
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import httpx
+
+import server
+import snapshots
+from database import testimonials, vehicles
+from server import app
+from snapshots import MANIFEST_NAME, SNAPSHOTS, SnapshotBuilder
+
+
+def used_vehicle(vehicle_id, brand):
+    return {
+        "id": vehicle_id, "year": 2021, "brand": brand, "model": "A4", "type": "Sedan", "category": "used",
+        "price": "$20,000", "image_url": "https://example.com/car.jpg", "features": "Sunroof",
+        "description": "Clean", "is_available": True, "created_at": datetime(2024, 5, 1),
+        "updated_at": datetime(2024, 5, 1),
+    }
+
+
+def stored(*docs):
+    async def reset():
+        await vehicles.delete_many({})
+        await testimonials.delete_many({})
+        if docs:
+            await vehicles.insert_many([dict(doc) for doc in docs])
+    return reset()
+
+
+def read_snapshot(builder, name):
+    entry = builder.read_manifest()[name]
+    return json.loads((builder.directory / entry["file"]).read_bytes())
+
+
+def test_build_writes_versioned_files_and_the_manifest(tmp_path):
+    builder = SnapshotBuilder(tmp_path, debounce=0)
+
+    async def scenario():
+        await stored(used_vehicle("b", "BMW"), used_vehicle("a", "Audi"))
+        return await builder.build()
+    manifest = asyncio.run(scenario())
+
+    assert set(manifest) == set(SNAPSHOTS)
+    assert json.loads((tmp_path / MANIFEST_NAME).read_bytes()) == manifest
+    entry = manifest["vehicles-used"]
+    assert entry["truncated"] is False
+    assert [doc["brand"] for doc in read_snapshot(builder, "vehicles-used")] == ["Audi", "BMW"]
+    assert gzip.decompress((tmp_path / (entry["file"] + ".gz")).read_bytes()) == \
+        (tmp_path / entry["file"]).read_bytes()
+    assert read_snapshot(builder, "vehicles-new") == []
+
+    path, coding = builder.resolve(entry["file"], "gzip")
+    assert (path.name, coding) == (entry["file"] + ".gz", "gzip")
+    assert builder.resolve("../" + MANIFEST_NAME, None) is None
+
+
+def test_a_list_longer_than_the_limit_is_marked_truncated(tmp_path, monkeypatch):
+    collection, model, filter_dict, sort, _ = SNAPSHOTS["vehicles-used"]
+    monkeypatch.setitem(SNAPSHOTS, "vehicles-used", (collection, model, filter_dict, sort, 2))
+    builder = SnapshotBuilder(tmp_path, debounce=0)
+
+    async def scenario():
+        await stored(*(used_vehicle(vehicle_id, brand) for vehicle_id, brand in
+                       [("a", "Audi"), ("b", "BMW"), ("c", "Citroen")]))
+        await builder.build(["vehicles-used"])
+        await vehicles.delete_one({"id": "c"})
+        await builder.build(["vehicles-used"])
+    asyncio.run(scenario())
+
+    # The second build fits within the limit again
+    assert builder.read_manifest()["vehicles-used"]["truncated"] is False
+    assert len(read_snapshot(builder, "vehicles-used")) == 2
+
+    async def overflow():
+        await vehicles.insert_one(used_vehicle("d", "Dacia"))
+        return await builder.build(["vehicles-used"])
+    manifest = asyncio.run(overflow())
+    assert manifest["vehicles-used"]["truncated"] is True
+    assert [doc["brand"] for doc in read_snapshot(builder, "vehicles-used")] == ["Audi", "BMW"]
+
+
+def test_ensure_rebuilds_a_manifest_without_truncated_flags(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({name: f"{name}.0000000000000000.json" for name in SNAPSHOTS}))
+    builder = SnapshotBuilder(tmp_path, debounce=0)
+
+    async def scenario():
+        await stored(used_vehicle("a", "Audi"))
+        await builder.ensure()
+        await builder.ensure()
+    asyncio.run(scenario())
+
+    assert builder.builds == 1
+    assert all(isinstance(entry, dict) for entry in builder.read_manifest().values())
+
+
+def test_creating_a_vehicle_rebuilds_the_vehicle_snapshots(tmp_path, monkeypatch):
+    builder = SnapshotBuilder(tmp_path, debounce=0)
+    monkeypatch.setattr(server, "snapshot_builder", builder)
+
+    async def scenario():
+        await stored(used_vehicle("a", "Audi"))
+        before = await builder.build()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/vehicles", json={
+                "year": 2022, "brand": "BMW", "model": "X3", "type": "SUV", "category": "used",
+                "image_url": "https://example.com/x3.jpg", "features": "AWD", "description": "Roomy",
+                "price": "$30,000",
+            })
+            assert response.status_code == 200
+            await builder.stop()
+            manifest = await client.get(f"/api/snapshots/{MANIFEST_NAME}")
+        return before, manifest
+
+    before, served = asyncio.run(scenario())
+    after = builder.read_manifest()
+
+    assert builder.builds == 2
+    assert after["vehicles-used"]["file"] != before["vehicles-used"]["file"]
+    assert after["testimonials"] == before["testimonials"]
+    assert [doc["brand"] for doc in read_snapshot(builder, "vehicles-used")] == ["Audi", "BMW"]
+    assert served.json() == after
+    assert served.headers["cache-control"] == snapshots.MANIFEST_CACHE_CONTROL
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import httpx
+import pytest
+
+import database
+from server import app
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+@pytest.fixture(autouse=True)
+def index_build(monkeypatch):
+    """Restore the shared index build state after each test"""
+    return database.index_build
+
+
+def import_backend(**env):
+    script = (
+        "import json, database, server\n"
+        "print(json.dumps({'client': database._client is not None,"
+        " 'seed': database.SEED_ON_STARTUP}))"
+    )
+    base = {key: value for key, value in os.environ.items() if key != "SEED_ON_STARTUP"}
+    env = {**base, "MONGO_URL": "mongodb://127.0.0.1:1", **env}
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_importing_the_app_does_not_create_a_client():
+    assert import_backend() == {"client": False, "seed": False}
+
+
+def test_seeding_needs_an_explicit_opt_in():
+    assert import_backend(SEED_ON_STARTUP="false")["seed"] is False
+    assert import_backend(SEED_ON_STARTUP="true")["seed"] is True
+
+
+def test_init_database_seeds_only_when_asked(monkeypatch):
+    seeded = []
+
+    async def seed():
+        seeded.append(True)
+
+    async def no_indexes():
+        pass
+
+    monkeypatch.setattr(database, "seed_initial_data", seed)
+    monkeypatch.setattr(database, "create_indexes", no_indexes)
+
+    asyncio.run(database.init_database("blocking"))
+    assert seeded == []
+
+    monkeypatch.setattr(database, "SEED_ON_STARTUP", True)
+    asyncio.run(database.init_database("blocking"))
+    assert seeded == [True]
+
+
+def test_readiness_waits_for_the_index_build(monkeypatch, index_build):
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_indexes():
+            await release.wait()
+
+        monkeypatch.setattr(database, "create_indexes", slow_indexes)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await database.init_database("background")
+            await asyncio.sleep(0)
+            response = await client.get("/api/health/ready")
+            assert response.status_code == 503
+            assert response.json()["status"] == "starting"
+            assert response.json()["indexes"]["status"] == "building"
+            assert (await client.get("/api/health/live")).status_code == 200
+
+            release.set()
+            await index_build.task
+            response = await client.get("/api/health/ready")
+            assert response.status_code == 200
+            assert response.json()["indexes"]["status"] == "ready"
+
+    asyncio.run(scenario())
+
+
+def test_a_failed_index_build_still_reports_ready(monkeypatch):
+
+    async def broken_indexes():
+        raise RuntimeError("index build failed")
+
+    monkeypatch.setattr(database, "create_indexes", broken_indexes)
+
+    async def scenario():
+        await database.init_database("blocking")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/health/ready")
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.json()["indexes"]["error"] == "index build failed"
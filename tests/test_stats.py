@@ -0,0 +1,24 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from database import contact_submissions
+from stats import dashboard_counters, record_submission
+
+
+def test_new_day_counter_is_seeded_from_leads_already_stored():
+    async def scenario():
+        await contact_submissions.delete_many({})
+        await dashboard_counters.delete_many({})
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Three leads stored today before the counter existed, one yesterday, and the new one
+        stored = [today + timedelta(minutes=m) for m in (1, 2, 3, 4)] + [today - timedelta(hours=1)]
+        await contact_submissions.insert_many([{"id": str(i), "submitted_at": at} for i, at in enumerate(stored)])
+
+        await record_submission("contacts", today + timedelta(minutes=4))
+        await contact_submissions.insert_one({"id": "later", "submitted_at": today + timedelta(minutes=5)})
+        await record_submission("contacts", today + timedelta(minutes=5))
+
+        counter = await dashboard_counters.find_one({"_id": f"contacts:{today.strftime('%Y-%m-%d')}"})
+        return counter["count"]
+
+    assert asyncio.run(scenario()) == 5
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import httpx
+
+from cache import catalog_cache
+from database import vehicles
+from server import app
+
+
+def vehicle(vehicle_id, brand):
+    return {
+        "id": vehicle_id, "year": 2021, "brand": brand, "model": "Base", "type": "Sedan",
+        "category": "used", "price": "$20,000", "image_url": "https://example.com/car.jpg",
+        "features": "Sunroof", "description": "Clean", "is_available": True,
+    }
+
+
+def post_batch(ids):
+    async def call():
+        await vehicles.delete_many({})
+        await vehicles.insert_many([vehicle("a", "Audi"), vehicle("b", "BMW"), vehicle("c", "Chevrolet")])
+        catalog_cache.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/vehicles/batch", json={"ids": ids})
+            hits = catalog_cache.hits
+            # The second call is answered from the per-vehicle cache entries
+            second = await client.post("/api/vehicles/batch", json={"ids": ids})
+        return first, second, catalog_cache.hits - hits
+    return asyncio.run(call())
+
+
+def test_batch_keeps_request_order_and_lists_missing_ids():
+    first, second, hits = post_batch(["c", "zz", "a", "c", "b", "yy"])
+
+    assert first.status_code == 200
+    body = first.json()
+    assert [doc["id"] for doc in body["vehicles"]] == ["c", "a", "b"]
+    assert body["vehicles"][0]["brand"] == "Chevrolet"
+    assert body["missing"] == ["zz", "yy"]
+    assert json.loads(second.content) == body
+    assert hits == 3
+
+
+def test_batch_validates_id_count():
+    assert post_batch([])[0].status_code == 422
+    assert post_batch([str(i) for i in range(251)])[0].status_code == 422
@@ -0,0 +1,156 @@
+import asyncio
+import csv
+import io
+import json
+
+from mongomock_motor import AsyncMongoMockClient
+
+from exports import stream_documents
+from models import DataFormat, Vehicle
+from vehicle_io import (
+    LINE_TOO_LONG, MAX_REPORTED_ERRORS, ImportReport, import_vehicles, iter_csv_rows, iter_lines,
+    iter_ndjson_rows,
+)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def csv_rows(*parts):
+    async def collect():
+        return [row async for row in iter_csv_rows(iter_lines(chunks(*parts)))]
+    return asyncio.run(collect())
+
+
+def test_quoted_fields_may_span_lines_and_chunks():
+    rows = csv_rows(
+        b'\xef\xbb\xbfid, brand ,features\n',
+        b'v1,Toyota,"Heated seats,\nsunroof"\n',
+        b'v2,"Ford ""F-150""",\n',
+        b'\n',
+        b'v3,Honda,"split ',
+        b'across chunks"',
+    )
+    assert rows == [
+        (1, {"id": "v1", "brand": "Toyota", "features": "Heated seats,\nsunroof"}),
+        (2, {"id": "v2", "brand": 'Ford "F-150"', "features": None}),
+        (3, {"id": "v3", "brand": "Honda", "features": "split across chunks"}),
+    ]
+
+
+def test_unterminated_quote_is_reported_as_an_error_row():
+    rows = csv_rows(b'id,brand\n', b'v1,Toyota\n', b'v2,"Ford\n', b'v3,Honda\n')
+    assert rows == [(1, {"id": "v1", "brand": "Toyota"}), (2, "Unterminated quoted field")]
+
+
+def lines(*parts, max_line_bytes):
+    async def collect():
+        return [line async for line in iter_lines(chunks(*parts), max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def test_overlong_lines_are_dropped_while_they_stream_in():
+    assert lines(b"abc\nabcd", b"ef\nxy", b"z\n", b"0123456789", b"\nok", max_line_bytes=4) == [
+        "abc\n", None, "xyz\n", None, "ok",
+    ]
+    assert lines(b"ok\n", b"toolong", b"still", max_line_bytes=4) == ["ok\n", None]
+    assert lines(b"abcd\n", b"abcd", max_line_bytes=4) == ["abcd\n", "abcd"]
+
+
+def test_overlong_lines_become_error_rows():
+    async def ndjson():
+        body = chunks(b'{"a": 1}\n', b'{"a": "' + b"x" * 100, b'"}\n{"a": 3}\n')
+        return [row async for row in iter_ndjson_rows(iter_lines(body, 64))]
+    assert asyncio.run(ndjson()) == [(1, {"a": 1}), (2, LINE_TOO_LONG), (3, {"a": 3})]
+
+    async def csv_body():
+        body = chunks(b'id,brand\nv1,"Toyota\n', b"x" * 100, b'"\nv2,Ford\n')
+        return [row async for row in iter_csv_rows(iter_lines(body, 64))]
+    assert asyncio.run(csv_body()) == [(1, LINE_TOO_LONG), (2, {"id": "v2", "brand": "Ford"})]
+
+
+def test_import_report_counts_every_error_but_keeps_only_the_first():
+    report = ImportReport()
+    for row in range(MAX_REPORTED_ERRORS + 25):
+        report.add_error(row, "bad row")
+    summary = report.summary()
+    assert summary["failed"] == MAX_REPORTED_ERRORS + 25
+    assert len(summary["errors"]) == MAX_REPORTED_ERRORS
+    assert summary["errors"][-1]["row"] == MAX_REPORTED_ERRORS - 1
+
+
+def test_csv_export_writes_nested_values_as_json():
+    vehicle = {
+        "id": "v1", "year": 2022, "brand": "Toyota", "model": "Camry", "type": "Sedan",
+        "category": "used", "price": "$25,000", "image_url": "https://example.com/v1.jpg",
+        "features": "Sunroof", "description": "Clean", "image_srcset": {"webp": "/a 160w, /b 400w"},
+    }
+
+    async def collect():
+        async def cursor():
+            yield vehicle
+        return "".join([part async for part in stream_documents(cursor(), Vehicle, DataFormat.CSV)])
+
+    row = next(csv.DictReader(io.StringIO(asyncio.run(collect()))))
+    assert json.loads(row["image_srcset"]) == {"webp": "/a 160w, /b 400w"}
+    assert row["brand"] == "Toyota"
+
+
+def import_row(**changes):
+    row = {
+        "id": "v1", "year": 2022, "brand": "Toyota", "model": "Camry", "type": "Sedan",
+        "category": "used", "price": "$25,000", "image_url": "https://example.com/v1.jpg",
+        "features": "Sunroof", "description": "Clean",
+    }
+    return {**row, **changes}
+
+
+def test_import_that_changes_image_url_drops_the_old_derivatives():
+    async def run():
+        collection = AsyncMongoMockClient()["io"]["vehicles"]
+        await collection.insert_many([
+            {**import_row(), "image_id": "old", "image_srcset": {"webp": "/old 400w"}},
+            {**import_row(id="v2"), "image_id": "kept", "image_srcset": {"webp": "/kept 400w"}},
+        ])
+
+        async def rows():
+            yield 1, import_row(image_url="https://example.com/new.jpg")
+            yield 2, import_row(id="v2", price="$24,000")
+        report = await import_vehicles(collection, rows())
+        docs = {doc["id"]: doc async for doc in collection.find({}, {"_id": 0})}
+        return report, docs
+    report, docs = asyncio.run(run())
+
+    assert report.updated == 2
+    assert report.image_changed == ["v1"]
+    assert docs["v1"]["image_url"] == "https://example.com/new.jpg"
+    assert "image_id" not in docs["v1"] and "image_srcset" not in docs["v1"]
+    assert docs["v2"]["image_id"] == "kept"
+
+
+def test_import_applies_an_is_available_column_only_when_present():
+    async def run():
+        collection = AsyncMongoMockClient()["io"]["vehicles"]
+        await collection.insert_many([
+            {**import_row(id="sold"), "is_available": False},
+            {**import_row(id="listed"), "is_available": True},
+        ])
+
+        async def rows():
+            yield 1, import_row(id="sold", price="$24,000")
+            yield 2, import_row(id="listed", is_available="false")
+            yield 3, import_row(id="new-hidden", is_available="false")
+            yield 4, import_row(id="new-default", is_available=None)
+            yield 5, import_row(id=None, brand="Honda", is_available=False)
+            yield 6, import_row(id="bad", is_available="maybe")
+        report = await import_vehicles(collection, rows())
+        docs = {doc["brand"] if doc["brand"] == "Honda" else doc["id"]: doc["is_available"]
+                async for doc in collection.find({}, {"_id": 0})}
+        return report, docs
+    report, docs = asyncio.run(run())
+
+    assert docs == {"sold": False, "listed": False, "new-hidden": False, "new-default": True, "Honda": False}
+    assert [error["row"] for error in report.errors] == [6]
+    assert [detail["field"] for detail in report.errors[0]["errors"]] == ["is_available"]
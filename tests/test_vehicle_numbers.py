@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from database import vehicles
+from migrations import backfill_vehicle_numbers
+from models import VehicleCreate, parse_mileage_km, parse_price_cents
+
+
+@pytest.mark.parametrize("price, cents", [
+    ("$52,900", 5290000),
+    ("Starting at $115,000", 11500000),
+    ("$52.9K", 5290000),
+    ("$1.2M", 120000000),
+    ("From 2025: $115,000", 11500000),
+    ("48750", 4875000),
+    ("$20,000 - $25,000", None),
+    ("2025 model, 115000", None),
+    ("Call for price", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_price_cents(price, cents):
+    assert parse_price_cents(price) == cents
+
+
+@pytest.mark.parametrize("mileage, km", [
+    ("35,000 km", 35000),
+    ("35K km", 35000),
+    ("22k miles", 35406),
+    ("12 mi", 19),
+    ("2019 model, 45,000 km", 45000),
+    ("45000", 45000),
+    ("10,000 km or 6,000 miles", None),
+    ("2 owners, 3 keys", None),
+    (None, None),
+])
+def test_parse_mileage_km(mileage, km):
+    assert parse_mileage_km(mileage) == km
+
+
+def test_create_payload_derives_numbers_unless_given():
+    payload = {
+        "year": 2022, "brand": "Audi", "model": "A4", "type": "Sedan", "category": "used",
+        "image_url": "https://example.com/a4.jpg", "features": "AWD", "description": "Clean",
+    }
+    derived = VehicleCreate(**payload, price="$52.9K", mileage="35K km")
+    assert (derived.price_cents, derived.mileage_km) == (5290000, 35000)
+    given = VehicleCreate(**payload, price="Call for price", price_cents=1000000)
+    assert given.price_cents == 1000000
+
+
+def test_backfill_resumes_after_an_interruption(monkeypatch):
+    real_bulk_write = vehicles.bulk_write
+    calls = []
+
+    async def failing_second_batch(operations, **kwargs):
+        calls.append(len(operations))
+        if len(calls) == 2:
+            raise RuntimeError("connection reset")
+        return await real_bulk_write(operations, **kwargs)
+
+    async def run():
+        await vehicles.delete_many({})
+        await vehicles.insert_many([
+            {"id": f"v{index}", "price": f"${index},000", "mileage": f"{index}0,000 km"} for index in range(1, 6)
+        ] + [{"id": "done", "price": "$1", "price_cents": 7, "mileage_km": None}])
+
+        monkeypatch.setattr(vehicles, "bulk_write", failing_second_batch, raising=False)
+        with pytest.raises(RuntimeError):
+            await backfill_vehicle_numbers(batch_size=2)
+        first_pass = await vehicles.count_documents({"price_cents": {"$exists": True}})
+
+        monkeypatch.delattr(vehicles, "bulk_write")
+        converted = await backfill_vehicle_numbers(batch_size=2)
+        docs = {doc["id"]: doc async for doc in vehicles.find({}, {"_id": 0})}
+        return first_pass, converted, docs
+    first_pass, converted, docs = asyncio.run(run())
+
+    assert first_pass == 3
+    assert converted == 3
+    assert docs["v4"]["price_cents"] == 400000 and docs["v4"]["mileage_km"] == 40000
+    assert docs["done"]["price_cents"] == 7
@@ -0,0 +1,69 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from database import vehicles
+from migrations import backfill_search_terms
+from models import search_terms_for
+from vehicle_search import build_vehicle_query
+
+VEHICLES = [
+    {"id": "1", "brand": "Toyota", "model": "Camry", "type": "Sedan", "features": "Sunroof, heated seats",
+     "description": "One owner", "is_available": True},
+    {"id": "2", "brand": "Ford", "model": "F-150", "type": "Truck", "features": "Tow package",
+     "description": "Ready for camping", "is_available": True},
+    {"id": "3", "brand": "Toyota", "model": "RAV4", "type": "SUV", "features": "AWD",
+     "description": "Sold", "is_available": False},
+]
+
+
+def search(q):
+    async def run():
+        collection = AsyncMongoMockClient()["search"]["vehicles"]
+        await collection.insert_many([{**doc, "search_terms": search_terms_for(doc)} for doc in VEHICLES])
+        return sorted(doc["id"] for doc in await collection.find(build_vehicle_query(q=q)).to_list(None))
+    return asyncio.run(run())
+
+
+def test_single_word_matches_word_prefixes_case_insensitively():
+    assert search("Toyo") == ["1"]
+    assert search("cam") == ["1", "2"]
+    assert search("F-1") == ["2"]
+    assert search("150") == ["2"]
+    assert search("heat") == ["1"]
+    assert search("eated") == []
+
+
+def test_single_word_is_an_anchored_prefix_on_search_terms():
+    assert build_vehicle_query(q="Toyo") == {"is_available": True, "search_terms": {"$regex": "^toyo"}}
+
+
+def test_search_terms_are_lowercased_words_with_joined_words_kept_whole():
+    assert search_terms_for(VEHICLES[1]) == ["150", "camping", "f", "f-150", "for", "ford", "package",
+                                             "ready", "tow", "truck"]
+
+
+def test_regex_characters_are_matched_literally():
+    assert search("(") == []
+    assert search(".*") == []
+
+
+def test_longer_queries_use_the_text_index():
+    assert build_vehicle_query(q="  heated   seats ") == {"is_available": True, "$text": {"$search": "heated seats"}}
+    assert build_vehicle_query(q="   ") == {"is_available": True}
+
+
+def test_backfill_search_terms_fills_only_missing_documents():
+    async def run():
+        await vehicles.delete_many({})
+        await vehicles.insert_many([dict(doc) for doc in VEHICLES])
+        await vehicles.update_one({"id": "3"}, {"$set": {"search_terms": ["kept"]}})
+        converted = await backfill_search_terms(batch_size=1)
+        docs = {doc["id"]: doc["search_terms"] async for doc in vehicles.find({}, {"_id": 0})}
+        return converted, docs, await backfill_search_terms()
+    converted, docs, rerun = asyncio.run(run())
+
+    assert converted == 2
+    assert docs["1"] == search_terms_for(VEHICLES[0])
+    assert docs["3"] == ["kept"]
+    assert rerun == 0